@@ -0,0 +1,148 @@
+"""
+Dashboard aggregation queries
+
+Every figure on the analytics dashboard is computed with conditional
+aggregation, so the number of queries is constant regardless of how many
+departments or days are shown. Results are cached for
+DASHBOARD_CACHE_TIMEOUT seconds and dropped by the signal handlers in
+analytics.signals when complaints, departments or users change.
+"""
+
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Avg, Count, DurationField, ExpressionWrapper, F, Q
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from authentication.models import User
+from complaints.models import Complaint, Department
+from .models import UserActivity
+
+logger = logging.getLogger(__name__)
+
+DASHBOARD_CACHE_KEY = 'analytics:dashboard_stats'
+OPEN_STATUSES = ['submitted', 'pending', 'in_progress']
+TREND_DAYS = 7
+
+
+def _dashboard_cache_key(today):
+    return f'{DASHBOARD_CACHE_KEY}:{today.isoformat()}'
+
+
+def resolution_duration():
+    """Expression for time between creation and last update of a complaint"""
+    return ExpressionWrapper(F('updated_at') - F('created_at'), output_field=DurationField())
+
+
+def build_dashboard_stats(today=None):
+    """Compute dashboard statistics with a fixed number of aggregate queries"""
+    today = today or timezone.localdate()
+    week_ago = today - timedelta(days=7)
+    trend_start = today - timedelta(days=TREND_DAYS - 1)
+
+    # User statistics (2 queries)
+    user_stats = User.objects.aggregate(
+        total=Count('id'),
+        new_this_week=Count('id', filter=Q(date_joined__date__gte=week_ago)),
+    )
+    active_users_today = UserActivity.objects.filter(
+        created_at__date=today
+    ).aggregate(active=Count('user', distinct=True))['active']
+
+    # Complaint statistics (1 query)
+    complaint_stats = Complaint.objects.aggregate(
+        total=Count('id'),
+        pending=Count('id', filter=Q(status__in=OPEN_STATUSES)),
+        resolved=Count('id', filter=Q(status='resolved')),
+        resolved_this_week=Count('id', filter=Q(status='resolved', updated_at__date__gte=week_ago)),
+        avg_resolution=Avg(resolution_duration(), filter=Q(status='resolved', updated_at__isnull=False)),
+    )
+
+    total_complaints = complaint_stats['total']
+    resolved_complaints = complaint_stats['resolved']
+    avg_resolution = complaint_stats['avg_resolution']
+    avg_resolution_time = avg_resolution.total_seconds() / 3600 if avg_resolution else 0
+
+    resolution_rate = 0
+    if total_complaints > 0:
+        resolution_rate = (resolved_complaints / total_complaints) * 100
+
+    # Complaints trend (1 query, grouped by day)
+    daily_counts = dict(
+        Complaint.objects.filter(created_at__date__gte=trend_start)
+        .annotate(day=TruncDate('created_at'))
+        .values('day')
+        .annotate(count=Count('id'))
+        .values_list('day', 'count')
+    )
+    complaints_trend = []
+    for offset in range(TREND_DAYS):
+        date = trend_start + timedelta(days=offset)
+        complaints_trend.append({
+            'date': date.isoformat(),
+            'count': daily_counts.get(date, 0)
+        })
+
+    # Department performance (1 query)
+    department_performance = []
+    departments = Department.objects.annotate(
+        total=Count('complaints'),
+        resolved=Count('complaints', filter=Q(complaints__status='resolved')),
+    ).order_by('id')
+    for dept in departments:
+        dept_rate = 0
+        if dept.total > 0:
+            dept_rate = (dept.resolved / dept.total) * 100
+
+        department_performance.append({
+            'name': dept.name,
+            'total': dept.total,
+            'resolved': dept.resolved,
+            'rate': round(dept_rate, 2)
+        })
+
+    return {
+        'total_users': user_stats['total'],
+        'active_users_today': active_users_today,
+        'new_users_this_week': user_stats['new_this_week'],
+        'total_complaints': total_complaints,
+        'pending_complaints': complaint_stats['pending'],
+        'resolved_complaints': resolved_complaints,
+        'resolved_this_week': complaint_stats['resolved_this_week'],
+        'avg_resolution_time_hours': round(avg_resolution_time, 2),
+        'resolution_rate': round(resolution_rate, 2),
+        'complaints_trend': complaints_trend,
+        'department_performance': department_performance
+    }
+
+
+def get_dashboard_stats():
+    """Cached dashboard statistics"""
+    today = timezone.localdate()
+    cache_key = _dashboard_cache_key(today)
+
+    try:
+        data = cache.get(cache_key)
+    except Exception as e:
+        logger.warning(f"Dashboard cache read failed: {e}")
+        data = None
+
+    if data is None:
+        data = build_dashboard_stats(today)
+        try:
+            cache.set(cache_key, data, settings.DASHBOARD_CACHE_TIMEOUT)
+        except Exception as e:
+            logger.warning(f"Dashboard cache write failed: {e}")
+
+    return data
+
+
+def invalidate_dashboard_stats():
+    """Drop the cached dashboard so the next request recomputes it"""
+    try:
+        cache.delete(_dashboard_cache_key(timezone.localdate()))
+    except Exception as e:
+        logger.warning(f"Dashboard cache invalidation failed: {e}")
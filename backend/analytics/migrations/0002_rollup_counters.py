@@ -0,0 +1,26 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='complaintstats',
+            name='in_progress_complaints',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='departmentmetrics',
+            name='high_priority_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='departmentmetrics',
+            name='urgent_count',
+            field=models.IntegerField(default=0),
+        ),
+    ]
@@ -56,6 +56,7 @@ class ComplaintStats(models.Model):
     resolved_complaints = models.IntegerField(default=0)
     rejected_complaints = models.IntegerField(default=0)
     pending_complaints = models.IntegerField(default=0)
+    in_progress_complaints = models.IntegerField(default=0)
     
     # By priority
     high_priority_count = models.IntegerField(default=0)
@@ -92,6 +93,8 @@ class DepartmentMetrics(models.Model):
     resolved_complaints = models.IntegerField(default=0)
     pending_complaints = models.IntegerField(default=0)
     rejected_complaints = models.IntegerField(default=0)
+    high_priority_count = models.IntegerField(default=0)
+    urgent_count = models.IntegerField(default=0)
     
     # Performance metrics
     avg_response_time_hours = models.FloatField(null=True, blank=True)
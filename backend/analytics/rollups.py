@@ -0,0 +1,349 @@
+"""
+Incremental analytics rollups
+
+ComplaintStats and DepartmentMetrics rows are daily cohorts keyed by the
+complaint creation date (in the project timezone). Each complaint contributes
+to exactly one ComplaintStats row and, when it has a department, one
+DepartmentMetrics row; the status and priority buckets reflect its current
+state. Saves and deletes apply the difference between the old and new
+contribution with F() increments; rows for today and yesterday are created
+on demand, while older days are only updated once reconcile_rollups has
+built them. reconcile_rollups rebuilds any day whose stored counters drifted
+from the source rows (bulk updates, raw SQL, missed signals) and fills in the
+average resolution times.
+"""
+
+import logging
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Avg, Case, Count, F, FloatField, Q, Value, When
+from django.db.models.functions import Cast, TruncDate
+from django.utils import timezone
+
+from authentication.models import User
+from complaints.models import Complaint
+from .aggregations import OPEN_STATUSES, resolution_duration
+from .models import ComplaintStats, DepartmentMetrics, SystemMetrics, UserActivity
+
+logger = logging.getLogger(__name__)
+
+# Complaint fields that affect which rollup buckets a complaint lands in
+ROLLUP_SOURCE_FIELDS = ('created_at', 'department_id', 'status', 'priority', 'urgency_level')
+ROLLUP_MODEL_FIELDS = frozenset({'created_at', 'department', 'status', 'priority', 'urgency_level'})
+
+PENDING_STATUSES = ('submitted', 'pending')
+
+STATS_COUNTERS = (
+    'total_complaints', 'new_complaints', 'resolved_complaints', 'rejected_complaints',
+    'pending_complaints', 'in_progress_complaints',
+    'high_priority_count', 'medium_priority_count', 'low_priority_count',
+)
+
+DEPARTMENT_COUNTERS = (
+    'total_complaints', 'resolved_complaints', 'pending_complaints', 'rejected_complaints',
+    'high_priority_count', 'urgent_count',
+)
+
+
+def complaint_state(instance):
+    """Snapshot of the rollup-relevant fields of a complaint instance"""
+    return {field: getattr(instance, field) for field in ROLLUP_SOURCE_FIELDS}
+
+
+def load_complaint_state(pk):
+    """Snapshot of the rollup-relevant fields as currently stored in the database"""
+    if pk is None:
+        return None
+    return Complaint.objects.filter(pk=pk).values(*ROLLUP_SOURCE_FIELDS).first()
+
+
+def rollup_date(created_at):
+    return timezone.localtime(created_at).date() if timezone.is_aware(created_at) else created_at.date()
+
+
+def _stats_contribution(state):
+    contribution = Counter(total_complaints=1, new_complaints=1)
+
+    status = state['status']
+    if status == 'resolved':
+        contribution['resolved_complaints'] += 1
+    elif status == 'rejected':
+        contribution['rejected_complaints'] += 1
+    elif status in PENDING_STATUSES:
+        contribution['pending_complaints'] += 1
+    elif status == 'in_progress':
+        contribution['in_progress_complaints'] += 1
+
+    priority = state['priority']
+    if priority in ('high', 'urgent'):
+        contribution['high_priority_count'] += 1
+    elif priority == 'medium':
+        contribution['medium_priority_count'] += 1
+    elif priority == 'low':
+        contribution['low_priority_count'] += 1
+
+    return contribution
+
+
+def _department_contribution(state):
+    contribution = Counter(total_complaints=1)
+
+    status = state['status']
+    if status == 'resolved':
+        contribution['resolved_complaints'] += 1
+    elif status == 'rejected':
+        contribution['rejected_complaints'] += 1
+    elif status in PENDING_STATUSES:
+        contribution['pending_complaints'] += 1
+
+    if state['priority'] == 'high':
+        contribution['high_priority_count'] += 1
+    if state['urgency_level'] == 'critical':
+        contribution['urgent_count'] += 1
+
+    return contribution
+
+
+def _add_contribution(stats_deltas, department_deltas, state, sign):
+    day = rollup_date(state['created_at'])
+    for field, value in _stats_contribution(state).items():
+        stats_deltas[day][field] += sign * value
+    if state['department_id']:
+        key = (state['department_id'], day)
+        for field, value in _department_contribution(state).items():
+            department_deltas[key][field] += sign * value
+
+
+def _resolution_rate_expression():
+    return Case(
+        When(total_complaints=0, then=Value(0.0)),
+        default=Cast('resolved_complaints', FloatField()) * 100.0 / Cast('total_complaints', FloatField()),
+        output_field=FloatField(),
+    )
+
+
+def _apply_deltas(model, lookup, deltas, create_missing):
+    """
+    Add ``deltas`` to a rollup row with F() increments; returns whether anything changed.
+
+    A missing row is created (concurrent creators get the same row) and then
+    incremented when ``create_missing`` is set. Otherwise the day was never
+    materialized and is left to reconcile_rollups: a -1 applied to a fresh
+    zero row would leave a negative counter.
+    """
+    changed = {field: value for field, value in deltas.items() if value}
+    if not changed:
+        return False
+    increments = {field: F(field) + value for field, value in changed.items()}
+    if model.objects.filter(**lookup).update(**increments):
+        return True
+    if not create_missing:
+        return False
+    model.objects.get_or_create(**lookup)
+    return model.objects.filter(**lookup).update(**increments) > 0
+
+
+def _materialized_days(days):
+    """
+    Days whose rollup rows are kept up to date incrementally: today and
+    yesterday (so the first complaint of a day, or one committed just after
+    midnight, creates its rows), and any day reconcile_rollups has built.
+    """
+    recent = timezone.localdate() - timedelta(days=1)
+    built = set(ComplaintStats.objects.filter(date__in=[day for day in days if day < recent])
+                .values_list('date', flat=True))
+    return {day for day in days if day >= recent or day in built}
+
+
+def apply_change(previous, current):
+    """
+    Move a complaint's contribution from its previous state to its current one.
+
+    ``previous`` is None for newly created complaints and ``current`` is None
+    for deleted ones.
+    """
+    stats_deltas = defaultdict(Counter)
+    department_deltas = defaultdict(Counter)
+
+    if previous and previous.get('created_at'):
+        _add_contribution(stats_deltas, department_deltas, previous, -1)
+    if current and current.get('created_at'):
+        _add_contribution(stats_deltas, department_deltas, current, 1)
+
+    materialized = _materialized_days(set(stats_deltas) | {day for _, day in department_deltas})
+    with transaction.atomic():
+        for day, deltas in stats_deltas.items():
+            _apply_deltas(ComplaintStats, {'date': day}, deltas, day in materialized)
+
+        for (department_id, day), deltas in department_deltas.items():
+            lookup = {'department_id': department_id, 'date': day}
+            if _apply_deltas(DepartmentMetrics, lookup, deltas, day in materialized):
+                DepartmentMetrics.objects.filter(**lookup).update(
+                    resolution_rate=_resolution_rate_expression()
+                )
+
+
+def _stats_aggregates():
+    return {
+        'total_complaints': Count('id'),
+        'new_complaints': Count('id'),
+        'resolved_complaints': Count('id', filter=Q(status='resolved')),
+        'rejected_complaints': Count('id', filter=Q(status='rejected')),
+        'pending_complaints': Count('id', filter=Q(status__in=PENDING_STATUSES)),
+        'in_progress_complaints': Count('id', filter=Q(status='in_progress')),
+        'high_priority_count': Count('id', filter=Q(priority__in=['high', 'urgent'])),
+        'medium_priority_count': Count('id', filter=Q(priority='medium')),
+        'low_priority_count': Count('id', filter=Q(priority='low')),
+        'avg_resolution': Avg(resolution_duration(), filter=Q(status='resolved')),
+    }
+
+
+def _department_aggregates():
+    return {
+        'total_complaints': Count('id'),
+        'resolved_complaints': Count('id', filter=Q(status='resolved')),
+        'rejected_complaints': Count('id', filter=Q(status='rejected')),
+        'pending_complaints': Count('id', filter=Q(status__in=PENDING_STATUSES)),
+        'high_priority_count': Count('id', filter=Q(priority='high')),
+        'urgent_count': Count('id', filter=Q(urgency_level='critical')),
+        'avg_resolution': Avg(resolution_duration(), filter=Q(status='resolved')),
+    }
+
+
+def _hours(duration):
+    return round(duration.total_seconds() / 3600, 2) if duration else None
+
+
+def _sync_rows(model, expected, existing, fields, build_lookup, counters):
+    """
+    Create or rewrite rows whose stored values differ from ``expected``.
+
+    Each rewrite only applies while the row's counters still hold the values
+    read here, so an F() increment committed in between is not overwritten
+    (that row is left for the next run). Rows created concurrently by
+    apply_change are skipped the same way.
+    """
+    now = timezone.now()
+    to_create, rewritten = [], 0
+
+    for key, values in expected.items():
+        row = existing.get(key)
+        if row is None:
+            to_create.append(model(**build_lookup(key), **values))
+            continue
+        if any(getattr(row, field) != value for field, value in values.items()):
+            unchanged = {field: getattr(row, field) for field in counters}
+            rewritten += model.objects.filter(pk=row.pk, **unchanged).update(
+                **{field: values[field] for field in fields}, updated_at=now
+            )
+
+    created = model.objects.bulk_create(to_create, batch_size=500, ignore_conflicts=True)
+    return len(created) + rewritten
+
+
+def reconcile_rollups(start_date, end_date):
+    """
+    Rebuild ComplaintStats and DepartmentMetrics rows for [start_date, end_date]
+    from the source complaints, rewriting only rows that drifted.
+    """
+    complaints = (
+        Complaint.objects.filter(created_at__date__gte=start_date, created_at__date__lte=end_date)
+        .annotate(day=TruncDate('created_at'))
+        .order_by()
+    )
+
+    # Daily stats: one grouped query for the whole window
+    expected_stats = {}
+    for row in complaints.values('day').annotate(**_stats_aggregates()):
+        values = {field: row[field] for field in STATS_COUNTERS}
+        values['avg_resolution_time_hours'] = _hours(row['avg_resolution'])
+        expected_stats[row['day']] = values
+
+    existing_stats = ComplaintStats.objects.filter(
+        date__gte=start_date, date__lte=end_date
+    ).in_bulk(field_name='date')
+    for day in existing_stats:
+        expected_stats.setdefault(day, {
+            **dict.fromkeys(STATS_COUNTERS, 0), 'avg_resolution_time_hours': None
+        })
+
+    # Department metrics: one grouped query for the whole window
+    expected_departments = {}
+    department_rows = (
+        complaints.filter(department__isnull=False)
+        .values('day', 'department_id')
+        .annotate(**_department_aggregates())
+    )
+    for row in department_rows:
+        values = {field: row[field] for field in DEPARTMENT_COUNTERS}
+        values['avg_resolution_time_hours'] = _hours(row['avg_resolution'])
+        expected_departments[(row['department_id'], row['day'])] = values
+
+    existing_departments = {
+        (row.department_id, row.date): row
+        for row in DepartmentMetrics.objects.filter(date__gte=start_date, date__lte=end_date)
+    }
+    for key in existing_departments:
+        expected_departments.setdefault(key, {
+            **dict.fromkeys(DEPARTMENT_COUNTERS, 0), 'avg_resolution_time_hours': None
+        })
+    for values in expected_departments.values():
+        total = values['total_complaints']
+        values['resolution_rate'] = (values['resolved_complaints'] / total) * 100 if total else 0.0
+
+    with transaction.atomic():
+        stats_rewritten = _sync_rows(
+            ComplaintStats, expected_stats, existing_stats,
+            STATS_COUNTERS + ('avg_resolution_time_hours',),
+            lambda day: {'date': day}, STATS_COUNTERS
+        )
+        departments_rewritten = _sync_rows(
+            DepartmentMetrics, expected_departments, existing_departments,
+            DEPARTMENT_COUNTERS + ('avg_resolution_time_hours', 'resolution_rate'),
+            lambda key: {'department_id': key[0], 'date': key[1]}, DEPARTMENT_COUNTERS
+        )
+
+    summary = {
+        'start_date': start_date.isoformat(),
+        'end_date': end_date.isoformat(),
+        'complaint_stats_rewritten': stats_rewritten,
+        'department_metrics_rewritten': departments_rewritten,
+    }
+    logger.info(f"Analytics rollups reconciled: {summary}")
+    return summary
+
+
+def reconcile_recent_rollups(days):
+    """Reconcile the last ``days`` days up to and including today"""
+    end_date = timezone.localdate()
+    return reconcile_rollups(end_date - timedelta(days=days), end_date)
+
+
+def record_system_metrics():
+    """Store a SystemMetrics snapshot of current user and complaint totals"""
+    today = timezone.localdate()
+
+    user_stats = User.objects.aggregate(
+        total=Count('id'),
+        new_today=Count('id', filter=Q(date_joined__date=today)),
+    )
+    complaint_stats = Complaint.objects.aggregate(
+        total=Count('id'),
+        open=Count('id', filter=Q(status__in=OPEN_STATUSES)),
+        resolved=Count('id', filter=Q(status='resolved')),
+    )
+    active_users_today = UserActivity.objects.filter(
+        created_at__date=today
+    ).aggregate(active=Count('user', distinct=True))['active']
+
+    return SystemMetrics.objects.create(
+        timestamp=timezone.now(),
+        total_users=user_stats['total'],
+        active_users_today=active_users_today,
+        new_users_today=user_stats['new_today'],
+        total_complaints=complaint_stats['total'],
+        open_complaints=complaint_stats['open'],
+        resolved_complaints=complaint_stats['resolved'],
+    )
@@ -24,7 +24,7 @@ class ComplaintStatsSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'date', 'total_complaints', 'new_complaints',
             'resolved_complaints', 'rejected_complaints', 'pending_complaints',
-            'high_priority_count', 'medium_priority_count', 'low_priority_count',
+            'in_progress_complaints', 'high_priority_count', 'medium_priority_count', 'low_priority_count',
             'avg_response_time_hours', 'avg_resolution_time_hours',
             'created_at', 'updated_at'
         ]
@@ -42,6 +42,7 @@ class DepartmentMetricsSerializer(serializers.ModelSerializer):
             'id', 'department', 'department_name', 'date',
             'total_complaints', 'resolved_complaints', 
             'pending_complaints', 'rejected_complaints',
+            'high_priority_count', 'urgent_count',
             'avg_response_time_hours', 'avg_resolution_time_hours',
             'resolution_rate', 'avg_rating', 'total_ratings',
             'created_at', 'updated_at'
@@ -0,0 +1,71 @@
+"""
+Signal handlers that keep cached analytics and rollups in sync with the source tables
+"""
+
+import logging
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from authentication.models import User
+from complaints.models import Complaint, Department
+from . import rollups
+from .aggregations import invalidate_dashboard_stats
+
+logger = logging.getLogger(__name__)
+
+
+@receiver(post_save, sender=Complaint)
+@receiver(post_delete, sender=Complaint)
+@receiver(post_save, sender=Department)
+@receiver(post_delete, sender=Department)
+def invalidate_dashboard_on_change(sender, **kwargs):
+    """Any complaint or department change can move dashboard figures"""
+    invalidate_dashboard_stats()
+
+
+@receiver(post_save, sender=User)
+def invalidate_dashboard_on_new_user(sender, instance, created, **kwargs):
+    """User totals only change when an account is created"""
+    if created:
+        invalidate_dashboard_stats()
+
+
+def _schedule_rollup_change(previous, current):
+    """Apply the rollup delta once the surrounding transaction commits"""
+    def apply():
+        try:
+            rollups.apply_change(previous, current)
+        except Exception as e:
+            # Nightly reconciliation repairs any missed delta
+            logger.error(f"Error updating analytics rollups: {e}")
+
+    transaction.on_commit(apply)
+
+
+@receiver(pre_save, sender=Complaint)
+def remember_rollup_state(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Capture the stored state so post_save can compute the delta"""
+    instance._rollup_previous = None
+    instance._rollup_skip = update_fields is not None and not rollups.ROLLUP_MODEL_FIELDS.intersection(update_fields)
+    if raw or instance._state.adding or instance._rollup_skip:
+        return
+    instance._rollup_previous = rollups.load_complaint_state(instance.pk)
+
+
+@receiver(post_save, sender=Complaint)
+def update_rollups_on_save(sender, instance, created, raw=False, **kwargs):
+    """Update daily and per-department counters for creates and status changes"""
+    if raw or getattr(instance, '_rollup_skip', False):
+        return
+
+    previous = None if created else getattr(instance, '_rollup_previous', None)
+    current = rollups.complaint_state(instance)
+    if previous == current:
+        return
+    _schedule_rollup_change(previous, current)
+
+
+@receiver(post_delete, sender=Complaint)
+def update_rollups_on_delete(sender, instance, **kwargs):
+    _schedule_rollup_change(rollups.complaint_state(instance), None)
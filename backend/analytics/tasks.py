@@ -0,0 +1,33 @@
+"""
+Celery tasks for analytics rollups
+Scheduled nightly via CELERY_BEAT_SCHEDULE
+"""
+
+from celery import shared_task
+from django.conf import settings
+import logging
+
+from .rollups import reconcile_recent_rollups, record_system_metrics
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(name='reconcile_analytics_rollups')
+def reconcile_analytics_rollups_task(days=None):
+    """
+    Rebuild any drifted ComplaintStats/DepartmentMetrics day and record a
+    SystemMetrics snapshot
+
+    Args:
+        days: Number of days to reconcile (default: ANALYTICS_RETENTION_DAYS)
+    """
+    days = days or settings.ANALYTICS_RETENTION_DAYS
+    logger.info(f'Starting analytics rollup reconciliation for the last {days} days')
+
+    try:
+        summary = reconcile_recent_rollups(days)
+        record_system_metrics()
+        return summary
+    except Exception as e:
+        logger.error(f'Analytics rollup reconciliation failed: {str(e)}')
+        raise
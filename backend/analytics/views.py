@@ -2,16 +2,16 @@ from rest_framework import generics, status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
-from django.db.models import Count, Avg, Q
+from django.db.models import Count, Q
 from django.utils import timezone
 from datetime import timedelta
-from authentication.models import User
 from complaints.models import Complaint, Department
-from .models import UserActivity, ComplaintStats, DepartmentMetrics, SystemMetrics
+from .aggregations import get_dashboard_stats
+from .models import UserActivity, ComplaintStats, DepartmentMetrics
+from .rollups import PENDING_STATUSES
 from .serializers import (
     UserActivitySerializer, ComplaintStatsSerializer,
-    DepartmentMetricsSerializer, SystemMetricsSerializer,
-    DashboardStatsSerializer
+    DepartmentMetricsSerializer, DashboardStatsSerializer
 )
 
 
@@ -20,92 +20,8 @@ from .serializers import (
 def dashboard_stats(request):
     """Get comprehensive dashboard statistics"""
     
-    today = timezone.now().date()
-    week_ago = today - timedelta(days=7)
-    
-    # User statistics
-    total_users = User.objects.count()
-    active_users_today = UserActivity.objects.filter(
-        created_at__date=today
-    ).values('user').distinct().count()
-    new_users_this_week = User.objects.filter(
-        date_joined__gte=week_ago
-    ).count()
-    
-    # Complaint statistics
-    total_complaints = Complaint.objects.count()
-    pending_complaints = Complaint.objects.filter(
-        status__in=['submitted', 'pending', 'in_progress']
-    ).count()
-    resolved_complaints = Complaint.objects.filter(
-        status='resolved'
-    ).count()
-    resolved_this_week = Complaint.objects.filter(
-        status='resolved',
-        updated_at__gte=week_ago
-    ).count()
-    
-    # Performance metrics
-    resolved_with_time = Complaint.objects.filter(
-        status='resolved',
-        updated_at__isnull=False
-    )
-    
-    avg_resolution_time = 0
-    if resolved_with_time.exists():
-        total_hours = sum([
-            (c.updated_at - c.created_at).total_seconds() / 3600
-            for c in resolved_with_time
-        ])
-        avg_resolution_time = total_hours / resolved_with_time.count()
-    
-    resolution_rate = 0
-    if total_complaints > 0:
-        resolution_rate = (resolved_complaints / total_complaints) * 100
-    
-    # Complaints trend (last 7 days)
-    complaints_trend = []
-    for i in range(7):
-        date = today - timedelta(days=i)
-        count = Complaint.objects.filter(created_at__date=date).count()
-        complaints_trend.append({
-            'date': date.isoformat(),
-            'count': count
-        })
-    complaints_trend.reverse()
-    
-    # Department performance
-    department_performance = []
-    departments = Department.objects.all()
-    for dept in departments:
-        dept_complaints = Complaint.objects.filter(department=dept)
-        dept_resolved = dept_complaints.filter(status='resolved').count()
-        dept_total = dept_complaints.count()
-        
-        dept_rate = 0
-        if dept_total > 0:
-            dept_rate = (dept_resolved / dept_total) * 100
-        
-        department_performance.append({
-            'name': dept.name,
-            'total': dept_total,
-            'resolved': dept_resolved,
-            'rate': round(dept_rate, 2)
-        })
-    
-    data = {
-        'total_users': total_users,
-        'active_users_today': active_users_today,
-        'new_users_this_week': new_users_this_week,
-        'total_complaints': total_complaints,
-        'pending_complaints': pending_complaints,
-        'resolved_complaints': resolved_complaints,
-        'resolved_this_week': resolved_this_week,
-        'avg_resolution_time_hours': round(avg_resolution_time, 2),
-        'resolution_rate': round(resolution_rate, 2),
-        'complaints_trend': complaints_trend,
-        'department_performance': department_performance
-    }
+    # Constant number of aggregate queries, cached until a complaint/department/user changes
+    data = get_dashboard_stats()
     
     serializer = DashboardStatsSerializer(data=data)
     serializer.is_valid(raise_exception=True)
@@ -122,25 +38,24 @@ def complaint_trends(request):
     end_date = timezone.now().date()
     start_date = end_date - timedelta(days=days)
     
+    # Read precomputed daily rollups (maintained by analytics.signals / nightly reconciliation)
+    daily_stats = {
+        row.date: row
+        for row in ComplaintStats.objects.filter(date__gte=start_date, date__lte=end_date)
+    }
+    
     trends = []
     current_date = start_date
     
     while current_date <= end_date:
-        daily_stats = Complaint.objects.filter(
-            created_at__date=current_date
-        ).aggregate(
-            total=Count('id'),
-            resolved=Count('id', filter=Q(status='resolved')),
-            pending=Count('id', filter=Q(status__in=['submitted', 'pending'])),
-            in_progress=Count('id', filter=Q(status='in_progress'))
-        )
+        stats = daily_stats.get(current_date)
         
         trends.append({
             'date': current_date.isoformat(),
-            'total': daily_stats['total'] or 0,
-            'resolved': daily_stats['resolved'] or 0,
-            'pending': daily_stats['pending'] or 0,
-            'in_progress': daily_stats['in_progress'] or 0
+            'total': stats.total_complaints if stats else 0,
+            'resolved': stats.resolved_complaints if stats else 0,
+            'pending': stats.pending_complaints if stats else 0,
+            'in_progress': stats.in_progress_complaints if stats else 0
         })
         
         current_date += timedelta(days=1)
@@ -161,33 +76,40 @@ def department_analytics(request):
     departments = Department.objects.all()
     analytics = []
     
-    for dept in departments:
-        complaints = Complaint.objects.filter(department=dept)
-        
-        stats = complaints.aggregate(
+    # All-time figures come from one grouped query over the complaints table;
+    # the daily DepartmentMetrics rollups only cover days that were reconciled
+    totals = {
+        row['department']: row
+        for row in Complaint.objects.filter(department__isnull=False).values('department').annotate(
             total=Count('id'),
             resolved=Count('id', filter=Q(status='resolved')),
-            pending=Count('id', filter=Q(status__in=['submitted', 'pending'])),
+            pending=Count('id', filter=Q(status__in=PENDING_STATUSES)),
             rejected=Count('id', filter=Q(status='rejected')),
             high_priority=Count('id', filter=Q(priority='high')),
             urgent=Count('id', filter=Q(urgency_level='critical'))
-        )
+        ).order_by()
+    }
+    
+    for dept in departments:
+        stats = totals.get(dept.id, {})
+        total = stats.get('total') or 0
+        resolved = stats.get('resolved') or 0
         
         # Calculate resolution rate
         resolution_rate = 0
-        if stats['total'] > 0:
-            resolution_rate = (stats['resolved'] / stats['total']) * 100
+        if total > 0:
+            resolution_rate = (resolved / total) * 100
         
         analytics.append({
             'id': dept.id,
             'name': dept.name,
             'zone': dept.zone,
-            'total_complaints': stats['total'] or 0,
-            'resolved': stats['resolved'] or 0,
-            'pending': stats['pending'] or 0,
-            'rejected': stats['rejected'] or 0,
-            'high_priority': stats['high_priority'] or 0,
-            'urgent': stats['urgent'] or 0,
+            'total_complaints': total,
+            'resolved': resolved,
+            'pending': stats.get('pending') or 0,
+            'rejected': stats.get('rejected') or 0,
+            'high_priority': stats.get('high_priority') or 0,
+            'urgent': stats.get('urgent') or 0,
             'resolution_rate': round(resolution_rate, 2)
         })
     
@@ -249,7 +171,7 @@ class DepartmentMetricsListView(generics.ListAPIView):
         days = int(self.request.query_params.get('days', 30))
         start_date = timezone.now().date() - timedelta(days=days)
         
-        queryset = DepartmentMetrics.objects.filter(date__gte=start_date)
+        queryset = DepartmentMetrics.objects.filter(date__gte=start_date).select_related('department')
         
         if department_id:
             queryset = queryset.filter(department_id=department_id)
@@ -11,6 +11,8 @@ from typing import Dict, List, Optional, Tuple
 import requests
 from django.conf import settings
 
+from .language_detection import detect_language as detect_text_language
+
 logger = logging.getLogger(__name__)
 
 
@@ -70,27 +72,9 @@ class CivicAIVoiceAssistant:
             Language code (gu, hi, mr, pa, en)
         """
         try:
-            # Simple language detection based on script
-            # In production, use Google Translate API or langdetect library
-            
-            # Gujarati: ગુજરાતી script
-            if any('\u0A80' <= char <= '\u0AFF' for char in text):
-                return 'gu'
-            
-            # Devanagari (Hindi/Marathi): देवनागरी
-            if any('\u0900' <= char <= '\u097F' for char in text):
-                # Distinguish between Hindi and Marathi
-                marathi_markers = ['आहे', 'आहेत', 'होते', 'होती']
-                if any(marker in text for marker in marathi_markers):
-                    return 'mr'
-                return 'hi'
-            
-            # Gurmukhi (Punjabi): ਗੁਰਮੁਖੀ
-            if any('\u0A00' <= char <= '\u0A7F' for char in text):
-                return 'pa'
-            
-            # Default to English
-            return 'en'
+            # Offline script + n-gram detection; languages this assistant does not serve fall back to English
+            language = detect_text_language(text)
+            return language if language in self.SUPPORTED_LANGUAGES else 'en'
             
         except Exception as e:
             logger.error(f"Language detection failed: {str(e)}")
@@ -0,0 +1,282 @@
+"""
+Conversation Store for the SmartGriev Chatbot
+Chat sessions shared by every worker instead of living in one process's dict
+
+A conversation is a dict with ``language``, ``started_at``, ``complaint_data``,
+``summary`` (a running summary of the conversation, which stands in for turns
+that are no longer quoted in prompts) and ``history`` (a list of
+``{'user', 'bot', 'timestamp'}`` turns). Only the last
+CHATBOT_CONVERSATIONS['MAX_TURNS'] turns are kept, and a session expires after
+CHATBOT_CONVERSATIONS['TTL'] seconds without a new turn.
+
+- ``redis``: a meta hash and a capped list of msgpack-encoded turns per
+  session. Appends run as one MULTI/EXEC transaction (RPUSH, LTRIM, EXPIRE),
+  and a small per-process LRU serves hot sessions after a version check, so
+  a worker never re-reads a history it already holds.
+- ``memory``: a bounded in-process LRU, for development and single-worker
+  deployments. Also used when Redis is unreachable.
+"""
+import json
+import logging
+import threading
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from django.conf import settings
+
+from smartgriev.caching import LRUCache
+
+logger = logging.getLogger(__name__)
+
+try:
+    import msgpack
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    MSGPACK_AVAILABLE = False
+
+try:
+    from django_redis import get_redis_connection
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+_DEFAULTS = {
+    'BACKEND': 'redis',
+    'MAX_TURNS': 20,
+    'PROMPT_TURNS': 5,  # Recent turns quoted in the chat prompt
+    'TTL': 6 * 3600,  # seconds since the last turn
+    'LOCAL_CACHE_SIZE': 256,  # Hot sessions held per process (redis backend)
+    'MAX_SESSIONS': 10000,  # Sessions held by the memory backend
+    'CACHE_ALIAS': 'default',
+    'KEY_PREFIX': 'chat',
+}
+
+
+def conversation_options() -> Dict:
+    return {**_DEFAULTS, **getattr(settings, 'CHATBOT_CONVERSATIONS', {})}
+
+
+def pack(value: Any) -> bytes:
+    if MSGPACK_AVAILABLE:
+        return msgpack.packb(value, use_bin_type=True)
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def unpack(data: bytes) -> Any:
+    # Values written as JSON (by a worker without msgpack) start with '{'; msgpack maps never do
+    if data[:1] == b'{' or not MSGPACK_AVAILABLE:
+        return json.loads(data)
+    return msgpack.unpackb(data, raw=False)
+
+
+def new_conversation(language: str) -> Dict:
+    return {
+        'history': [],
+        'language': language,
+        'complaint_data': {},
+        'summary': '',
+        'started_at': datetime.now().isoformat(),
+    }
+
+
+class ConversationStore(ABC):
+    """Interface shared by the conversation backends"""
+
+    def __init__(self, options: Optional[Dict] = None):
+        self.options = {**conversation_options(), **(options or {})}
+        self.max_turns = self.options['MAX_TURNS']
+        self.ttl = self.options['TTL']
+
+    @abstractmethod
+    def create(self, session_id: str, language: str = 'en') -> Dict:
+        """Start (or restart) a session and return the new conversation"""
+        pass
+
+    @abstractmethod
+    def get(self, session_id: str) -> Optional[Dict]:
+        """
+        A private copy of the conversation, or None when it does not exist or
+        has expired. Changes to the copy are not stored: turns are added only
+        through append_turn, so callers must not also append to ``history``.
+        """
+        pass
+
+    @abstractmethod
+    def append_turn(self, session_id: str, turn: Dict, complaint_data: Optional[Dict] = None,
+                    summary: Optional[str] = None) -> None:
+        """
+        Atomically add a turn (dropping the oldest beyond MAX_TURNS) and
+        optionally replace complaint_data/summary
+        """
+        pass
+
+    @abstractmethod
+    def delete(self, session_id: str) -> None:
+        pass
+
+
+class InMemoryConversationStore(ConversationStore):
+    """Sessions in a bounded per-process LRU"""
+
+    def __init__(self, options: Optional[Dict] = None):
+        super().__init__(options)
+        self._sessions = LRUCache(max_entries=self.options['MAX_SESSIONS'], ttl=self.ttl)
+        self._lock = threading.Lock()
+
+    def create(self, session_id: str, language: str = 'en') -> Dict:
+        conversation = new_conversation(language)
+        self._sessions.set(session_id, conversation)
+        return conversation
+
+    def get(self, session_id: str) -> Optional[Dict]:
+        return self._sessions.get(session_id)
+
+    def append_turn(self, session_id: str, turn: Dict, complaint_data: Optional[Dict] = None,
+                    summary: Optional[str] = None) -> None:
+        with self._lock:
+            conversation = self._sessions.get(session_id) or new_conversation('en')
+            conversation['history'] = (conversation['history'] + [turn])[-self.max_turns:]
+            if complaint_data is not None:
+                conversation['complaint_data'] = complaint_data
+            if summary is not None:
+                conversation['summary'] = summary
+            self._sessions.set(session_id, conversation)
+
+    def delete(self, session_id: str) -> None:
+        self._sessions.delete(session_id)
+
+
+class RedisConversationStore(ConversationStore):
+    """
+    Sessions in Redis, shared by all workers.
+
+    ``<prefix>:<session>:meta`` is a hash of language, started_at, the packed
+    complaint_data and a version that every write increments;
+    ``<prefix>:<session>:turns`` is the capped list of packed turns. A local
+    copy is reused while its version matches the one in Redis. Redis errors
+    are logged and the session falls back to the in-process store.
+    """
+
+    def __init__(self, options: Optional[Dict] = None):
+        super().__init__(options)
+        self.prefix = self.options['KEY_PREFIX']
+        self.cache_alias = self.options['CACHE_ALIAS']
+        self.local = LRUCache(max_entries=self.options['LOCAL_CACHE_SIZE'], ttl=self.ttl)
+        self.fallback = InMemoryConversationStore(options)
+
+    @property
+    def redis(self):
+        return get_redis_connection(self.cache_alias)
+
+    def _keys(self, session_id: str):
+        return f'{self.prefix}:{session_id}:meta', f'{self.prefix}:{session_id}:turns'
+
+    def create(self, session_id: str, language: str = 'en') -> Dict:
+        conversation = new_conversation(language)
+        meta_key, turns_key = self._keys(session_id)
+        try:
+            pipe = self.redis.pipeline(transaction=True)
+            pipe.delete(meta_key, turns_key)
+            pipe.hset(meta_key, mapping={
+                'language': language,
+                'started_at': conversation['started_at'],
+                'complaint_data': pack({}),
+                'summary': '',
+                'version': 1,
+            })
+            pipe.expire(meta_key, self.ttl)
+            pipe.execute()
+        except Exception as e:
+            logger.warning(f"Conversation store write failed, keeping session {session_id} "
+                           f"in memory: {e}")
+            return self.fallback.create(session_id, language)
+        self.local.set(session_id, (1, conversation))
+        return conversation
+
+    def get(self, session_id: str) -> Optional[Dict]:
+        meta_key, turns_key = self._keys(session_id)
+        try:
+            version = self.redis.hget(meta_key, 'version')
+            if version is None:
+                return self.fallback.get(session_id)
+            version = int(version)
+            cached = self.local.get(session_id)
+            if cached is not None and cached[0] == version:
+                return cached[1]
+
+            pipe = self.redis.pipeline(transaction=True)
+            pipe.hgetall(meta_key)
+            pipe.lrange(turns_key, 0, -1)
+            meta, turns = pipe.execute()
+        except Exception as e:
+            logger.warning(f"Conversation store read failed for session {session_id}: {e}")
+            return self.fallback.get(session_id)
+        if not meta:
+            return None
+
+        meta = {key.decode(): value for key, value in meta.items()}
+        conversation = {
+            'history': [unpack(turn) for turn in turns],
+            'language': meta.get('language', b'en').decode(),
+            'complaint_data': unpack(meta['complaint_data']) if meta.get('complaint_data') else {},
+            'summary': meta.get('summary', b'').decode(),
+            'started_at': meta.get('started_at', b'').decode(),
+        }
+        self.local.set(session_id, (int(meta.get('version', version)), conversation))
+        return conversation
+
+    def append_turn(self, session_id: str, turn: Dict, complaint_data: Optional[Dict] = None,
+                    summary: Optional[str] = None) -> None:
+        meta_key, turns_key = self._keys(session_id)
+        try:
+            pipe = self.redis.pipeline(transaction=True)
+            pipe.rpush(turns_key, pack(turn))
+            pipe.ltrim(turns_key, -self.max_turns, -1)
+            if complaint_data is not None:
+                pipe.hset(meta_key, 'complaint_data', pack(complaint_data))
+            if summary is not None:
+                pipe.hset(meta_key, 'summary', summary)
+            pipe.hincrby(meta_key, 'version', 1)
+            pipe.expire(meta_key, self.ttl)
+            pipe.expire(turns_key, self.ttl)
+            results = pipe.execute()
+        except Exception as e:
+            logger.warning(f"Conversation store append failed for session {session_id}: {e}")
+            self.fallback.append_turn(session_id, turn, complaint_data, summary)
+            return
+
+        # Advance the local copy only if no other worker wrote in between
+        version = results[-3]  # HINCRBY, followed by the two EXPIREs
+        cached = self.local.get(session_id)
+        if cached is None or cached[0] != version - 1:
+            self.local.delete(session_id)
+            return
+        conversation = cached[1]
+        conversation['history'] = (conversation['history'] + [turn])[-self.max_turns:]
+        if complaint_data is not None:
+            conversation['complaint_data'] = complaint_data
+        if summary is not None:
+            conversation['summary'] = summary
+        self.local.set(session_id, (version, conversation))
+
+    def delete(self, session_id: str) -> None:
+        self.local.delete(session_id)
+        self.fallback.delete(session_id)
+        try:
+            self.redis.delete(*self._keys(session_id))
+        except Exception as e:
+            logger.warning(f"Conversation store delete failed for session {session_id}: {e}")
+
+
+def get_conversation_store(backend: Optional[str] = None,
+                           options: Optional[Dict] = None) -> ConversationStore:
+    """Conversation store for CHATBOT_CONVERSATIONS['BACKEND'] (or ``backend``)"""
+    backend = backend or conversation_options()['BACKEND']
+    if backend == 'redis':
+        if REDIS_AVAILABLE:
+            return RedisConversationStore(options)
+        logger.warning("django-redis is not installed; chat sessions are kept in process memory")
+    elif backend != 'memory':
+        logger.warning(f"Unknown conversation store backend '{backend}'; using memory")
+    return InMemoryConversationStore(options)
@@ -8,9 +8,14 @@ import json
 import logging
 import google.generativeai as genai
 from django.conf import settings
-from deep_translator import GoogleTranslator
 from datetime import datetime
 
+from smartgriev.keywords import get_matcher
+
+from .conversation_store import conversation_options, get_conversation_store
+from .prompt_builder import FewShotExample, PromptBuilder
+from .translation_memory import get_translation_memory
+
 logger = logging.getLogger(__name__)
 
 class GeminiChatbotService:
@@ -31,8 +36,12 @@ class GeminiChatbotService:
         self.pro_model = genai.GenerativeModel('gemini-1.5-pro')
         self.model = self.flash_model  # Default to Flash
         
-        # Conversation history storage
-        self.conversations = {}
+        # Conversation history storage, shared by all workers (CHATBOT_CONVERSATIONS)
+        self.store = get_conversation_store()
+        self.prompt_turns = conversation_options()['PROMPT_TURNS']
+        
+        # Translations go through the shared translation memory (cached, batched)
+        self.translation_memory = get_translation_memory()
         
         # Supported languages (12 Indian languages - from PDF spec)
         self.languages = {
@@ -59,8 +68,10 @@ class GeminiChatbotService:
             'sanitation': ['garbage', 'waste', 'कचरा', 'আবর্জনা', 'చెత్త', 'कचरा', 'குப்பை', 'કચરો', 'ಕಸ', 'മാലിന്യം', 'ਕੂੜਾ', 'کچرا', 'আবৰ্জনা', 'ଅଳିଆ'],
             'streetlights': ['streetlight', 'lamp', 'बत्ती', 'বাতি', 'దీపం', 'दिवा', 'விளக்கு', 'દીવો', 'ದೀಪ', 'വിളക്ക്', 'ਬੱਤੀ', 'بتی', 'লাইট', 'ବତୀ'],
         }
+        # All languages' keywords compiled into one matcher (scans the message once)
+        self.department_matcher = get_matcher(self.department_keywords)
         
-        # System prompt with few-shot learning (5 examples per department)
+        # System prompt; few-shot examples are added per request by the prompt builder
         self.system_prompt = """You are SmartGriev AI - a helpful assistant for India's civic grievance system.
 
 ROLE: Help citizens file complaints in 12 Indian languages (English, Hindi, Bengali, Telugu, Marathi, Tamil, Gujarati, Kannada, Malayalam, Punjabi, Urdu, Assamese, Odia)
@@ -77,65 +88,58 @@ DEPARTMENTS:
 9. Fire Safety - Fire hazards, safety concerns
 10. Other - Miscellaneous civic issues
 
-FEW-SHOT EXAMPLES (Learn from these):
+GUIDELINES:
+✅ Respond in the SAME language as user
+✅ Be empathetic and professional
+✅ Ask ONE question at a time (max 2-3 sentences)
+✅ Extract: issue type, location, urgency (low/medium/high/urgent)
+✅ Classify into correct department
+✅ Confirm details before finalizing
+
+⚠️ Keep responses concise
+⚠️ Don't ask already answered questions
+⚠️ For RTL languages (Urdu), maintain proper text direction
+
+Respond naturally and helpfully."""
 
-Example 1 - Water Department:
+        # Few-shot examples; PromptBuilder picks the most relevant ones that fit the token budget
+        self.few_shot_examples = [
+            FewShotExample('water', 'hi', '''Example 1 - Water Department:
 User: "हमारे इलाके में 3 दिन से पानी नहीं आ रहा है"
 Department: water
 Urgency: high
 Location: (ask for specific area)
-Response: "मुझे समझ आ गया। यह एक गंभीर समस्या है। कृपया अपना क्षेत्र का नाम बताएं?"
-
-Example 2 - Electricity:
+Response: "मुझे समझ आ गया। यह एक गंभीर समस्या है। कृपया अपना क्षेत्र का नाम बताएं?"'''),
+            FewShotExample('electricity', 'en', '''Example 2 - Electricity:
 User: "Power cut from 2 days in Sector 15"
 Department: electricity
 Urgency: high  
 Location: Sector 15
-Response: "I understand the inconvenience. I'll help file this complaint. Can you specify the exact locality in Sector 15?"
-
-Example 3 - Roads:
+Response: "I understand the inconvenience. I'll help file this complaint. Can you specify the exact locality in Sector 15?"'''),
+            FewShotExample('roads', 'te', '''Example 3 - Roads:
 User: "రోడ్డు మీద పెద్ద గుంట ఉంది, ప్రమాదం కాబోతోంది"
 Department: roads
 Urgency: urgent
 Location: (ask for exact location)
-Response: "నేను అర్థం చేసుకున్నాను. ఇది తక్షణ శ్రద్ధ అవసరం. దయచేసి ఖచ్చితమైన ప్రదేశం చెప్పండి?"
-
-Example 4 - Sanitation:
+Response: "నేను అర్థం చేసుకున్నాను. ఇది తక్షణ శ్రద్ధ అవసరం. దయచేసి ఖచ్చితమైన ప్రదేశం చెప్పండి?"'''),
+            FewShotExample('sanitation', 'en', '''Example 4 - Sanitation:
 User: "Garbage not collected for 1 week, very bad smell"
 Department: sanitation
 Urgency: high
 Location: (ask for address)
-Response: "I apologize for this inconvenience. Let me help you file this complaint. Can you provide your street address?"
-
-Example 5 - Streetlights:
+Response: "I apologize for this inconvenience. Let me help you file this complaint. Can you provide your street address?"'''),
+            FewShotExample('streetlights', 'gu', '''Example 5 - Streetlights:
 User: "પોઈન્ટ રોડ પર સ્ટ્રીટલાઈટ કામ નથી કરતી, રાત્રે અંધારું રહે છે"
 Department: streetlights
 Urgency: medium
 Location: પોઈન્ટ રોડ (Point Road)
-Response: "હું સમજ્યો. આ સુરક્ષા સમસ્યા છે. કયા વિસ્તારમાં છે? પોઈન્ટ રોડ પર ક્યાં?"
-
-GUIDELINES:
-✅ Respond in the SAME language as user
-✅ Be empathetic and professional
-✅ Ask ONE question at a time (max 2-3 sentences)
-✅ Extract: issue type, location, urgency (low/medium/high/urgent)
-✅ Classify into correct department
-✅ Confirm details before finalizing
-
-⚠️ Keep responses concise
-⚠️ Don't ask already answered questions
-⚠️ For RTL languages (Urdu), maintain proper text direction
-
-Respond naturally and helpfully."""
+Response: "હું સમજ્યો. આ સુરક્ષા સમસ્યા છે. કયા વિસ્તારમાં છે? પોઈન્ટ રોડ પર ક્યાં?"'''),
+        ]
+        self.prompt_builder = PromptBuilder(self.system_prompt, self.few_shot_examples)
 
     def start_conversation(self, session_id: str, user_language: str = 'en') -> str:
         """Start a new conversation"""
-        self.conversations[session_id] = {
-            'history': [],
-            'language': user_language,
-            'complaint_data': {},
-            'started_at': datetime.now().isoformat()
-        }
+        self.store.create(session_id, user_language)
         
         greeting = self._get_greeting(user_language)
         return greeting
@@ -168,10 +172,10 @@ Respond naturally and helpfully."""
         """
         try:
             # Initialize conversation if not exists
-            if session_id not in self.conversations:
+            conversation = self.store.get(session_id)
+            if conversation is None:
                 self.start_conversation(session_id, user_language)
-            
-            conversation = self.conversations[session_id]
+                conversation = self.store.get(session_id)
             
             # Detect if message is in non-English language and translate for processing
             translated_message = user_message
@@ -179,44 +183,48 @@ Respond naturally and helpfully."""
             
             if user_language != 'en':
                 try:
-                    translator = GoogleTranslator(source='auto', target='en')
-                    translated_message = translator.translate(user_message)
+                    translated_message = self.translation_memory.translate(user_message, 'en')
                 except Exception as e:
                     logger.error(f"Translation error: {e}")
                     translated_message = user_message
             
-            # Build conversation context
-            prompt = self._build_prompt(conversation, user_message, translated_message)
+            # Classify department using keywords
+            department = self._classify_department(translated_message)
+            
+            # Build conversation context within the token budget
+            prompt, token_usage = self._build_prompt(
+                conversation, user_message, translated_message, department, user_language
+            )
             
-            # Auto-switch to Pro model for complex queries (>10k tokens)
-            token_estimate = len(prompt) // 4  # Rough estimate: 4 chars ≈ 1 token
-            selected_model = self.pro_model if token_estimate > 10000 else self.flash_model
+            # Auto-switch to Pro model only for prompts over CHATBOT_PROMPT['PRO_MODEL_TOKENS']
+            model_name = self.prompt_builder.select_model(token_usage)
+            selected_model = self.pro_model if model_name == 'pro' else self.flash_model
+            self.prompt_builder.record(token_usage, model_name)
             
             # Generate response using Gemini (Flash or Pro)
             response = selected_model.generate_content(prompt)
             bot_response = response.text
             
-            # Classify department using keywords
-            department = self._classify_department(translated_message)
-            
             # Translate response back to user's language if needed
             if user_language != 'en':
                 try:
-                    translator = GoogleTranslator(source='en', target=user_language)
-                    bot_response = translator.translate(bot_response)
+                    bot_response = self.translation_memory.translate(bot_response, user_language, source='en')
                 except Exception as e:
                     logger.error(f"Translation error: {e}")
             
             # Update conversation history
-            conversation['history'].append({
+            turn = {
                 'user': user_message,
                 'bot': bot_response,
                 'timestamp': datetime.now().isoformat()
-            })
+            }
             
-            # Extract complaint information using AI
-            complaint_data = self._extract_complaint_data(conversation)
-            conversation['complaint_data'] = complaint_data
+            # Update the extracted complaint fields from this turn only
+            complaint_data = self._extract_complaint_data(conversation, turn, translated_message)
+            summary = complaint_data.pop('summary', None)
+            if department != 'other':
+                complaint_data['department'] = department
+            self.store.append_turn(session_id, turn, complaint_data, summary)
             
             # Detect intent
             intent = self._detect_intent(user_message, translated_message)
@@ -226,7 +234,8 @@ Respond naturally and helpfully."""
                 'intent': intent,
                 'complaint_data': complaint_data,
                 'conversation_complete': self._is_conversation_complete(complaint_data),
-                'language': user_language
+                'language': user_language,
+                'token_usage': token_usage
             }
             
         except Exception as e:
@@ -244,63 +253,62 @@ Respond naturally and helpfully."""
         Classify complaint into department using keyword matching
         Supports 12 Indian languages
         """
-        message_lower = message.lower()
-        
-        # Score each department
-        department_scores = {}
-        for dept, keywords in self.department_keywords.items():
-            score = sum(1 for keyword in keywords if keyword in message_lower)
-            if score > 0:
-                department_scores[dept] = score
-        
         # Return department with highest score, default to 'other'
-        if department_scores:
-            return max(department_scores, key=department_scores.get)
-        return 'other'
+        department, _ = self.department_matcher.best(message)
+        return department or 'other'
     
-    def _build_prompt(self, conversation: dict, user_message: str, translated_message: str) -> str:
-        """Build prompt for Gemini with conversation history"""
-        
-        # Start with system prompt
-        prompt = self.system_prompt + "\n\n"
+    def _build_prompt(self, conversation: dict, user_message: str, translated_message: str,
+                      department: str = 'other', language: str = 'en') -> tuple:
+        """Build prompt for Gemini within the token budget; returns (prompt, token_usage)"""
         
-        # Add conversation history
-        if conversation['history']:
-            prompt += "Previous conversation:\n"
-            for turn in conversation['history'][-5:]:  # Last 5 turns
-                prompt += f"User: {turn['user']}\n"
-                prompt += f"Assistant: {turn['bot']}\n"
-            prompt += "\n"
-        
-        # Add current complaint data if any
+        # Conversation memory: running summary and current complaint data
+        memory = ""
+        if conversation.get('summary'):
+            memory += f"Conversation so far: {conversation['summary']}\n"
         if conversation['complaint_data']:
-            prompt += f"Current complaint information: {json.dumps(conversation['complaint_data'], indent=2)}\n\n"
+            memory += f"Current complaint information: {json.dumps(conversation['complaint_data'], ensure_ascii=False)}\n"
         
         # Add current user message
-        prompt += f"User's message: {user_message}\n"
+        message = f"User's message: {user_message}\n"
         if user_message != translated_message:
-            prompt += f"(Translated to English: {translated_message})\n"
+            message += f"(Translated to English: {translated_message})\n"
         
-        prompt += "\nRespond to the user in their language. If you have enough information to create the complaint, ask for confirmation and provide a summary."
+        message += "\nRespond to the user in their language. If you have enough information to create the complaint, ask for confirmation and provide a summary."
         
-        return prompt
+        history = [(turn['user'], turn['bot']) for turn in conversation['history']]
+        return self.prompt_builder.build(
+            message, memory.strip(), history, department, language, max_turns=self.prompt_turns
+        )
     
-    def _extract_complaint_data(self, conversation: dict) -> dict:
-        """Extract structured complaint data from conversation"""
+    def _extract_complaint_data(self, conversation: dict, turn: dict, translated_message: str = None) -> dict:
+        """
+        Update the structured complaint data with what the latest turn adds
         
-        complaint_data = conversation.get('complaint_data', {})
+        The fields extracted from earlier turns are passed to Gemini instead
+        of the earlier turns themselves, so the prompt does not grow with the
+        conversation.
+        """
+        
+        complaint_data = dict(conversation.get('complaint_data') or {})
         
-        # Analyze conversation to extract data
-        full_conversation = "\n".join([
-            f"User: {turn['user']}\nBot: {turn['bot']}"
-            for turn in conversation['history']
-        ])
+        latest_turn = f"User: {turn['user']}\n"
+        if translated_message and translated_message != turn['user']:
+            latest_turn += f"(Translated to English: {translated_message})\n"
+        latest_turn += f"Bot: {turn['bot']}"
         
         # Use Gemini to extract structured data
         try:
-            extraction_prompt = f"""Analyze this conversation and extract complaint information in JSON format:
+            extraction_prompt = f"""Update the complaint information with the latest message of a conversation, in JSON format.
+
+Summary of earlier messages: {conversation.get('summary') or '(none)'}
 
-{full_conversation}
+Complaint information from earlier messages:
+{json.dumps(complaint_data, ensure_ascii=False)}
+
+Latest message:
+{latest_turn}
+
+Keep earlier values unless the latest message adds to or corrects them.
 
 Extract:
 - title: Brief title of the complaint (max 100 chars)
@@ -309,6 +317,7 @@ Extract:
 - location: Where the issue is (address, area, landmark)
 - urgency: One of (low, medium, high, urgent)
 - has_enough_info: true/false if we have enough information to file the complaint
+- summary: The whole conversation so far in at most two sentences, updating the earlier summary
 
 Return ONLY valid JSON, no explanation."""
 
@@ -359,11 +368,10 @@ Return ONLY valid JSON, no explanation."""
     def get_conversation_summary(self, session_id: str) -> dict:
         """Get summary of conversation and extracted complaint data"""
         
-        if session_id not in self.conversations:
+        conversation = self.store.get(session_id)
+        if conversation is None:
             return {'error': 'Conversation not found'}
         
-        conversation = self.conversations[session_id]
-        
         return {
             'session_id': session_id,
             'language': conversation['language'],
@@ -375,8 +383,7 @@ Return ONLY valid JSON, no explanation."""
     
     def end_conversation(self, session_id: str):
         """End conversation and clean up"""
-        if session_id in self.conversations:
-            del self.conversations[session_id]
+        self.store.delete(session_id)
 
 
 # Singleton instance
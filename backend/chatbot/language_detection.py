@@ -0,0 +1,222 @@
+"""
+Offline Language Detection for SmartGriev
+Script histogram plus n-gram profiles; no network calls and no per-text state
+
+The 13 supported languages mostly have a script of their own, so the script
+decides: one pass maps every code point to its Unicode block and counts
+letters per script (vectorised with NumPy, so a batch of texts costs one
+histogram). Scripts shared by several languages are resolved with weighted
+n-gram profiles of frequent words and letters, matched in one scan by
+smartgriev.keywords:
+
+- Devanagari: Hindi or Marathi
+- Bengali-Assamese: Bengali or Assamese (ৰ/ৱ are Assamese-only letters)
+- Arabic: Urdu or Punjabi in Shahmukhi (reported as 'pa')
+
+Latin-script text is reported as English, which lets callers skip
+translation for it, unless its words read as romanized Hindi ("paani nahi
+aa raha hai"): such text is reported as 'hi' so that it is still translated.
+"""
+import re
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from smartgriev.keywords import get_matcher
+
+DEFAULT_LANGUAGE = 'en'
+
+# A non-Latin script is chosen when it has at least this share of the letters,
+# so English words inside an Indic message ("Sector 15", "pipeline") do not flip it
+MIN_SCRIPT_SHARE = 0.25
+
+# (first code point, last code point, script)
+_SCRIPT_RANGES = (
+    (0x0041, 0x005A, 'latin'),
+    (0x0061, 0x007A, 'latin'),
+    (0x00C0, 0x024F, 'latin'),
+    (0x0600, 0x06FF, 'arabic'),
+    (0x0750, 0x077F, 'arabic'),
+    (0x0900, 0x097F, 'devanagari'),
+    (0x0980, 0x09FF, 'bengali'),
+    (0x0A00, 0x0A7F, 'gurmukhi'),
+    (0x0A80, 0x0AFF, 'gujarati'),
+    (0x0B00, 0x0B7F, 'oriya'),
+    (0x0B80, 0x0BFF, 'tamil'),
+    (0x0C00, 0x0C7F, 'telugu'),
+    (0x0C80, 0x0CFF, 'kannada'),
+    (0x0D00, 0x0D7F, 'malayalam'),
+    (0xFB50, 0xFDFF, 'arabic'),
+    (0xFE70, 0xFEFF, 'arabic'),
+)
+
+SCRIPTS = ('other', 'latin', 'arabic', 'devanagari', 'bengali', 'gurmukhi', 'gujarati',
+           'oriya', 'tamil', 'telugu', 'kannada', 'malayalam')
+
+# Language for scripts used by a single supported language, and the default for shared ones
+SCRIPT_LANGUAGES = {
+    'latin': 'en',
+    'arabic': 'ur',
+    'devanagari': 'hi',
+    'bengali': 'bn',
+    'gurmukhi': 'pa',
+    'gujarati': 'gu',
+    'oriya': 'or',
+    'tamil': 'ta',
+    'telugu': 'te',
+    'kannada': 'kn',
+    'malayalam': 'ml',
+}
+
+# Weighted n-gram profiles for scripts shared by several languages. Frequent
+# function words, auxiliaries and letters that only one of the languages uses.
+PROFILES: Dict[str, Dict[str, Dict[str, float]]] = {
+    'devanagari': {
+        'hi': {
+            'है': 2, 'हैं': 2, 'नहीं': 3, 'रहा': 2, 'रही': 2,
+            'रहे': 2, 'क्या': 2, 'और': 1, 'लिए': 2, 'गया': 2,
+            'गई': 2, 'किया': 2, 'बहुत': 2, 'हमारे': 2,
+            'मेरे': 1, 'सड़क': 2, 'पानी': 2, 'बिजली': 1,
+            'कृपया': 1, 'से': 1, 'में': 1,
+        },
+        'mr': {
+            'आहे': 3, 'आहेत': 3, 'नाही': 3, 'होते': 2,
+            'होती': 2, 'आणि': 3, 'च्या': 2, 'मध्ये': 3,
+            'झाले': 2, 'झाली': 2, 'येत': 2, 'पाणी': 2,
+            'रस्ता': 2, 'वीज': 2, 'आमच्या': 3, 'ळ': 3,
+            'तक्रार': 2, 'कृपया': 1,
+        },
+    },
+    'bengali': {
+        'bn': {
+            'র': 2, 'হয়': 2, 'করা': 1, 'আমার': 2, 'আমাদের': 3,
+            'নেই': 3, 'এবং': 3, 'পানি': 2, 'জল': 1, 'রাস্তা': 2,
+            'বিদ্যুৎ': 1, 'দিন': 1, 'করে': 1,
+        },
+        'as': {
+            'ৰ': 4, 'ৱ': 4, 'নাই': 2, 'কৰা': 3, 'হৈছে': 3,
+            'আমাৰ': 3, 'এটা': 2, 'বুলি': 2, 'পানী': 2,
+            'ৰাস্তা': 3, 'আৰু': 3, 'দিয়ক': 2,
+        },
+    },
+    'arabic': {
+        'ur': {
+            'ہے': 2, 'ہیں': 2, 'میں': 2, 'نہیں': 2, 'اور': 2, 'کا': 1, 'کی': 1,
+            'کے': 1, 'سے': 1, 'کو': 1, 'ہمارے': 2, 'رہا': 2, 'رہی': 2,
+            'پانی': 1, 'بجلی': 1, 'براہ': 2,
+        },
+        'pa': {
+            'نوں': 4, 'وچ': 3, 'دا': 2, 'دی': 1, 'دے': 1, 'اے': 2, 'نئیں': 3,
+            'ساڈے': 4, 'ساڈا': 4, 'تسی': 3, 'ہور': 2, 'رہیا': 3, 'ہویا': 3,
+            'گیا اے': 3,
+        },
+    },
+}
+
+
+# Frequent romanized Hindi words that are not English words, and English function words
+# (content words such as "water" or "road" are left out: Hinglish uses them too).
+# Latin text is 'hi' when it has at least MIN_ROMANIZED_WORDS of the former and no fewer
+# of them than of the latter (a wrong 'hi' costs a translation, a wrong 'en' the meaning).
+ROMANIZED_HINDI_WORDS = frozenset({
+    'hai', 'hain', 'nahi', 'nahin', 'nhi', 'kya', 'kyun', 'kyon', 'kab', 'kaise', 'kahan',
+    'mera', 'meri', 'mere', 'hamara', 'hamari', 'hamare', 'humara', 'humare', 'aap', 'aapka',
+    'raha', 'rahi', 'rahe', 'gaya', 'gayi', 'gaye', 'hua', 'hui', 'hue', 'tha', 'thi', 'hoga',
+    'kar', 'karo', 'karke', 'kijiye', 'kiya', 'ki', 'ka', 'ke', 'ko', 'se', 'mein', 'mai', 'bhi',
+    'aur', 'bahut', 'bohot', 'kuch', 'koi', 'abhi', 'wala', 'wali', 'paani', 'pani', 'bijli',
+    'sadak', 'nali', 'kachra', 'gali', 'ghar', 'din', 'roz', 'kripya', 'shikayat',
+})
+ENGLISH_WORDS = frozenset({
+    'the', 'a', 'an', 'is', 'are', 'was', 'were', 'be', 'been', 'has', 'have', 'had', 'not',
+    'no', 'and', 'or', 'of', 'to', 'in', 'on', 'for', 'from', 'with', 'since', 'at', 'by',
+    'this', 'that', 'there', 'it', 'i', 'we', 'you', 'my', 'our', 'your', 'please', 'do',
+    'does', 'did', 'can', 'will', 'would', 'should', 'here', 'when', 'what',
+})
+MIN_ROMANIZED_WORDS = 2
+
+_LATIN_WORD = re.compile(r'[a-z]+')
+
+
+def _latin_language(text: str) -> str:
+    """'hi' for romanized Hindi, otherwise 'en'"""
+    hindi = english = 0
+    for word in _LATIN_WORD.findall(text.lower()):
+        if word in ROMANIZED_HINDI_WORDS:
+            hindi += 1
+        elif word in ENGLISH_WORDS:
+            english += 1
+    return 'hi' if hindi >= MIN_ROMANIZED_WORDS and hindi >= english else 'en'
+
+
+def _build_lookup():
+    edges, ids = [0], [0]
+    for start, end, script in _SCRIPT_RANGES:
+        if start > edges[-1]:
+            edges.append(start)
+        else:
+            edges[-1] = start
+            ids.pop()
+        ids.append(SCRIPTS.index(script))
+        edges.append(end + 1)
+        ids.append(0)
+    return np.asarray(edges, dtype=np.uint32), np.asarray(ids, dtype=np.intp)
+
+
+# Code point interval starts, and the script index of each interval
+_EDGES, _INTERVAL_SCRIPTS = _build_lookup()
+_LATIN = SCRIPTS.index('latin')
+_MATCHERS = {script: get_matcher(profiles) for script, profiles in PROFILES.items()}
+
+
+def script_histograms(texts: Sequence[str]) -> np.ndarray:
+    """Letters per script (columns in SCRIPTS order) for each text, in one vectorised pass"""
+    encoded = [(text or '').encode('utf-32-le') for text in texts]
+    lengths = np.fromiter((len(data) // 4 for data in encoded), dtype=np.intp, count=len(encoded))
+    code_points = np.frombuffer(b''.join(encoded), dtype=np.uint32)
+    scripts = _INTERVAL_SCRIPTS[np.searchsorted(_EDGES, code_points, side='right') - 1]
+    owners = np.repeat(np.arange(len(encoded)), lengths)
+    counts = np.bincount(owners * len(SCRIPTS) + scripts, minlength=len(encoded) * len(SCRIPTS))
+    return counts.reshape(len(encoded), len(SCRIPTS))
+
+
+def dominant_script(histogram: np.ndarray) -> Optional[str]:
+    """Script of one histogram row: the top non-Latin script if it is frequent enough, else Latin"""
+    letters = histogram[1:].sum()
+    if not letters:
+        return None
+    native = histogram.copy()
+    native[0] = native[_LATIN] = 0
+    top = int(native.argmax())
+    if native[top] and native[top] >= MIN_SCRIPT_SHARE * letters:
+        return SCRIPTS[top]
+    return 'latin' if histogram[_LATIN] else SCRIPTS[top]
+
+
+def _resolve(text: str, script: Optional[str], default: str) -> str:
+    if script is None:
+        return default
+    if script == 'latin':
+        return _latin_language(text)
+    matcher = _MATCHERS.get(script)
+    if matcher is not None:
+        language, _ = matcher.best(text)
+        if language:
+            return language
+    return SCRIPT_LANGUAGES[script]
+
+
+def detect_languages(texts: Sequence[str], default: str = DEFAULT_LANGUAGE) -> List[str]:
+    """Language code for each text; ``default`` for texts without letters"""
+    if not texts:
+        return []
+    histograms = script_histograms(texts)
+    return [_resolve(text, dominant_script(row), default) for text, row in zip(texts, histograms)]
+
+
+def detect_language(text: str, default: str = DEFAULT_LANGUAGE) -> str:
+    """Language code of ``text`` ('en', 'hi', 'mr', 'bn', 'as', 'ur', 'pa', 'gu', ...)"""
+    if not text:
+        return default
+    if text.isascii():
+        return default if not any(char.isalpha() for char in text) else _latin_language(text)
+    return detect_languages([text], default)[0]
@@ -0,0 +1 @@
+# Make this a Python package
@@ -0,0 +1 @@
+# Make this a Python package
\ No newline at end of file
@@ -0,0 +1,76 @@
+"""
+Management command to pre-translate the chatbot's fixed phrases into every supported language
+Run it at image build or deploy time; the translation memory then serves these phrases from
+the file without calling Google Translate
+"""
+import json
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from chatbot.translation_memory import (
+    DEEP_TRANSLATOR_AVAILABLE, LANGUAGES, TranslationMemory, split_segments, translation_options,
+)
+from chatbot.utils import canned_phrases
+
+
+class Command(BaseCommand):
+    help = 'Pre-translate canned chatbot phrases (templates, quick replies, errors) for the translation memory'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--languages',
+            nargs='+',
+            default=list(LANGUAGES),
+            help='Target languages (default: all supported)',
+        )
+        parser.add_argument(
+            '--output',
+            default=translation_options()['PHRASES_FILE'],
+            help='Phrase file to write (default: TRANSLATION_MEMORY PHRASES_FILE)',
+        )
+        parser.add_argument(
+            '--refresh',
+            action='store_true',
+            help='Translate every phrase again instead of keeping existing translations',
+        )
+
+    def handle(self, *args, **options):
+        if not DEEP_TRANSLATOR_AVAILABLE:
+            raise CommandError('deep-translator is not installed')
+
+        output = Path(options['output'])
+        existing = {}
+        if output.exists() and not options['refresh']:
+            with open(output, encoding='utf-8') as f:
+                existing = json.load(f)
+
+        # The memory resolves text segment by segment, so phrases are stored per segment
+        segments = list(dict.fromkeys(
+            segment.strip()
+            for phrase in canned_phrases()
+            for segment in split_segments(phrase)[::2]
+            if segment.strip()
+        ))
+        memory = TranslationMemory(options={'PHRASES_FILE': None})
+
+        phrases = dict(existing)
+        for language in options['languages']:
+            known = phrases.get(language, {})
+            missing = [segment for segment in segments if segment not in known]
+            translations = memory.translate_many(missing, language, source='en') if missing else []
+            known.update({
+                segment: translation for segment, translation in zip(missing, translations)
+                if translation != segment
+            })
+            phrases[language] = {segment: known[segment] for segment in segments if segment in known}
+            self.stdout.write(f"{language}: {len(phrases[language])}/{len(segments)} segments")
+
+        output.parent.mkdir(parents=True, exist_ok=True)
+        with open(output, 'w', encoding='utf-8') as f:
+            json.dump(phrases, f, ensure_ascii=False, indent=2)
+
+        stats = memory.get_stats()
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {output} ({stats['provider_calls']} translation requests)"
+        ))
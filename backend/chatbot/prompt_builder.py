@@ -0,0 +1,203 @@
+"""
+Token-Budgeted Prompt Builder for the SmartGriev Chatbot
+
+Every chat prompt is assembled within CHATBOT_PROMPT['TOKEN_BUDGET'] tokens:
+
+1. The instructions, the conversation memory (running summary and extracted
+   complaint fields) and the user's message are always included.
+2. Recent turns are added newest first, up to PROMPT_TURNS, while they fit.
+   Older turns are represented only by the memory.
+3. Few-shot examples are added by relevance (same department, then same
+   language) up to MAX_EXAMPLES, while they fit.
+
+Tokens are counted with the Gemini SentencePiece tokenizer when the Vertex AI
+SDK's local tokenizer is installed; otherwise with a per-script estimate
+that, unlike ``len(text) // 4``, weighs Indic and Arabic characters by their
+script. Each build reports its token usage per section.
+"""
+import logging
+import unicodedata
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from django.conf import settings
+
+from smartgriev.caching import PROMETHEUS_AVAILABLE
+
+logger = logging.getLogger(__name__)
+
+try:
+    from vertexai.preview import tokenization
+    LOCAL_TOKENIZER_AVAILABLE = True
+except ImportError:
+    LOCAL_TOKENIZER_AVAILABLE = False
+
+if PROMETHEUS_AVAILABLE:
+    from prometheus_client import Histogram
+
+    prompt_tokens = Histogram(
+        'smartgriev_chat_prompt_tokens',
+        'Tokens per chatbot prompt, by model',
+        ['model'],
+        buckets=(250, 500, 1000, 2000, 4000, 8000, 16000, 32000)
+    )
+
+_DEFAULTS = {
+    'TOKEN_BUDGET': 3000,
+    'PRO_MODEL_TOKENS': 10000,  # Prompts above this go to the pro model
+    'MAX_EXAMPLES': 2,
+    'TOKENIZER_MODEL': 'gemini-1.5-flash',
+}
+
+# Approximate tokens per character by script, used when no tokenizer is installed.
+# Deliberately on the high side so the budget is not overrun.
+_SCRIPT_TOKENS_PER_CHAR = (
+    (0x0900, 0x097F, 0.45),  # Devanagari
+    (0x0980, 0x0DFF, 0.6),   # Bengali, Gurmukhi, Gujarati, Odia, Tamil, Telugu, Kannada, Malayalam
+    (0x0600, 0x06FF, 0.45),  # Arabic (Urdu)
+)
+_ASCII_TOKENS_PER_CHAR = 0.3
+_OTHER_TOKENS_PER_CHAR = 0.5
+
+
+def prompt_options() -> Dict:
+    return {**_DEFAULTS, **getattr(settings, 'CHATBOT_PROMPT', {})}
+
+
+def estimate_tokens(text: str) -> int:
+    """Script-aware token estimate for text the tokenizer is not available for"""
+    total = 0.0
+    for char in text:
+        code = ord(char)
+        if code < 128:
+            total += _ASCII_TOKENS_PER_CHAR
+            continue
+        if unicodedata.category(char) in ('Mn', 'Mc'):  # Vowel signs and viramas mostly merge into the base letter
+            total += 0.1
+            continue
+        for start, end, weight in _SCRIPT_TOKENS_PER_CHAR:
+            if start <= code <= end:
+                total += weight
+                break
+        else:
+            total += _OTHER_TOKENS_PER_CHAR
+    return int(total) + 1 if text else 0
+
+
+class TokenCounter:
+    """Counts Gemini tokens, caching counts of recently seen texts"""
+
+    def __init__(self, model_name: Optional[str] = None):
+        model_name = model_name or prompt_options()['TOKENIZER_MODEL']
+        self._tokenizer = None
+        if LOCAL_TOKENIZER_AVAILABLE:
+            try:
+                self._tokenizer = tokenization.get_tokenizer_for_model(model_name)
+            except Exception as e:
+                logger.warning(f"Gemini tokenizer unavailable, estimating token counts: {e}")
+        self.method = 'tokenizer' if self._tokenizer is not None else 'estimate'
+        # History turns and examples are counted again on every call
+        self.count = lru_cache(maxsize=2048)(self._count)
+
+    def _count(self, text: str) -> int:
+        if not text:
+            return 0
+        if self._tokenizer is not None:
+            return self._tokenizer.count_tokens(text).total_tokens
+        return estimate_tokens(text)
+
+
+@dataclass
+class FewShotExample:
+    department: str
+    language: str
+    text: str
+
+
+class PromptBuilder:
+    """Assembles chat prompts within the token budget (see module docstring)"""
+
+    def __init__(self, instructions: str, examples: Sequence[FewShotExample],
+                 counter: Optional[TokenCounter] = None, options: Optional[Dict] = None):
+        self.options = {**prompt_options(), **(options or {})}
+        self.instructions = instructions
+        self.examples = list(examples)
+        self.counter = counter or TokenCounter()
+
+    def select_examples(self, department: str, language: str) -> List[FewShotExample]:
+        """Examples ordered by relevance to the message: department first, then language"""
+        return sorted(
+            self.examples,
+            key=lambda example: (example.department != department, example.language != language),
+        )
+
+    def build(self, message: str, memory: str = '', history: Sequence[Tuple[str, str]] = (),
+              department: str = 'other', language: str = 'en', max_turns: int = 5) -> Tuple[str, Dict]:
+        """
+        Prompt and token usage for one chat call.
+
+        ``history`` is the conversation as (user, assistant) pairs, oldest
+        first; ``memory`` summarises what the prompt does not quote.
+        """
+        count = self.counter.count
+        budget = self.options['TOKEN_BUDGET']
+        usage = {
+            'budget': budget,
+            'counter': self.counter.method,
+            'instructions': count(self.instructions),
+            'memory': count(memory),
+            'message': count(message),
+        }
+        used = usage['instructions'] + usage['memory'] + usage['message']
+
+        turns = []
+        history_tokens = 0
+        for user, assistant in reversed(list(history)[-max_turns:] if max_turns else []):
+            text = f"User: {user}\nAssistant: {assistant}\n"
+            tokens = count(text)
+            if used + history_tokens + tokens > budget:
+                break
+            turns.insert(0, text)
+            history_tokens += tokens
+        used += history_tokens
+
+        examples = []
+        example_tokens = 0
+        for example in self.select_examples(department, language)[:self.options['MAX_EXAMPLES']]:
+            tokens = count(example.text)
+            if used + example_tokens + tokens > budget:
+                continue
+            examples.append(example.text)
+            example_tokens += tokens
+        used += example_tokens
+
+        prompt = self.instructions + "\n\n"
+        if examples:
+            prompt += "FEW-SHOT EXAMPLES (Learn from these):\n\n" + "\n\n".join(examples) + "\n\n"
+        if memory:
+            prompt += memory + "\n\n"
+        if turns:
+            prompt += "Previous conversation:\n" + "".join(turns) + "\n"
+        prompt += message
+
+        usage.update({
+            'history': history_tokens,
+            'examples': example_tokens,
+            'total': used,
+            'turns_included': len(turns),
+            'turns_omitted': len(history) - len(turns),
+            'examples_included': len(examples),
+            'over_budget': used > budget,
+        })
+        return prompt, usage
+
+    def select_model(self, usage: Dict) -> str:
+        """'pro' for prompts over PRO_MODEL_TOKENS, otherwise 'flash'"""
+        return 'pro' if usage['total'] > self.options['PRO_MODEL_TOKENS'] else 'flash'
+
+    @staticmethod
+    def record(usage: Dict, model: str) -> None:
+        logger.debug(f"Chat prompt tokens ({model}): {usage}")
+        if PROMETHEUS_AVAILABLE:
+            prompt_tokens.labels(model=model).observe(usage['total'])
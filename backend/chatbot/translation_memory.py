@@ -0,0 +1,299 @@
+"""
+Translation Memory for SmartGriev Chat and Intake
+Translations are looked up before Google Translate is called, and misses are batched
+
+Text is split into segments (lines and sentences). When translating into
+English from an unspecified source language ('auto'), segments detected as
+English are kept as they are (romanized Hindi is detected as 'hi' and still
+translated); every other segment is resolved in order from:
+
+1. canned bot phrases pre-translated into every language
+   (``manage.py pretranslate_chat_phrases`` writes TRANSLATION_MEMORY['PHRASES_FILE']),
+2. the two-tier cache (in-process LRU, then Redis), keyed by language pair
+   and normalized text,
+3. optionally (FUZZY_THRESHOLD > 0, off by default) a fuzzy match against
+   recently translated segments of the same language pair, for segments of
+   FUZZY_MIN_CHARS or more. Only segments with exactly the same words,
+   differing in punctuation, spacing or word order, are candidates, so a
+   different number or an added or dropped negation ("not", "नहीं") never
+   reuses a translation; the match also needs a similarity of at least
+   FUZZY_THRESHOLD,
+4. Google Translate. All remaining segments are sent together, several per
+   request, and the results are stored in the memory.
+
+Provider failures return the untranslated segment and are not cached.
+"""
+import difflib
+import json
+import logging
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from django.conf import settings
+
+from smartgriev.caching import PROMETHEUS_AVAILABLE, TwoTierCache, normalize_text
+
+from .language_detection import detect_language
+
+logger = logging.getLogger(__name__)
+
+try:
+    from deep_translator import GoogleTranslator
+    DEEP_TRANSLATOR_AVAILABLE = True
+except ImportError:
+    DEEP_TRANSLATOR_AVAILABLE = False
+
+if PROMETHEUS_AVAILABLE:
+    from prometheus_client import Counter
+
+    translation_lookups = Counter(
+        'smartgriev_translation_segments_total',
+        'Translated segments by where the translation came from',
+        ['source']
+    )
+
+# Languages the chatbot answers in besides English
+LANGUAGES = ('hi', 'bn', 'te', 'mr', 'ta', 'gu', 'kn', 'ml', 'pa', 'ur', 'as', 'or')
+
+_DEFAULTS = {
+    'TTL': 30 * 86400,  # seconds
+    'LOCAL_MAX_ENTRIES': 4096,
+    'FUZZY_THRESHOLD': 0,  # Minimum similarity of a fuzzy match; 0 disables fuzzy matches
+    'FUZZY_MIN_CHARS': 24,  # Shorter segments must match exactly
+    'FUZZY_INDEX_SIZE': 2048,  # Recent segments kept per language pair for fuzzy matching
+    'MAX_BATCH_CHARS': 4500,  # Google Translate accepts up to 5000 characters per request
+    'PHRASES_FILE': os.path.join(settings.BASE_DIR, 'translations', 'chat_phrases.json'),
+}
+
+# Segment boundaries: line breaks, and whitespace after sentence-ending punctuation (incl. danda)
+_SEGMENT_BOUNDARY = re.compile(r'(\s*\n\s*|(?<=[.!?।॥])\s+)')
+_WORDS = re.compile(r'\w+')
+
+
+def translation_options() -> Dict:
+    return {**_DEFAULTS, **getattr(settings, 'TRANSLATION_MEMORY', {})}
+
+
+def split_segments(text: str) -> List[str]:
+    """Alternating segments and separators; ''.join(parts) == text"""
+    return _SEGMENT_BOUNDARY.split(text)
+
+
+def word_signature(key: str) -> Tuple[str, ...]:
+    """The distinct words of a normalized segment, ignoring punctuation, spacing and order"""
+    return tuple(sorted(set(_WORDS.findall(key))))
+
+
+class TranslationMemory:
+    """Cached, batched translation (see module docstring)"""
+
+    def __init__(self, options: Optional[Dict] = None):
+        self.options = {**translation_options(), **(options or {})}
+        self.cache = TwoTierCache(
+            'translation',
+            max_entries=self.options['LOCAL_MAX_ENTRIES'],
+            ttl=self.options['TTL'],
+        )
+        self.phrases = self._load_phrases(self.options['PHRASES_FILE'])
+        # (source, target) -> {word signature: (normalized segment, translation)}
+        self._fuzzy_index: Dict[Tuple[str, str], OrderedDict] = {}
+        self._translators: Dict[Tuple[str, str], 'GoogleTranslator'] = {}
+        self._lock = threading.Lock()
+        self.stats = {
+            'skipped': 0, 'phrase': 0, 'cache': 0, 'fuzzy': 0, 'provider': 0, 'provider_calls': 0, 'failed': 0,
+        }
+
+    @staticmethod
+    def _load_phrases(path: str) -> Dict[str, Dict[str, str]]:
+        """{language: {normalized English segment: translation}}"""
+        if not path:
+            return {}
+        try:
+            with open(path, encoding='utf-8') as f:
+                phrases = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not load pre-translated chat phrases from {path}: {e}")
+            return {}
+        return {
+            language: {normalize_text(text): translation for text, translation in translations.items()}
+            for language, translations in phrases.items()
+        }
+
+    # ------------------------------------------------------------------ lookup
+
+    def translate(self, text: str, target: str, source: str = 'auto') -> str:
+        return self.translate_many([text], target, source)[0]
+
+    def translate_many(self, texts: Sequence[str], target: str, source: str = 'auto') -> List[str]:
+        """Translate several texts, resolving their segments together"""
+        if source == target:
+            return list(texts)
+        split = [split_segments(text or '') for text in texts]
+
+        resolved: Dict[str, str] = {}
+        pending: Dict[str, str] = {}  # normalized key -> first segment seen with it
+        for parts in split:
+            for segment in parts[::2]:
+                key = normalize_text(segment)
+                if not key or key in resolved or key in pending:
+                    continue
+                if target == 'en' and source == 'auto' and detect_language(segment) == 'en':
+                    resolved[key] = segment
+                    self._record('skipped')
+                    continue
+                translation, origin = self._lookup(key, source, target)
+                if translation is None:
+                    pending[key] = segment
+                else:
+                    resolved[key] = translation
+                    self._record(origin)
+
+        if pending:
+            segments = list(pending.values())
+            for key, segment, translation in zip(pending, segments, self._translate_remote(segments, source, target)):
+                if translation is None:
+                    resolved[key] = segment
+                    self._record('failed')
+                    continue
+                resolved[key] = translation
+                self.cache.set(self._key(source, target, key), translation)
+                self._remember(source, target, key, translation)
+                self._record('provider')
+
+        results = []
+        for parts in split:
+            results.append(''.join(
+                resolved.get(normalize_text(part), part) if i % 2 == 0 else part
+                for i, part in enumerate(parts)
+            ))
+        return results
+
+    def _lookup(self, key: str, source: str, target: str) -> Tuple[Optional[str], str]:
+        if source in ('en', 'auto'):
+            translation = self.phrases.get(target, {}).get(key)
+            if translation is not None:
+                return translation, 'phrase'
+
+        translation = self.cache.get(self._key(source, target, key))
+        if translation is not None:
+            self._remember(source, target, key, translation)
+            return translation, 'cache'
+
+        translation = self._fuzzy_lookup(source, target, key)
+        if translation is not None:
+            return translation, 'fuzzy'
+        return None, 'miss'
+
+    def _key(self, source: str, target: str, key: str) -> str:
+        return self.cache.make_key(source, target, key)
+
+    # ------------------------------------------------------------------ fuzzy
+
+    def _remember(self, source: str, target: str, key: str, translation: str) -> None:
+        if not self.options['FUZZY_THRESHOLD'] or len(key) < self.options['FUZZY_MIN_CHARS']:
+            return
+        signature = word_signature(key)
+        with self._lock:
+            index = self._fuzzy_index.setdefault((source, target), OrderedDict())
+            index[signature] = (key, translation)
+            index.move_to_end(signature)
+            while len(index) > self.options['FUZZY_INDEX_SIZE']:
+                index.popitem(last=False)
+
+    def _fuzzy_lookup(self, source: str, target: str, key: str) -> Optional[str]:
+        threshold = self.options['FUZZY_THRESHOLD']
+        if not threshold or len(key) < self.options['FUZZY_MIN_CHARS']:
+            return None
+        # Only a segment with the same words can match: a near-identical string
+        # that differs in one word ("is" / "is not", "15" / "16") means something else
+        with self._lock:
+            entry = self._fuzzy_index.get((source, target), {}).get(word_signature(key))
+        if entry is None:
+            return None
+        candidate, translation = entry
+        if difflib.SequenceMatcher(None, candidate, key, autojunk=False).ratio() < threshold:
+            return None
+        return translation
+
+    # --------------------------------------------------------------- provider
+
+    def _translator(self, source: str, target: str) -> 'GoogleTranslator':
+        with self._lock:
+            translator = self._translators.get((source, target))
+            if translator is None:
+                translator = self._translators[(source, target)] = GoogleTranslator(source=source, target=target)
+            return translator
+
+    def _batches(self, segments: List[str]) -> List[List[str]]:
+        """Group segments into requests of at most MAX_BATCH_CHARS (joined by newlines)"""
+        batches, batch, size = [], [], 0
+        for segment in segments:
+            if batch and size + len(segment) + 1 > self.options['MAX_BATCH_CHARS']:
+                batches.append(batch)
+                batch, size = [], 0
+            batch.append(segment)
+            size += len(segment) + 1
+        if batch:
+            batches.append(batch)
+        return batches
+
+    def _translate_remote(self, segments: List[str], source: str, target: str) -> List[Optional[str]]:
+        """Provider translations in input order; None where translation failed"""
+        if not DEEP_TRANSLATOR_AVAILABLE:
+            return [None] * len(segments)
+        translator = self._translator(source, target)
+        results: List[Optional[str]] = []
+        for batch in self._batches(segments):
+            try:
+                self.stats['provider_calls'] += 1
+                lines = (translator.translate('\n'.join(batch)) or '').split('\n')
+                if len(lines) == len(batch):
+                    results.extend(line.strip() or None for line in lines)
+                    continue
+                # Line breaks were not preserved; fall back to one request per segment
+                logger.debug(f"Batched translation returned {len(lines)} lines for {len(batch)} segments")
+            except Exception as e:
+                logger.error(f"Translation error: {e}")
+            for segment in batch:
+                try:
+                    self.stats['provider_calls'] += 1
+                    results.append(translator.translate(segment) or None)
+                except Exception as e:
+                    logger.error(f"Translation error: {e}")
+                    results.append(None)
+        return results
+
+    # ---------------------------------------------------------------- metrics
+
+    def _record(self, origin: str) -> None:
+        self.stats[origin] += 1
+        if PROMETHEUS_AVAILABLE:
+            translation_lookups.labels(source=origin).inc()
+
+    def get_stats(self) -> Dict:
+        stats = dict(self.stats)
+        local = stats['skipped'] + stats['phrase'] + stats['cache'] + stats['fuzzy']
+        segments = local + stats['provider'] + stats['failed']
+        stats['hit_rate'] = local / segments * 100 if segments else 0
+        stats['phrases'] = {language: len(phrases) for language, phrases in self.phrases.items()}
+        stats['cache_tiers'] = self.cache.get_stats()
+        return stats
+
+
+_global_translation_memory: Optional[TranslationMemory] = None
+_global_translation_memory_lock = threading.Lock()
+
+
+def get_translation_memory() -> TranslationMemory:
+    """Process-wide translation memory"""
+    global _global_translation_memory
+    if _global_translation_memory is None:
+        with _global_translation_memory_lock:
+            if _global_translation_memory is None:
+                _global_translation_memory = TranslationMemory()
+    return _global_translation_memory
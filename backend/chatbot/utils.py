@@ -9,13 +9,24 @@ from enum import Enum
 from typing import Dict, List, Optional, Any
 import logging
 import spacy
-from deep_translator import GoogleTranslator
+
+from smartgriev.keywords import get_matcher
+
+from .language_detection import detect_language as detect_text_language
+from .translation_memory import get_translation_memory
 
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
 
+ERROR_MESSAGE = "I'm experiencing some technical difficulties. Please try again or contact support."
+ESCALATION_MESSAGE = (
+    "I understand this is a complex issue. Let me connect you with a human support agent "
+    "who can provide specialized assistance."
+)
+
+
 # Enums for type safety
 class Intent(Enum):
     GREETING = "greeting"
@@ -141,10 +152,10 @@ class ResponseGeneratorInterface(ABC):
 
 # Concrete Implementations
 class GoogleTranslatorService(TranslatorInterface):
-    """Google Translator implementation using deep-translator"""
+    """Google Translator implementation using deep-translator, through the shared translation memory"""
     
     def __init__(self):
-        self.language_cache = {}
+        self.memory = get_translation_memory()
     
     def translate(self, text: str, target_language: str) -> str:
         """Translate text using Google Translate API via deep-translator"""
@@ -152,23 +163,16 @@ class GoogleTranslatorService(TranslatorInterface):
             if target_language == "en" or not text:
                 return text
             
-            translated = GoogleTranslator(source='auto', target=target_language).translate(text)
+            translated = self.memory.translate(text, target_language)
             return translated if translated else text
         except Exception as e:
             logger.error(f"Translation error: {e}")
             return text
     
     def detect_language(self, text: str) -> str:
-        """Detect language - deep-translator doesn't have detection, default to 'en'"""
+        """Detect language offline from the script and n-gram profiles (see chatbot.language_detection)"""
         try:
-            if text in self.language_cache:
-                return self.language_cache[text]
-            
-            # deep-translator doesn't have language detection
-            # Default to English or use a simple heuristic
-            language = "en"  # Default
-            self.language_cache[text] = language
-            return language
+            return detect_text_language(text)
         except Exception as e:
             logger.error(f"Language detection error: {e}")
             return "en"
@@ -237,76 +241,66 @@ class SpacyNLPProcessor(NLPProcessorInterface):
             return []
 
 
+URGENCY_MATCHER = get_matcher({
+    Priority.CRITICAL.value: ['emergency', 'urgent', 'critical', 'immediate', 'dangerous', 'safety', 'life', 'death'],
+    Priority.HIGH.value: ['serious', 'major', 'important', 'significant', 'severe'],
+    Priority.MEDIUM.value: ['moderate', 'concerning', 'issue', 'problem']
+})
+
+CATEGORY_MATCHER = get_matcher({
+    Category.INFRASTRUCTURE.value: ['road', 'bridge', 'building', 'construction', 'repair', 'maintenance'],
+    Category.ENVIRONMENT.value: ['pollution', 'noise', 'air', 'water', 'waste', 'garbage', 'trash'],
+    Category.TRANSPORTATION.value: ['bus', 'traffic', 'parking', 'vehicle', 'transport', 'metro'],
+    Category.HEALTH.value: ['hospital', 'medical', 'health', 'clinic', 'doctor', 'medicine'],
+    Category.EDUCATION.value: ['school', 'teacher', 'education', 'student', 'college', 'university'],
+    Category.PUBLIC_SERVICES.value: ['electricity', 'power', 'water', 'gas', 'internet', 'phone']
+})
+
+
 class ComplaintAnalyzer(ComplaintAnalyzerInterface):
     """Analyzes complaint-specific content"""
     
     def analyze_urgency(self, message: str) -> str:
         """Analyze urgency level based on keywords"""
-        message_lower = message.lower()
-        
-        urgency_keywords = {
-            Priority.CRITICAL: ['emergency', 'urgent', 'critical', 'immediate', 'dangerous', 'safety', 'life', 'death'],
-            Priority.HIGH: ['serious', 'major', 'important', 'significant', 'severe'],
-            Priority.MEDIUM: ['moderate', 'concerning', 'issue', 'problem']
-        }
-        
-        for priority, keywords in urgency_keywords.items():
-            if any(keyword in message_lower for keyword in keywords):
-                return priority.value
-        
-        return Priority.LOW.value
+        priority = URGENCY_MATCHER.first_label(message)
+        return priority or Priority.LOW.value
     
     def extract_category(self, message: str) -> Optional[str]:
         """Extract complaint category from message content"""
-        message_lower = message.lower()
-        
-        category_keywords = {
-            Category.INFRASTRUCTURE: ['road', 'bridge', 'building', 'construction', 'repair', 'maintenance'],
-            Category.ENVIRONMENT: ['pollution', 'noise', 'air', 'water', 'waste', 'garbage', 'trash'],
-            Category.TRANSPORTATION: ['bus', 'traffic', 'parking', 'vehicle', 'transport', 'metro'],
-            Category.HEALTH: ['hospital', 'medical', 'health', 'clinic', 'doctor', 'medicine'],
-            Category.EDUCATION: ['school', 'teacher', 'education', 'student', 'college', 'university'],
-            Category.PUBLIC_SERVICES: ['electricity', 'power', 'water', 'gas', 'internet', 'phone']
-        }
-        
-        for category, keywords in category_keywords.items():
-            if any(keyword in message_lower for keyword in keywords):
-                return category.value
-        
-        return None
+        return CATEGORY_MATCHER.first_label(message)
 
 
 class SmartResponseGenerator(ResponseGeneratorInterface):
     """Intelligent response generator with context awareness"""
     
+    RESPONSE_TEMPLATES = {
+        Intent.GREETING.value: "Hello! I'm here to help you with your complaints and inquiries. How can I assist you today?",
+        Intent.COMPLAINT_FILING.value: "I'll help you file a complaint. Could you please tell me what type of issue you're experiencing?",
+        Intent.COMPLAINT_STATUS.value: "I can help you check your complaint status. Do you have your complaint ID, or would you like me to search by other details?",
+        Intent.HELP.value: "I'm here to help! I can assist you with filing complaints, checking status, or answering questions about our services. What would you like to know?",
+        Intent.GRATITUDE.value: "You're welcome! Is there anything else I can help you with today?",
+        Intent.FAREWELL.value: "Thank you for contacting us. Have a great day! Feel free to reach out if you need further assistance.",
+        Intent.UNKNOWN.value: "I want to make sure I understand you correctly. Could you please rephrase your question or tell me how I can help you today?"
+    }
+    QUICK_REPLIES = {
+        Intent.GREETING.value: ["File a new complaint", "Check complaint status", "Get help"],
+        Intent.COMPLAINT_FILING.value: ["Infrastructure issue", "Environmental concern", "Public service problem", "Other issue"],
+        Intent.COMPLAINT_STATUS.value: ["I have complaint ID", "I don't have complaint ID", "Check recent complaints"],
+        Intent.HELP.value: ["How to file complaint", "Complaint tracking", "Contact support", "FAQ"]
+    }
+    DEFAULT_QUICK_REPLIES = ["Yes", "No", "Get help"]
+    
     def __init__(self, translator: TranslatorInterface):
         self.translator = translator
         
     def generate_response(self, intent: str, context: ConversationContext, language: str) -> str:
         """Generate contextual response based on intent"""
-        response_templates = {
-            Intent.GREETING.value: "Hello! I'm here to help you with your complaints and inquiries. How can I assist you today?",
-            Intent.COMPLAINT_FILING.value: "I'll help you file a complaint. Could you please tell me what type of issue you're experiencing?",
-            Intent.COMPLAINT_STATUS.value: "I can help you check your complaint status. Do you have your complaint ID, or would you like me to search by other details?",
-            Intent.HELP.value: "I'm here to help! I can assist you with filing complaints, checking status, or answering questions about our services. What would you like to know?",
-            Intent.GRATITUDE.value: "You're welcome! Is there anything else I can help you with today?",
-            Intent.FAREWELL.value: "Thank you for contacting us. Have a great day! Feel free to reach out if you need further assistance.",
-            Intent.UNKNOWN.value: "I want to make sure I understand you correctly. Could you please rephrase your question or tell me how I can help you today?"
-        }
-        
-        message = response_templates.get(intent, response_templates[Intent.UNKNOWN.value])
+        message = self.RESPONSE_TEMPLATES.get(intent, self.RESPONSE_TEMPLATES[Intent.UNKNOWN.value])
         return self.translator.translate(message, language)
     
     def generate_quick_replies(self, intent: str) -> List[str]:
         """Generate quick reply options based on intent"""
-        quick_replies = {
-            Intent.GREETING.value: ["File a new complaint", "Check complaint status", "Get help"],
-            Intent.COMPLAINT_FILING.value: ["Infrastructure issue", "Environmental concern", "Public service problem", "Other issue"],
-            Intent.COMPLAINT_STATUS.value: ["I have complaint ID", "I don't have complaint ID", "Check recent complaints"],
-            Intent.HELP.value: ["How to file complaint", "Complaint tracking", "Contact support", "FAQ"]
-        }
-        
-        return quick_replies.get(intent, ["Yes", "No", "Get help"])
+        return self.QUICK_REPLIES.get(intent, self.DEFAULT_QUICK_REPLIES)
 
 
 class ConversationFlowManager:
@@ -409,7 +403,7 @@ class ConversationFlowManager:
     
     def _create_error_response(self, language: str = "en") -> ChatbotResponse:
         """Create error response when processing fails"""
-        message = "I'm experiencing some technical difficulties. Please try again or contact support."
+        message = ERROR_MESSAGE
         if language != "en":
             message = self.translator.translate(message, language)
         
@@ -429,6 +423,15 @@ class ConversationFlowManager:
         )
 
 
+def canned_phrases() -> List[str]:
+    """Fixed bot phrases, pre-translated by ``manage.py pretranslate_chat_phrases``"""
+    phrases = list(SmartResponseGenerator.RESPONSE_TEMPLATES.values())
+    for replies in list(SmartResponseGenerator.QUICK_REPLIES.values()) + [SmartResponseGenerator.DEFAULT_QUICK_REPLIES]:
+        phrases.extend(replies)
+    phrases.extend([ERROR_MESSAGE, ESCALATION_MESSAGE, 'Contact Support', 'Try Again'])
+    return list(dict.fromkeys(phrases))
+
+
 # Legacy function wrappers for backward compatibility
 def translate_text(text: str, target_language: str) -> str:
     """Legacy function wrapper"""
@@ -506,7 +509,7 @@ def manage_conversation_flow(message: str, conversation_history: List[Dict[str,
 
 def get_escalation_message(language: str) -> str:
     """Get escalation message in specified language"""
-    message = "I understand this is a complex issue. Let me connect you with a human support agent who can provide specialized assistance."
+    message = ESCALATION_MESSAGE
     translator = GoogleTranslatorService()
     return translator.translate(message, language)
 
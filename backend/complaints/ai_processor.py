@@ -10,6 +10,10 @@ import tempfile
 import json
 from typing import Dict, Any, Optional, List
 
+from django.conf import settings
+
+from smartgriev.concurrency import run_blocking
+
 # Try to import Groq, but make it optional
 try:
     from groq import Groq
@@ -31,6 +35,11 @@ except ImportError:
 logger = logging.getLogger(__name__)
 
 
+async def _none():
+    """Placeholder awaitable for optional stages passed to asyncio.gather"""
+    return None
+
+
 class AdvancedAIProcessor:
     """
     Advanced AI processor supporting multi-modal complaint processing
@@ -78,6 +87,14 @@ class AdvancedAIProcessor:
             self.supported_audio_formats = ['.wav', '.mp3', '.flac', '.ogg']
             self.supported_image_formats = ['.jpg', '.jpeg', '.png', '.bmp']
     
+    async def _chat_completion(self, **kwargs):
+        """Groq chat completion run on the bounded executor so it never blocks the event loop"""
+        return await run_blocking(
+            self.groq_client.chat.completions.create,
+            timeout=getattr(settings, 'AI_REQUEST_TIMEOUT', 30),
+            **kwargs
+        )
+    
     async def process_audio_to_text(self, audio_file_path: str, language: str = 'hi-IN') -> Optional[str]:
         """
         Convert audio file to text using speech recognition
@@ -88,24 +105,37 @@ class AdvancedAIProcessor:
                 logger.warning("Speech recognition not available")
                 return None
             
+            # File decoding and the recognizer's web request are blocking
+            return await run_blocking(self._transcribe_audio, audio_file_path, language)
+            
+        except Exception as e:
+            logger.error(f"Audio processing failed: {e}")
+            return None
+    
+    def _transcribe_audio(self, audio_file_path: str, language: str) -> Optional[str]:
+        """Blocking speech recognition; runs on the executor"""
+        try:
             if not os.path.exists(audio_file_path):
                 logger.error(f"Audio file not found: {audio_file_path}")
                 return None
             
+            # Recognizer state (energy threshold) is per call, so concurrent calls don't interfere
+            recognizer = sr.Recognizer()
+            
             # Use speech recognition library
             with sr.AudioFile(audio_file_path) as source:
                 # Adjust for ambient noise
-                self.speech_recognizer.adjust_for_ambient_noise(source, duration=1)
+                recognizer.adjust_for_ambient_noise(source, duration=1)
                 
                 # Record audio data
-                audio_data = self.speech_recognizer.record(source)
+                audio_data = recognizer.record(source)
                 
                 # Try multiple recognition engines
                 text_results = []
                 
                 # Try Google Web Speech API (supports Hindi)
                 try:
-                    text = self.speech_recognizer.recognize_google(
+                    text = recognizer.recognize_google(
                         audio_data, 
                         language=language
                     )
@@ -116,7 +146,7 @@ class AdvancedAIProcessor:
                 # Try Sphinx (offline, English only)
                 if language.startswith('en'):
                     try:
-                        text = self.speech_recognizer.recognize_sphinx(audio_data)
+                        text = recognizer.recognize_sphinx(audio_data)
                         text_results.append(("Sphinx", text))
                     except Exception as e:
                         logger.warning(f"Sphinx Recognition failed: {e}")
@@ -199,7 +229,7 @@ Return only the enhanced complaint text, nothing else."""
                 logger.warning("AI enhancement not available, returning original text")
                 return original_text
             
-            response = self.groq_client.chat.completions.create(
+            response = await self._chat_completion(
                 model="llama-3.1-8b-instant",  # Updated to latest supported model
                 messages=[
                     {"role": "system", "content": system_prompt},
@@ -243,7 +273,7 @@ Return valid JSON only."""
                 logger.warning("AI entity extraction not available, returning empty dict")
                 return {}
             
-            response = self.groq_client.chat.completions.create(
+            response = await self._chat_completion(
                 model="llama-3.1-8b-instant",  # Updated to latest supported model
                 messages=[
                     {"role": "system", "content": system_prompt},
@@ -290,7 +320,7 @@ Return valid JSON only."""
                     "confidence": 0.5
                 }
             
-            response = self.groq_client.chat.completions.create(
+            response = await self._chat_completion(
                 model="llama-3.1-8b-instant",  # Updated to latest supported model
                 messages=[
                     {"role": "system", "content": system_prompt},
@@ -344,19 +374,19 @@ Return valid JSON only."""
                 "success": False
             }
             
-            # Process audio if provided
-            if audio_path:
-                audio_text = await self.process_audio_to_text(audio_path)
-                if audio_text:
-                    processing_result["audio_text"] = audio_text
-                    text += f" {audio_text}"
+            # Audio and image are independent, so process them concurrently
+            audio_text, image_analysis = await asyncio.gather(
+                self.process_audio_to_text(audio_path) if audio_path else _none(),
+                self.process_image_with_context(image_path) if image_path else _none()
+            )
+            
+            if audio_text:
+                processing_result["audio_text"] = audio_text
+                text += f" {audio_text}"
             
-            # Process image if provided
-            if image_path:
-                image_analysis = await self.process_image_with_context(image_path)
-                if image_analysis:
-                    processing_result["image_analysis"] = image_analysis
-                    text += f" {image_analysis}"
+            if image_analysis:
+                processing_result["image_analysis"] = image_analysis
+                text += f" {image_analysis}"
             
             # Update processed text
             processing_result["processed_text"] = text
@@ -366,9 +396,11 @@ Return valid JSON only."""
                 enhanced_text = await self.enhance_complaint_text(text, location=location)
                 processing_result["enhanced_text"] = enhanced_text
                 
-                # Extract entities and analyze sentiment
-                entities = await self.extract_entities_and_keywords(enhanced_text)
-                sentiment = await self.analyze_sentiment(enhanced_text)
+                # Extract entities and analyze sentiment concurrently
+                entities, sentiment = await asyncio.gather(
+                    self.extract_entities_and_keywords(enhanced_text),
+                    self.analyze_sentiment(enhanced_text)
+                )
                 
                 processing_result["entities"] = entities
                 processing_result["sentiment"] = sentiment
@@ -399,7 +431,7 @@ Return valid JSON only."""
             # Test Groq API if available
             if self.use_ai and self.groq_client:
                 try:
-                    test_response = self.groq_client.chat.completions.create(
+                    test_response = await self._chat_completion(
                         model="llama-3.1-8b-instant",  # Updated to latest supported model
                         messages=[{"role": "user", "content": "Hello, this is a test."}],
                         max_tokens=10
@@ -20,8 +20,11 @@ from django.utils import timezone
 from django.http import JsonResponse
 import tempfile
 import os
+from asgiref.sync import sync_to_async
 
+from smartgriev.concurrency import run_blocking
 from .models import Complaint, ComplaintStatus, ComplaintCategory
+from .text_dedup import find_intake_duplicate, flag_possible_duplicate
 from .ai_processor import AdvancedAIProcessor
 from .department_classifier import GovernmentDepartmentClassifier
 from authentication.auth_service import AdvancedAuthService
@@ -52,6 +55,15 @@ class MultiModalComplaintProcessingView(APIView):
             location = request.data.get('location')
             user_id = request.data.get('user_id')  # Optional for registered users
             
+            # Optional incident coordinates (also used to find nearby duplicates)
+            try:
+                latitude = float(request.data['latitude']) if request.data.get('latitude') else None
+                longitude = float(request.data['longitude']) if request.data.get('longitude') else None
+            except (TypeError, ValueError):
+                return Response({
+                    'error': 'latitude and longitude must be numbers'
+                }, status=status.HTTP_400_BAD_REQUEST)
+            
             # Validate input - at least one input type required
             if not any([complaint_text, audio_file, image_file]):
                 return Response({
@@ -66,54 +78,73 @@ class MultiModalComplaintProcessingView(APIView):
                 'department_classified': False
             }
             
-            # Process audio to text if provided
-            if audio_file:
-                logger.info("Processing audio file...")
-                audio_text = await self._process_audio_file(audio_file)
-                if audio_text:
-                    complaint_text += f" {audio_text}"
-                    processing_results['audio_processed'] = True
-                    processing_results['audio_text'] = audio_text
-            
-            # Process image if provided
-            if image_file:
-                logger.info("Processing image file...")
-                image_analysis = await self._process_image_file(image_file)
-                if image_analysis:
-                    complaint_text += f" {image_analysis}"
-                    processing_results['image_processed'] = True
-                    processing_results['image_analysis'] = image_analysis
-            
-            # Enhance text with AI if we have any content
+            # Audio and image stages are independent, so run them concurrently
+            audio_text, image_analysis = await asyncio.gather(
+                self._process_audio_file(audio_file) if audio_file else self._skip_stage(),
+                self._process_image_file(image_file) if image_file else self._skip_stage()
+            )
+            
+            if audio_text:
+                complaint_text += f" {audio_text}"
+                processing_results['audio_processed'] = True
+                processing_results['audio_text'] = audio_text
+            
+            if image_analysis:
+                complaint_text += f" {image_analysis}"
+                processing_results['image_processed'] = True
+                processing_results['image_analysis'] = image_analysis
+            
+            # A near-duplicate of a nearby complaint reuses its classification
+            # instead of paying for the enhancement and classification calls
+            duplicate = None
             if complaint_text.strip():
-                logger.info("Enhancing complaint with AI...")
-                enhanced_text = await ai_processor.enhance_complaint_text(
-                    complaint_text, 
+                duplicate = await sync_to_async(find_intake_duplicate, thread_sensitive=True)(
+                    complaint_text, latitude, longitude
+                )
+            
+            if duplicate:
+                logger.info(f"Reusing classification of complaint {duplicate['complaint_id']}")
+                classification_result = {
+                    'success': True,
+                    'department': duplicate['category'],
+                    'urgency_level': duplicate['urgency_level'],
+                    'confidence': duplicate['similarity'],
+                    'reused_from': duplicate['complaint_id'],
+                }
+            else:
+                # Enhance text with AI if we have any content
+                if complaint_text.strip():
+                    logger.info("Enhancing complaint with AI...")
+                    enhanced_text = await ai_processor.enhance_complaint_text(
+                        complaint_text, 
+                        location=location
+                    )
+                    if enhanced_text:
+                        complaint_text = enhanced_text
+                        processing_results['ai_enhanced'] = True
+                
+                # Classify department
+                logger.info("Classifying government department...")
+                classification_result = await dept_classifier.classify_complaint(
+                    complaint_text,
                     location=location
                 )
-                if enhanced_text:
-                    complaint_text = enhanced_text
-                    processing_results['ai_enhanced'] = True
-            
-            # Classify department
-            logger.info("Classifying government department...")
-            classification_result = await dept_classifier.classify_complaint(
-                complaint_text,
-                location=location
-            )
             
             if classification_result['success']:
                 processing_results['department_classified'] = True
                 processing_results['classification'] = classification_result
             
-            # Store complaint in database
+            # Store complaint in database (sync ORM, run via sync_to_async)
             complaint_data = await self._store_complaint(
                 text=complaint_text,
                 classification=classification_result if classification_result['success'] else None,
                 user_id=user_id,
                 location=location,
+                latitude=latitude,
+                longitude=longitude,
                 audio_file=audio_file,
-                image_file=image_file
+                image_file=image_file,
+                duplicate=duplicate
             )
             
             # Prepare response
@@ -124,6 +155,7 @@ class MultiModalComplaintProcessingView(APIView):
                 'department': classification_result.get('department', 'General'),
                 'urgency_level': classification_result.get('urgency_level', 'medium'),
                 'estimated_resolution_days': classification_result.get('estimated_resolution_days', 7),
+                'possible_duplicate_of': complaint_data['possible_duplicate_of'],
                 'processing_details': processing_results,
                 'message': 'Complaint processed successfully'
             }
@@ -137,22 +169,32 @@ class MultiModalComplaintProcessingView(APIView):
                 'details': str(e)
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
     
+    @staticmethod
+    async def _skip_stage():
+        """Placeholder for a stage with no input"""
+        return None
+    
+    @staticmethod
+    def _write_temp_file(uploaded_file, suffix: str) -> str:
+        """Write an upload to a temporary file (blocking; runs on the executor)"""
+        with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as temp_file:
+            for chunk in uploaded_file.chunks():
+                temp_file.write(chunk)
+            return temp_file.name
+    
     async def _process_audio_file(self, audio_file) -> Optional[str]:
         """Process audio file to extract text"""
         try:
+            logger.info("Processing audio file...")
             # Save audio file temporarily
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.wav') as temp_file:
-                for chunk in audio_file.chunks():
-                    temp_file.write(chunk)
-                temp_path = temp_file.name
-            
-            # Process with AI
-            audio_text = await ai_processor.process_audio_to_text(temp_path)
-            
-            # Cleanup
-            os.unlink(temp_path)
-            
-            return audio_text
+            temp_path = await run_blocking(self._write_temp_file, audio_file, '.wav')
+            
+            try:
+                # Process with AI
+                return await ai_processor.process_audio_to_text(temp_path)
+            finally:
+                # Cleanup
+                os.unlink(temp_path)
         except Exception as e:
             logger.error(f"Audio processing failed: {e}")
             return None
@@ -160,27 +202,30 @@ class MultiModalComplaintProcessingView(APIView):
     async def _process_image_file(self, image_file) -> Optional[str]:
         """Process image file to extract context and text"""
         try:
+            logger.info("Processing image file...")
             # Save image file temporarily
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.jpg') as temp_file:
-                for chunk in image_file.chunks():
-                    temp_file.write(chunk)
-                temp_path = temp_file.name
-            
-            # Process with AI
-            image_analysis = await ai_processor.process_image_with_context(temp_path)
-            
-            # Cleanup
-            os.unlink(temp_path)
-            
-            return image_analysis
+            temp_path = await run_blocking(self._write_temp_file, image_file, '.jpg')
+            
+            try:
+                # Process with AI
+                return await ai_processor.process_image_with_context(temp_path)
+            finally:
+                # Cleanup
+                os.unlink(temp_path)
         except Exception as e:
             logger.error(f"Image processing failed: {e}")
             return None
     
-    async def _store_complaint(self, text: str, classification: Dict = None, 
+    async def _store_complaint(self, **kwargs) -> Dict[str, Any]:
+        """Store processed complaint in database without blocking the event loop"""
+        return await sync_to_async(self._store_complaint_sync, thread_sensitive=True)(**kwargs)
+    
+    def _store_complaint_sync(self, text: str, classification: Dict = None, 
                               user_id: str = None, location: str = None,
-                              audio_file=None, image_file=None) -> Dict[str, Any]:
-        """Store processed complaint in database"""
+                              latitude: float = None, longitude: float = None,
+                              audio_file=None, image_file=None,
+                              duplicate: Dict = None) -> Dict[str, Any]:
+        """Store processed complaint in database (``duplicate`` from find_intake_duplicate)"""
         try:
             # Get user if provided
             user = None
@@ -203,7 +248,11 @@ class MultiModalComplaintProcessingView(APIView):
                 title=text[:100] + '...' if len(text) > 100 else text,
                 description=text,
                 category=category,
+                department_id=duplicate['department_id'] if duplicate else None,
+                possible_duplicate_of_id=duplicate['complaint_id'] if duplicate else None,
                 location=location or '',
+                incident_latitude=latitude,
+                incident_longitude=longitude,
                 urgency_level=classification.get('urgency_level', 'medium') if classification else 'medium',
                 ai_confidence_score=classification.get('confidence', 0.0) if classification else 0.0,
                 department_classification=json.dumps(classification) if classification else '{}',
@@ -235,9 +284,16 @@ class MultiModalComplaintProcessingView(APIView):
                 updated_by=user
             )
             
+            # Near-duplicate of a nearby complaint in the same category: link it, never reject
+            if duplicate is None:
+                duplicate = flag_possible_duplicate(complaint)
+            if duplicate:
+                logger.info(f"Complaint {complaint.id} may duplicate complaint {duplicate['complaint_id']}")
+            
             return {
                 'complaint_id': complaint.id,
                 'category': category.name,
+                'possible_duplicate_of': duplicate,
                 'created_at': complaint.created_at.isoformat()
             }
             
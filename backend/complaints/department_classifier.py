@@ -9,6 +9,11 @@ import json
 import os
 from typing import Dict, Any, Optional, List
 
+from django.conf import settings
+
+from smartgriev.concurrency import run_blocking
+from smartgriev.keywords import get_matcher
+
 # Try to import Groq, but make it optional
 try:
     from groq import Groq
@@ -20,6 +25,8 @@ logger = logging.getLogger(__name__)
 if not GROQ_AVAILABLE:
     logger.warning("Groq library not available. Department classification will use fallback methods.")
 
+URGENCY_MATCHER = get_matcher({"high": ["urgent", "emergency", "critical", "तुरंत", "जल्दी"]})
+
 
 class GovernmentDepartmentClassifier:
     """
@@ -113,6 +120,11 @@ class GovernmentDepartmentClassifier:
                 }
             }
             
+            # Compiled once per process and shared by every classifier instance
+            self.keyword_matcher = get_matcher({
+                dept_code: dept_info["keywords"] for dept_code, dept_info in self.departments.items()
+            })
+            
             logger.info("GovernmentDepartmentClassifier initialized successfully")
             
         except Exception as e:
@@ -204,7 +216,10 @@ Return valid JSON only."""
                 logger.warning("AI not available, using keyword-based classification")
                 return self._get_keyword_classification(complaint_text)
             
-            response = self.groq_client.chat.completions.create(
+            # Blocking SDK call runs on the bounded executor, off the event loop
+            response = await run_blocking(
+                self.groq_client.chat.completions.create,
+                timeout=getattr(settings, 'AI_REQUEST_TIMEOUT', 30),
                 model="llama-3.1-8b-instant",  # Updated to latest supported model
                 messages=[
                     {"role": "system", "content": system_prompt},
@@ -253,31 +268,22 @@ Return valid JSON only."""
         Classify based on keyword matching
         """
         try:
-            text_lower = complaint_text.lower()
             best_match = None
             best_score = 0
             
-            # Check each department's keywords
-            for dept_code, dept_info in self.departments.items():
-                score = 0
-                matched_keywords = []
-                
-                for keyword in dept_info["keywords"]:
-                    if keyword.lower() in text_lower:
-                        score += 1
-                        matched_keywords.append(keyword)
-                
+            # Single pass over the text for all departments' keywords
+            for dept_code, matched_keywords in self.keyword_matcher.matches_by_label(complaint_text).items():
+                score = len(matched_keywords)
                 if score > best_score:
                     best_score = score
-                    best_match = (dept_code, dept_info, matched_keywords)
+                    best_match = (dept_code, self.departments[dept_code], matched_keywords)
             
             if best_match and best_score > 0:
                 dept_code, dept_info, matched_keywords = best_match
                 
                 # Determine urgency based on keywords
                 urgency = "medium"
-                urgency_keywords = ["urgent", "emergency", "critical", "तुरंत", "जल्दी"]
-                if any(word in text_lower for word in urgency_keywords):
+                if URGENCY_MATCHER.present(complaint_text):
                     urgency = "high"
                 
                 return {
@@ -0,0 +1,128 @@
+"""
+Management command to benchmark the compiled keyword matcher
+Compares smartgriev.keywords against the per-keyword substring loops it replaced
+"""
+
+import random
+import string
+import timeit
+
+from django.core.management.base import BaseCommand
+from complaints.department_classifier import GovernmentDepartmentClassifier
+from complaints.models import Complaint
+from complaints.services.classification_service import ComplaintClassificationService
+from machine_learning.audio_analyzer import AudioAnalyzer
+from smartgriev.keywords import KeywordMatcher
+
+SAMPLE_TEXT = (
+    "the problem in our area has continued for several days and nobody from the "
+    "office has come to check it please send someone soon हमारे इलाके में कई दिनों "
+    "से समस्या है কেউ দেখতে আসেনি సమస్య ఇంకా ఉంది"
+).split()
+
+
+def naive_scores(groups, text):
+    """The original loop: one substring scan per keyword per label"""
+    text_lower = text.lower()
+    scores = {}
+    for label, keywords in groups.items():
+        score = sum(1 for keyword in keywords if keyword.lower() in text_lower)
+        if score > 0:
+            scores[label] = score
+    return scores
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the compiled keyword matcher against naive per-keyword substring loops'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--texts',
+            type=int,
+            default=500,
+            help='Number of texts per run (default: 500)',
+        )
+        parser.add_argument(
+            '--words',
+            type=int,
+            default=80,
+            help='Words per synthetic text (default: 80)',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=5,
+            help='Timed runs per table; the best one is reported (default: 5)',
+        )
+        parser.add_argument(
+            '--synthetic-keywords',
+            type=int,
+            nargs='*',
+            default=[300, 1000],
+            help='Also benchmark random keyword tables of these sizes (default: 300 1000)',
+        )
+        parser.add_argument(
+            '--from-db',
+            action='store_true',
+            help='Use stored complaint descriptions instead of synthetic texts',
+        )
+
+    def handle(self, *args, **options):
+        rng = random.Random(42)
+        tables = {
+            'department_classifier': {
+                code: info['keywords']
+                for code, info in GovernmentDepartmentClassifier().departments.items()
+            },
+            'classification_service': {
+                code: info['keywords'] + info['priority_keywords']
+                for code, info in ComplaintClassificationService.DEPARTMENTS.items()
+            },
+            'audio_emotion': AudioAnalyzer.EMOTION_KEYWORDS,
+        }
+        for size in options['synthetic_keywords']:
+            keywords = [
+                ''.join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(4, 9)))
+                for _ in range(size)
+            ]
+            tables[f'synthetic_{size}'] = {f'label_{i}': keywords[i::10] for i in range(10)}
+
+        db_texts = None
+        if options['from_db']:
+            db_texts = list(
+                Complaint.objects.order_by('-id')
+                .values_list('description', flat=True)[:options['texts']]
+            )
+            self.stdout.write(f'Loaded {len(db_texts)} complaint descriptions')
+
+        self.stdout.write(f"{'table':<24}{'keywords':>9}{'backend':>14}{'naive ms':>11}{'matcher ms':>12}{'speedup':>9}{'diffs':>7}")
+        for name, groups in tables.items():
+            matcher = KeywordMatcher(groups)
+            texts = db_texts or self._synthetic_texts(rng, groups, options['texts'], options['words'])
+
+            naive = min(timeit.repeat(
+                lambda: [naive_scores(groups, text) for text in texts], number=1, repeat=options['repeat']
+            ))
+            compiled = min(timeit.repeat(
+                lambda: [matcher.scores(text) for text in texts], number=1, repeat=options['repeat']
+            ))
+            # Differences are expected only where a substring splits an Indic syllable
+            diffs = sum(1 for text in texts if naive_scores(groups, text) != matcher.scores(text))
+
+            self.stdout.write(
+                f'{name:<24}{len(matcher.keywords):>9}{matcher.backend:>14}'
+                f'{naive * 1000:>11.1f}{compiled * 1000:>12.1f}'
+                f'{(naive / compiled if compiled else 0):>8.2f}x{diffs:>7}'
+            )
+
+        self.stdout.write(self.style.SUCCESS('Benchmark finished'))
+
+    def _synthetic_texts(self, rng, groups, count, words):
+        keywords = [keyword for keywords in groups.values() for keyword in keywords]
+        texts = []
+        for _ in range(count):
+            tokens = [rng.choice(SAMPLE_TEXT) for _ in range(words)]
+            for _ in range(rng.randint(0, 4)):
+                tokens.insert(rng.randrange(len(tokens) + 1), rng.choice(keywords))
+            texts.append(' '.join(tokens))
+        return texts
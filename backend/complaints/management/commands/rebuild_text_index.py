@@ -0,0 +1,54 @@
+"""
+Management command to rebuild complaint text MinHash signatures and LSH buckets
+Use it to backfill existing complaints or after changing the signature parameters
+"""
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from complaints.models import Complaint, ComplaintTextBucket
+from complaints.text_dedup import band_buckets, complaint_text, minhash_signature, signature_to_bytes
+
+
+class Command(BaseCommand):
+    help = 'Recompute MinHash signatures and LSH buckets for near-duplicate complaint detection'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Complaints processed per transaction (default: 1000)',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        queryset = Complaint.objects.only('id', 'description', 'translated_text').order_by('id')
+
+        processed = 0
+        last_id = 0
+        while True:
+            batch = list(queryset.filter(id__gt=last_id)[:batch_size])
+            if not batch:
+                break
+            last_id = batch[-1].id
+
+            buckets = []
+            for complaint in batch:
+                signature = minhash_signature(complaint_text(complaint))
+                complaint.text_minhash = signature_to_bytes(signature)
+                if signature is not None:
+                    buckets.extend(
+                        ComplaintTextBucket(complaint_id=complaint.id, bucket=bucket)
+                        for bucket in band_buckets(signature)
+                    )
+
+            with transaction.atomic():
+                Complaint.objects.bulk_update(batch, ['text_minhash'])
+                ComplaintTextBucket.objects.filter(complaint_id__in=[c.id for c in batch]).delete()
+                ComplaintTextBucket.objects.bulk_create(buckets, batch_size=5000)
+
+            processed += len(batch)
+            self.stdout.write(f'Processed {processed} complaints...')
+
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt text signatures for {processed} complaints.'))
@@ -0,0 +1,86 @@
+"""
+Management command to reclassify existing complaints in bulk
+Run after a taxonomy or prompt change; uses batched LLM classification
+"""
+
+from django.core.management.base import BaseCommand
+from complaints.models import Complaint
+from complaints.services.classification_service import complaint_classifier
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Reclassify complaints with batched AI classification and store the results'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--status',
+            type=str,
+            help='Only reclassify complaints with this status',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=500,
+            help='Complaints loaded and saved per chunk (default: 500)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            help='Complaints packed per LLM request (default: COMPLAINT_CLASSIFICATION BATCH_SIZE)',
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            help='Concurrent LLM requests (default: COMPLAINT_CLASSIFICATION BATCH_CONCURRENCY)',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Classify without saving results',
+        )
+
+    def handle(self, *args, **options):
+        queryset = Complaint.objects.order_by('id')
+        if options['status']:
+            queryset = queryset.filter(status=options['status'])
+
+        ids = list(queryset.values_list('id', flat=True))
+        chunk_size = options['chunk_size']
+        processed = 0
+
+        for start in range(0, len(ids), chunk_size):
+            chunk = list(
+                Complaint.objects.filter(id__in=ids[start:start + chunk_size])
+                .only('id', 'title', 'description', 'translated_text', 'department_classification')
+            )
+            results = complaint_classifier.classify_multiple_complaints(
+                [
+                    {'id': c.id, 'title': c.title, 'text': c.translated_text or c.description}
+                    for c in chunk
+                ],
+                batch_size=options['batch_size'],
+                max_concurrency=options['concurrency']
+            )
+
+            by_id = {result['complaint_id']: result for result in results}
+            for complaint in chunk:
+                result = by_id[complaint.id]
+                result.pop('processing_info', None)
+                complaint.department_classification = result
+
+            if not options['dry_run']:
+                Complaint.objects.bulk_update(chunk, ['department_classification'])
+
+            processed += len(chunk)
+            stats = complaint_classifier.last_batch_stats
+            self.stdout.write(
+                f"{processed}/{len(ids)} complaints "
+                f"({stats.get('llm_batches', 0)} LLM batches, {stats.get('items_per_second')} items/s)"
+            )
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Reclassified {processed} complaints{' (dry run)' if options['dry_run'] else ''}"
+        ))
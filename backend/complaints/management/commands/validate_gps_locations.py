@@ -0,0 +1,74 @@
+"""
+Management command to (re)validate GPS locations for many complaints at once
+Uses the bulk validation path so duplicate detection stays a single pass
+"""
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from complaints.models import Complaint, GPSValidation
+from complaints.utils import perform_bulk_gps_validation
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Run GPS validation for geo-tagged complaints in bulk and store the results'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Number of complaints validated per pass (default: 5000)',
+        )
+        parser.add_argument(
+            '--only-missing',
+            action='store_true',
+            help='Only validate complaints that have no GPSValidation record yet',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+
+        queryset = Complaint.objects.filter(
+            incident_latitude__isnull=False,
+            incident_longitude__isnull=False
+        ).order_by('id')
+        if options['only_missing']:
+            queryset = queryset.filter(gps_validation__isnull=True)
+
+        ids = list(queryset.values_list('id', flat=True))
+        total_invalid = 0
+
+        for start in range(0, len(ids), batch_size):
+            batch_ids = ids[start:start + batch_size]
+            results = perform_bulk_gps_validation(Complaint.objects.filter(id__in=batch_ids))
+
+            with transaction.atomic():
+                existing = GPSValidation.objects.in_bulk(batch_ids, field_name='complaint_id')
+                to_create, to_update = [], []
+                for complaint_id, result in results.items():
+                    validation = existing.get(complaint_id) or GPSValidation(complaint_id=complaint_id)
+                    validation.accuracy_check = result['accuracy_check']
+                    validation.range_check = result['range_check']
+                    validation.duplicate_check = result['duplicate_check']
+                    validation.speed_check = result['speed_check']
+                    validation.validation_score = result['score']
+                    validation.is_valid = result['is_valid']
+                    validation.validation_notes = result['notes']
+                    (to_update if validation.pk else to_create).append(validation)
+                    total_invalid += not result['is_valid']
+
+                GPSValidation.objects.bulk_create(to_create)
+                GPSValidation.objects.bulk_update(to_update, [
+                    'accuracy_check', 'range_check', 'duplicate_check', 'speed_check',
+                    'validation_score', 'is_valid', 'validation_notes',
+                ])
+
+            self.stdout.write(f'Validated {min(start + batch_size, len(ids))}/{len(ids)} complaints')
+
+        logger.info(f'Bulk GPS validation finished: {len(ids)} checked, {total_invalid} invalid')
+        self.stdout.write(self.style.SUCCESS(
+            f'Validated {len(ids)} complaints ({total_invalid} flagged invalid)'
+        ))
@@ -0,0 +1,44 @@
+from django.db import migrations, models
+
+
+def backfill_geohash(apps, schema_editor):
+    from complaints.spatial import encode_geohash
+
+    Complaint = apps.get_model('complaints', 'Complaint')
+    batch = []
+    queryset = Complaint.objects.filter(
+        models.Q(incident_latitude__isnull=False, incident_longitude__isnull=False) |
+        models.Q(location_lat__isnull=False, location_lon__isnull=False)
+    ).only('id', 'incident_latitude', 'incident_longitude', 'location_lat', 'location_lon')
+
+    for complaint in queryset.iterator(chunk_size=2000):
+        if complaint.incident_latitude is not None and complaint.incident_longitude is not None:
+            lat, lon = complaint.incident_latitude, complaint.incident_longitude
+        else:
+            lat, lon = complaint.location_lat, complaint.location_lon
+        if lat is None or lon is None:
+            continue
+        complaint.geohash = encode_geohash(lat, lon)
+        batch.append(complaint)
+        if len(batch) >= 2000:
+            Complaint.objects.bulk_update(batch, ['geohash'])
+            batch = []
+
+    if batch:
+        Complaint.objects.bulk_update(batch, ['geohash'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('complaints', '0010_add_mapmyindia_plus_code_ward'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='complaint',
+            name='geohash',
+            field=models.CharField(blank=True, db_index=True, help_text='Geohash cell of the incident coordinates, used for radius queries', max_length=12, null=True),
+        ),
+        migrations.RunPython(backfill_geohash, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,40 @@
+from django.db import migrations, models
+
+
+def seed_sequences(apps, schema_editor):
+    Complaint = apps.get_model('complaints', 'Complaint')
+    ComplaintNumberSequence = apps.get_model('complaints', 'ComplaintNumberSequence')
+    last_values = {}
+    numbers = Complaint.objects.exclude(complaint_number__isnull=True).exclude(
+        complaint_number=''
+    ).values_list('complaint_number', flat=True)
+
+    for number in numbers.iterator(chunk_size=2000):
+        prefix, _, seq = number.rpartition('-')
+        if not prefix or not seq.isdigit():
+            continue
+        last_values[prefix] = max(last_values.get(prefix, 0), int(seq))
+
+    ComplaintNumberSequence.objects.bulk_create(
+        [ComplaintNumberSequence(prefix=prefix, last_value=value) for prefix, value in last_values.items()],
+        batch_size=2000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('complaints', '0011_complaint_geohash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ComplaintNumberSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('prefix', models.CharField(max_length=50, unique=True)),
+                ('last_value', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(seed_sequences, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('complaints', '0012_complaintnumbersequence'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='complaint',
+            name='text_minhash',
+            field=models.BinaryField(blank=True, editable=False, help_text='MinHash signature of the complaint text, used for near-duplicate detection', null=True),
+        ),
+        migrations.CreateModel(
+            name='ComplaintTextBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket', models.BigIntegerField(db_index=True)),
+                ('complaint', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='text_buckets', to='complaints.complaint')),
+            ],
+        ),
+    ]
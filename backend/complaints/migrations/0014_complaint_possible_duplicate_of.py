@@ -0,0 +1,17 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('complaints', '0013_complaint_text_minhash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='complaint',
+            name='possible_duplicate_of',
+            field=models.ForeignKey(blank=True, help_text='Earlier nearby complaint of the same department with near-identical text', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='possible_duplicates', to='complaints.complaint'),
+        ),
+    ]
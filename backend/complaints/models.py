@@ -161,6 +161,27 @@ class Complaint(models.Model):
         blank=True,
         help_text='Ward/zone name for the complaint location'
     )
+    geohash = models.CharField(
+        max_length=12,
+        null=True,
+        blank=True,
+        db_index=True,
+        help_text='Geohash cell of the incident coordinates, used for radius queries'
+    )
+    text_minhash = models.BinaryField(
+        null=True,
+        blank=True,
+        editable=False,
+        help_text='MinHash signature of the complaint text, used for near-duplicate detection'
+    )
+    possible_duplicate_of = models.ForeignKey(
+        'self',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='possible_duplicates',
+        help_text='Earlier nearby complaint of the same department with near-identical text'
+    )
     
     # Additional location context
     area_type = models.CharField(max_length=50, null=True, blank=True, choices=[
@@ -195,6 +216,9 @@ class Complaint(models.Model):
             models.Index(fields=['department', 'status']),
         ]
     
+    GEO_FIELDS = frozenset({'incident_latitude', 'incident_longitude', 'location_lat', 'location_lon'})
+    TEXT_FIELDS = frozenset({'description', 'translated_text'})
+    
     def __str__(self):
         return f"{self.complaint_number or self.title} - {self.status}"
     
@@ -203,13 +227,35 @@ class Complaint(models.Model):
         # Generate complaint number if not exists
         if not self.complaint_number:
             self.complaint_number = self.generate_complaint_number()
+        self.geohash = self.compute_geohash()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and self.GEO_FIELDS.intersection(update_fields):
+            kwargs['update_fields'] = update_fields = set(update_fields) | {'geohash'}
+        
+        text_changed = False
+        if update_fields is None or self.TEXT_FIELDS.intersection(update_fields):
+            text_minhash = self.compute_text_minhash()
+            text_changed = text_minhash != (bytes(self.text_minhash) if self.text_minhash else None)
+            self.text_minhash = text_minhash
+            if update_fields is not None:
+                kwargs['update_fields'] = set(update_fields) | {'text_minhash'}
         super().save(*args, **kwargs)
+        
+        if text_changed:
+            from .text_dedup import replace_buckets, signature_from_bytes
+            replace_buckets(self.pk, signature_from_bytes(self.text_minhash))
     
-    def generate_complaint_number(self):
-        """
-        Generate unique complaint number: BC-{YEAR}-{CITY}-{DEPT}-{SEQ}
-        Example: BC-2025-MUM-WAT-00123
-        """
+    def compute_geohash(self):
+        """Geohash cell for the incident coordinates (None if not geo-tagged)"""
+        from .spatial import encode_geohash
+        
+        coords = self.get_incident_coordinates()
+        if coords.latitude is None or coords.longitude is None:
+            return None
+        return encode_geohash(coords.latitude, coords.longitude)
+    
+    def complaint_number_prefix(self):
+        """Sequence key for complaint numbers: BC-{YEAR}-{CITY}-{DEPT}"""
         from datetime import datetime
         
         year = datetime.now().year
@@ -229,24 +275,25 @@ class Complaint(models.Model):
         elif self.category:
             dept_code = self.category.name[:3].upper()
         
-        # Get sequence number for this year/city/dept combination
-        from django.db.models import Max
-        last_complaint = Complaint.objects.filter(
-            complaint_number__startswith=f'BC-{year}-{city_code}-{dept_code}'
-        ).aggregate(Max('complaint_number'))
+        return f'BC-{year}-{city_code}-{dept_code}'
+    
+    def compute_text_minhash(self):
+        """MinHash signature bytes of the description and translation (None if empty)"""
+        from .text_dedup import complaint_text, minhash_signature, signature_to_bytes
+        
+        return signature_to_bytes(minhash_signature(complaint_text(self)))
+    
+    def generate_complaint_number(self):
+        """
+        Generate unique complaint number: BC-{YEAR}-{CITY}-{DEPT}-{SEQ}
+        Example: BC-2025-MUM-WAT-00123
         
-        last_number = last_complaint['complaint_number__max']
-        if last_number:
-            # Extract sequence number and increment
-            try:
-                last_seq = int(last_number.split('-')[-1])
-                seq = last_seq + 1
-            except (ValueError, IndexError):
-                seq = 1
-        else:
-            seq = 1
+        The sequence comes from the per-prefix counter in ComplaintNumberSequence
+        (see complaints.numbering), so no scan over existing complaints is needed.
+        """
+        from .numbering import allocate_complaint_number
         
-        return f'BC-{year}-{city_code}-{dept_code}-{seq:05d}'
+        return allocate_complaint_number(self.complaint_number_prefix())
     
     def __str__(self):
         return f"{self.title} - {self.status}"
@@ -265,6 +312,22 @@ class Complaint(models.Model):
             method=self.location_method
         )
 
+class ComplaintNumberSequence(models.Model):
+    """Last allocated complaint sequence number per BC-{YEAR}-{CITY}-{DEPT} prefix"""
+    prefix = models.CharField(max_length=50, unique=True)
+    last_value = models.PositiveIntegerField(default=0)
+    
+    def __str__(self):
+        return f"{self.prefix} -> {self.last_value}"
+
+class ComplaintTextBucket(models.Model):
+    """LSH band bucket of a complaint's text MinHash (see complaints.text_dedup)"""
+    complaint = models.ForeignKey(Complaint, on_delete=models.CASCADE, related_name='text_buckets')
+    bucket = models.BigIntegerField(db_index=True)
+    
+    def __str__(self):
+        return f"{self.complaint_id} -> {self.bucket}"
+
 class ComplaintStatus(models.Model):
     """Track status changes for complaints"""
     STATUS_CHOICES = [
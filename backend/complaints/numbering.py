@@ -0,0 +1,134 @@
+"""
+Complaint Number Allocation
+
+Sequences for complaint numbers (BC-{YEAR}-{CITY}-{DEPT}-{SEQ}) are kept in
+ComplaintNumberSequence, one counter row per prefix. Allocating a number is a
+single-row ``F()`` increment instead of a MAX() scan over every complaint with
+the same prefix, so concurrent saves with the same prefix never compute the
+same number, and saves with different prefixes do not contend at all.
+
+The increment runs on the COMPLAINT_NUMBER_DATABASE connection and commits on
+its own, so the counter row is locked only for that statement, not until the
+transaction saving the complaint (which may also validate and notify)
+commits. Without that alias the increment joins the caller's transaction and
+same-prefix saves queue on the row lock until the caller commits. A number
+whose complaint is rolled back is not reused and leaves a gap.
+
+With COMPLAINT_NUMBER_BLOCK_SIZE > 1 each worker process reserves a block of
+numbers per prefix and hands them out from memory. Numbers stay unique but may
+have gaps (unused block tails are lost on restart) and are not strictly
+ordered by creation time across workers.
+"""
+import logging
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, IntegrityError, connections, transaction
+from django.db.models import F, Max
+
+logger = logging.getLogger(__name__)
+
+_blocks: Dict[str, Tuple[int, int]] = {}
+_blocks_lock = threading.Lock()
+
+
+def format_complaint_number(prefix: str, seq: int) -> str:
+    return f'{prefix}-{seq:05d}'
+
+
+def _parse_sequence(number: Optional[str]) -> int:
+    try:
+        return int(number.rsplit('-', 1)[1])
+    except (AttributeError, IndexError, ValueError):
+        return 0
+
+
+def _sequence_database() -> str:
+    alias = getattr(settings, 'COMPLAINT_NUMBER_DATABASE', None)
+    return alias if alias in connections.databases else DEFAULT_DB_ALIAS
+
+
+def _seed_value(prefix: str, using: str) -> int:
+    """Highest sequence already used for ``prefix`` (one-time scan when a counter is created)"""
+    from .models import Complaint
+
+    last_number = Complaint.objects.using(using).filter(
+        complaint_number__startswith=f'{prefix}-'
+    ).aggregate(Max('complaint_number'))['complaint_number__max']
+    return _parse_sequence(last_number)
+
+
+def reserve_sequence(prefix: str, count: int = 1) -> int:
+    """
+    Reserve ``count`` consecutive sequence numbers for ``prefix`` in the database.
+
+    Returns the last reserved value; the reserved range is
+    ``last - count + 1 .. last``.
+    """
+    from .models import ComplaintNumberSequence
+
+    if count < 1:
+        raise ValueError('count must be at least 1')
+
+    using = _sequence_database()
+    sequences = ComplaintNumberSequence.objects.using(using).filter(prefix=prefix)
+    with transaction.atomic(using=using):
+        if not sequences.update(last_value=F('last_value') + count):
+            try:
+                with transaction.atomic(using=using):
+                    ComplaintNumberSequence.objects.using(using).create(
+                        prefix=prefix, last_value=_seed_value(prefix, using) + count
+                    )
+            except IntegrityError:
+                # Another worker created the counter first
+                sequences.update(last_value=F('last_value') + count)
+        # The row stays locked by our update until this block commits, so this read is ours
+        return sequences.values_list('last_value', flat=True).get()
+
+
+def allocate_sequence(prefix: str) -> int:
+    """Next sequence number for ``prefix``, from this worker's block when blocks are enabled"""
+    block_size = getattr(settings, 'COMPLAINT_NUMBER_BLOCK_SIZE', 1)
+    if block_size <= 1:
+        return reserve_sequence(prefix)
+
+    with _blocks_lock:
+        next_value, end = _blocks.get(prefix, (1, 0))
+        if next_value > end:
+            end = reserve_sequence(prefix, block_size)
+            next_value = end - block_size + 1
+        _blocks[prefix] = (next_value + 1, end)
+        return next_value
+
+
+def allocate_complaint_number(prefix: str) -> str:
+    return format_complaint_number(prefix, allocate_sequence(prefix))
+
+
+def assign_complaint_numbers(complaints: Iterable) -> List:
+    """
+    Number unsaved complaints for bulk_create with one reservation per prefix.
+
+    Complaints that already have a number are left untouched.
+    """
+    complaints = list(complaints)
+    by_prefix: Dict[str, List] = {}
+    for complaint in complaints:
+        if not complaint.complaint_number:
+            by_prefix.setdefault(complaint.complaint_number_prefix(), []).append(complaint)
+
+    for prefix, group in by_prefix.items():
+        last = reserve_sequence(prefix, len(group))
+        for seq, complaint in enumerate(group, start=last - len(group) + 1):
+            complaint.complaint_number = format_complaint_number(prefix, seq)
+
+    if by_prefix:
+        logger.info(f"Assigned {sum(len(g) for g in by_prefix.values())} complaint numbers across {len(by_prefix)} prefixes")
+    return complaints
+
+
+def reset_local_blocks() -> None:
+    """Drop this worker's reserved blocks (the unused numbers become gaps)"""
+    with _blocks_lock:
+        _blocks.clear()
@@ -53,12 +53,15 @@ class ComplaintSerializer(serializers.ModelSerializer):
                  # AI processing results
                  'ai_confidence_score', 'ai_processed_text', 'department_classification',
                  'gemini_raw_response',
+                 # Near-duplicate link
+                 'possible_duplicate_of',
                  # Timestamps
                  'created_at', 'updated_at')
         read_only_fields = ('user', 'complaint_number', 'sentiment', 'created_at', 'updated_at', 
                            'video_analysis', 'audio_transcription', 'image_ocr_text', 
                            'detected_objects', 'ai_confidence_score', 'ai_processed_text',
-                           'department_classification', 'gemini_raw_response')
+                           'department_classification', 'gemini_raw_response',
+                           'possible_duplicate_of')
 
     def get_incident_coordinates(self, obj):
         """Return formatted incident coordinates"""
@@ -10,6 +10,8 @@ from typing import Dict, Any, Optional
 from pathlib import Path
 import mimetypes
 
+from smartgriev.media_cache import cached_analysis
+
 logger = logging.getLogger(__name__)
 
 
@@ -30,6 +32,9 @@ class AudioTranscriptionService:
     # Maximum audio duration (in seconds)
     MAX_AUDIO_DURATION = 600  # 10 minutes
     
+    # Model name, part of the media analysis cache key
+    MODEL_NAME = 'gemini-1.5-pro'
+    
     # Supported languages (12 Indian languages)
     SUPPORTED_LANGUAGES = {
         'en': 'English',
@@ -68,7 +73,7 @@ class AudioTranscriptionService:
         genai.configure(api_key=self.api_key)
         
         # Use Gemini 1.5 Pro for audio transcription
-        self.model = genai.GenerativeModel('gemini-1.5-pro')
+        self.model = genai.GenerativeModel(self.MODEL_NAME)
         
         logger.info("AudioTranscriptionService initialized with Gemini 1.5 Pro")
     
@@ -89,6 +94,16 @@ class AudioTranscriptionService:
         Returns:
             Transcription results with text, language, confidence
         """
+        # Identical re-uploads are answered from the media analysis cache
+        return cached_analysis(
+            'gemini_audio', self.MODEL_NAME, audio_path,
+            lambda: self._transcribe_audio_uncached(audio_path, language, context),
+            params=(language, context)
+        )
+    
+    def _transcribe_audio_uncached(self, audio_path: str, language: Optional[str],
+                                   context: Optional[str]) -> Dict[str, Any]:
+        """Upload one audio file to Gemini and transcribe it (see transcribe_audio)"""
         try:
             # Validate audio file
             validation = self._validate_audio(audio_path)
@@ -7,6 +7,9 @@ from typing import Dict, List, Optional
 from django.conf import settings
 import logging
 
+from smartgriev.caching import TwoTierCache, normalize_text
+from smartgriev.keywords import get_matcher
+
 # Try to import Groq, but make it optional
 try:
     from groq import Groq
@@ -18,10 +21,21 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+FALLBACK_MATCHER = get_matcher({
+    'INFRASTRUCTURE': ['road', 'bridge', 'building', 'construction', 'facility', 'infrastructure'],
+    'HEALTHCARE': ['hospital', 'doctor', 'medical', 'health', 'clinic', 'medicine', 'treatment'],
+    'EDUCATION': ['school', 'teacher', 'student', 'education', 'college', 'university', 'class'],
+    'TRANSPORTATION': ['bus', 'train', 'traffic', 'transport', 'vehicle', 'parking', 'metro'],
+    'UTILITIES': ['water', 'electricity', 'power', 'gas', 'waste', 'sewage', 'utility']
+})
+
 
 class ComplaintClassificationService:
     """Enhanced service for classifying complaints using Groq AI with advanced features"""
     
+    # Bump whenever the prompts or result shape change so stale cache entries are ignored
+    PROMPT_VERSION = 'v2'
+    
     DEPARTMENTS = {
         'INFRASTRUCTURE': {
             'name': 'Infrastructure and Public Works',
@@ -83,7 +97,22 @@ class ComplaintClassificationService:
             logging.warning("GROQ_API_KEY not set. Using fallback classification.")
             
         self.model = "llama-3.1-8b-instant"  # Updated to latest supported Groq model
-        self.classification_cache = {}  # Simple in-memory cache
+        # Regular keywords weigh 1 and priority keywords 3, matched in one pass
+        self.keyword_matcher = get_matcher({
+            code: [(keyword, 1) for keyword in info['keywords']] +
+                  [(keyword, 3) for keyword in info['priority_keywords']]
+            for code, info in self.DEPARTMENTS.items()
+        })
+        self.priority_matcher = get_matcher({
+            code: info['priority_keywords'] for code, info in self.DEPARTMENTS.items()
+        })
+        classification_settings = getattr(settings, 'COMPLAINT_CLASSIFICATION', {})
+        # Bounded per-process LRU backed by the shared Redis cache
+        self.classification_cache = TwoTierCache(
+            'classification',
+            max_entries=classification_settings.get('CACHE_MAX_ENTRIES', 2048),
+            ttl=classification_settings.get('CACHE_TTL', 86400)
+        )
         self.performance_metrics = {
             'total_classifications': 0,
             'successful_classifications': 0,
@@ -91,6 +120,7 @@ class ComplaintClassificationService:
             'average_response_time': 0.0,
             'cache_hits': 0
         }
+        self.last_batch_stats = {}
     
     def classify_complaint(self, complaint_text: str, complaint_title: str = "") -> Dict[str, any]:
         """
@@ -104,19 +134,18 @@ class ComplaintClassificationService:
             Dict containing comprehensive classification results
         """
         import time
-        import hashlib
         
         start_time = time.time()
         self.performance_metrics['total_classifications'] += 1
         
         try:
             # Generate cache key
-            cache_key = hashlib.md5(f"{complaint_title}:{complaint_text}".encode()).hexdigest()
+            cache_key = self._get_cache_key(complaint_text, complaint_title)
             
-            # Check cache first
-            if cache_key in self.classification_cache:
+            # Check cache first (returns a private copy)
+            cached_result = self.classification_cache.get(cache_key)
+            if cached_result is not None:
                 self.performance_metrics['cache_hits'] += 1
-                cached_result = self.classification_cache[cache_key]
                 cached_result['from_cache'] = True
                 return cached_result
             
@@ -127,7 +156,7 @@ class ComplaintClassificationService:
             keyword_result = self._get_quick_classification(processed_data['text'])
             if keyword_result['confidence'] > 0.85:
                 result = self._enhance_classification_result(keyword_result, processed_data)
-                self.classification_cache[cache_key] = result
+                self.classification_cache.set(cache_key, result)
                 self.performance_metrics['successful_classifications'] += 1
                 return result
             
@@ -159,8 +188,10 @@ class ComplaintClassificationService:
                 # Use intelligent fallback when AI is not available
                 result = self._get_intelligent_fallback(complaint_text, complaint_title, "AI service not available")
             
-            # Cache successful result
-            self.classification_cache[cache_key] = result
+            # Cache AI results only; fallbacks (AI unavailable, unparseable
+            # response) must not be served from the shared cache once AI is back
+            if result.get('method') == 'ai_enhanced':
+                self.classification_cache.set(cache_key, result)
             self.performance_metrics['successful_classifications'] += 1
             
             # Update performance metrics
@@ -177,6 +208,15 @@ class ComplaintClassificationService:
             fallback_result = self._get_intelligent_fallback(complaint_text, complaint_title, str(e))
             return fallback_result
     
+    def _get_cache_key(self, complaint_text: str, complaint_title: str = "") -> str:
+        """Cache key from normalized text plus model and prompt version"""
+        return self.classification_cache.make_key(
+            self.model,
+            self.PROMPT_VERSION,
+            normalize_text(complaint_title),
+            normalize_text(complaint_text)
+        )
+    
     def _create_classification_prompt(self, complaint_text: str, complaint_title: str = "") -> str:
         """Create a structured prompt for complaint classification"""
         
@@ -249,24 +289,8 @@ class ComplaintClassificationService:
     
     def _fallback_classification(self, text: str) -> Dict[str, any]:
         """Fallback classification using keyword matching"""
-        text_lower = text.lower()
-        
-        keywords = {
-            'INFRASTRUCTURE': ['road', 'bridge', 'building', 'construction', 'facility', 'infrastructure'],
-            'HEALTHCARE': ['hospital', 'doctor', 'medical', 'health', 'clinic', 'medicine', 'treatment'],
-            'EDUCATION': ['school', 'teacher', 'student', 'education', 'college', 'university', 'class'],
-            'TRANSPORTATION': ['bus', 'train', 'traffic', 'transport', 'vehicle', 'parking', 'metro'],
-            'UTILITIES': ['water', 'electricity', 'power', 'gas', 'waste', 'sewage', 'utility']
-        }
-        
-        max_score = 0
-        best_department = 'INFRASTRUCTURE'
-        
-        for dept, words in keywords.items():
-            score = sum(1 for word in words if word in text_lower)
-            if score > max_score:
-                max_score = score
-                best_department = dept
+        best_department, max_score = FALLBACK_MATCHER.best(text)
+        best_department = best_department or 'INFRASTRUCTURE'
         
         return {
             'department': best_department,
@@ -275,19 +299,203 @@ class ComplaintClassificationService:
             'reasoning': f'Keyword-based fallback classification (matched {max_score} keywords)'
         }
     
-    def classify_multiple_complaints(self, complaints: List[Dict[str, str]]) -> List[Dict[str, any]]:
-        """Classify multiple complaints in batch"""
-        results = []
-        for complaint in complaints:
-            result = self.classify_complaint(
-                complaint.get('text', ''),
-                complaint.get('title', '')
-            )
+    def classify_multiple_complaints(self, complaints: List[Dict[str, str]],
+                                     batch_size: Optional[int] = None,
+                                     max_concurrency: Optional[int] = None) -> List[Dict[str, any]]:
+        """
+        Classify multiple complaints with batched LLM calls
+        
+        Cached and high-confidence keyword results are resolved locally; the
+        remaining complaints are packed ``batch_size`` at a time into a single
+        structured prompt, with up to ``max_concurrency`` batches in flight.
+        Items missing from (or unparseable in) a batch response fall back to
+        keyword classification individually.
+        
+        Args:
+            complaints: List of dicts with 'text', optional 'title' and 'id'
+            batch_size: Complaints per LLM request
+            max_concurrency: Maximum concurrent LLM requests
+            
+        Returns:
+            List of classification results in input order
+        """
+        import time
+        from concurrent.futures import ThreadPoolExecutor
+        
+        classification_settings = getattr(settings, 'COMPLAINT_CLASSIFICATION', {})
+        batch_size = max(1, batch_size or classification_settings.get('BATCH_SIZE', 20))
+        max_concurrency = max(1, max_concurrency or classification_settings.get('BATCH_CONCURRENCY', 4))
+        
+        start_time = time.time()
+        results: List[Optional[Dict[str, any]]] = [None] * len(complaints)
+        pending = []  # (index, processed_data, cache_key)
+        cache_hits = 0
+        
+        for index, complaint in enumerate(complaints):
+            complaint_text = complaint.get('text', '')
+            complaint_title = complaint.get('title', '')
+            cache_key = self._get_cache_key(complaint_text, complaint_title)
+            
+            cached_result = self.classification_cache.get(cache_key)
+            if cached_result is not None:
+                cached_result['from_cache'] = True
+                results[index] = cached_result
+                cache_hits += 1
+                continue
+            
+            processed_data = self._preprocess_complaint(complaint_text, complaint_title)
+            keyword_result = self._get_quick_classification(processed_data['text'])
+            if keyword_result['confidence'] > 0.85:
+                result = self._enhance_classification_result(keyword_result, processed_data)
+                self.classification_cache.set(cache_key, result)
+            elif not self.use_ai:
+                result = self._get_intelligent_fallback(complaint_text, complaint_title, "AI service not available")
+            else:
+                pending.append((index, processed_data, cache_key))
+                continue
+            
+            results[index] = result
+        
+        batches = [pending[i:i + batch_size] for i in range(0, len(pending), batch_size)]
+        batch_stats = []
+        if batches:
+            with ThreadPoolExecutor(max_workers=min(max_concurrency, len(batches))) as executor:
+                for batch, (batch_results, elapsed) in zip(batches, executor.map(self._classify_batch, batches)):
+                    for (index, _, cache_key), result in zip(batch, batch_results):
+                        results[index] = result
+                        if result.get('method') == 'ai_enhanced':
+                            self.classification_cache.set(cache_key, result)
+                    batch_stats.append({
+                        'size': len(batch),
+                        'seconds': round(elapsed, 3),
+                        'items_per_second': round(len(batch) / elapsed, 2) if elapsed > 0 else None,
+                        'ai_results': sum(1 for r in batch_results if r.get('method') == 'ai_enhanced')
+                    })
+        
+        for complaint, result in zip(complaints, results):
             result['complaint_id'] = complaint.get('id')
-            results.append(result)
+        
+        total_time = time.time() - start_time
+        self.performance_metrics['total_classifications'] += len(complaints)
+        self.performance_metrics['successful_classifications'] += len(complaints)
+        self.performance_metrics['cache_hits'] += cache_hits
+        self.last_batch_stats = {
+            'complaints': len(complaints),
+            'cache_hits': cache_hits,
+            'resolved_locally': len(complaints) - len(pending) - cache_hits,
+            'llm_batches': len(batches),
+            'llm_items': len(pending),
+            'seconds': round(total_time, 3),
+            'items_per_second': round(len(complaints) / total_time, 2) if total_time > 0 else None,
+            'batches': batch_stats
+        }
+        logger.info(
+            f"Batch classification: {len(complaints)} complaints, {len(batches)} LLM batches, "
+            f"{self.last_batch_stats['items_per_second']} items/s"
+        )
+        
         return results
-
-
+    
+    def _classify_batch(self, batch: List[tuple]) -> tuple:
+        """Send one packed prompt for a batch; returns (results, elapsed_seconds)"""
+        import time
+        
+        start_time = time.time()
+        processed_items = [processed_data for _, processed_data, _ in batch]
+        items = {}
+        error = 'Item missing from batch response'
+        
+        try:
+            completion = self.client.chat.completions.create(
+                model=self.model,
+                messages=[
+                    {
+                        "role": "system",
+                        "content": self._get_system_prompt()
+                    },
+                    {
+                        "role": "user",
+                        "content": self._create_batch_classification_prompt(processed_items)
+                    }
+                ],
+                temperature=0.2,
+                max_tokens=min(8000, 200 * len(batch) + 200),
+                top_p=0.9,
+                stream=False
+            )
+            items = self._parse_batch_classification_response(completion.choices[0].message.content)
+        except Exception as e:
+            error = str(e)
+            logger.error(f"Batch classification error ({len(batch)} items): {error}")
+        
+        results = []
+        for position, processed_data in enumerate(processed_items):
+            item = items.get(position)
+            result = self._build_ai_result(item, processed_data) if item else None
+            if result is None:
+                result = self._get_intelligent_fallback(processed_data['text'], '', error)
+            results.append(result)
+        
+        return results, time.time() - start_time
+    
+    def _create_batch_classification_prompt(self, processed_items: List[Dict]) -> str:
+        """Pack several preprocessed complaints into one classification prompt"""
+        import json
+        
+        complaints_json = json.dumps(
+            [{'id': position, 'text': item['text']} for position, item in enumerate(processed_items)],
+            ensure_ascii=False
+        )
+        
+        return f"""Classify each of these {len(processed_items)} government complaints independently.
+        
+        Complaints (JSON array):
+        {complaints_json}
+        
+        Respond with ONLY a JSON array containing one object per complaint, using the same "id":
+        [
+            {{
+                "id": 0,
+                "department": "DEPARTMENT_CODE",
+                "confidence": 0.95,
+                "urgency_level": "high",
+                "reasoning": "One sentence explanation",
+                "secondary_departments": [],
+                "estimated_resolution_days": 7,
+                "escalation_needed": false
+            }}
+        ]"""
+    
+    def _parse_batch_classification_response(self, response_text: str) -> Dict[int, Dict]:
+        """Parse a batch response into {item_id: raw_item}; unparseable items are omitted"""
+        import json
+        
+        text = response_text.strip()
+        try:
+            data = json.loads(text)
+        except ValueError:
+            start = text.find('[')
+            end = text.rfind(']') + 1
+            if start == -1 or end == 0:
+                logger.error("No JSON array found in batch classification response")
+                return {}
+            try:
+                data = json.loads(text[start:end])
+            except ValueError as e:
+                logger.error(f"Error parsing batch classification response: {str(e)}")
+                return {}
+        
+        if isinstance(data, dict):
+            data = data.get('results', [])
+        
+        items = {}
+        for item in data if isinstance(data, list) else []:
+            try:
+                items[int(item['id'])] = item
+            except (TypeError, KeyError, ValueError):
+                continue
+        return items
+    
     def _fallback_classification(self, text: str) -> Dict[str, any]:
         """Legacy fallback method - redirects to enhanced fallback"""
         return self._get_intelligent_fallback(text, '', 'Legacy fallback method called')
@@ -318,23 +526,7 @@ class ComplaintClassificationService:
     
     def _get_quick_classification(self, text: str) -> Dict[str, any]:
         """Fast keyword-based classification for high-confidence cases"""
-        text_lower = text.lower()
-        scores = {}
-        
-        for dept_code, dept_info in self.DEPARTMENTS.items():
-            score = 0
-            
-            # Check regular keywords
-            for keyword in dept_info['keywords']:
-                if keyword in text_lower:
-                    score += 1
-            
-            # Check priority keywords (higher weight)
-            for priority_keyword in dept_info['priority_keywords']:
-                if priority_keyword in text_lower:
-                    score += 3
-            
-            scores[dept_code] = score
+        scores = self.keyword_matcher.scores(text, include_zero=True)
         
         # Find best match
         best_dept = max(scores, key=scores.get)
@@ -410,32 +602,10 @@ class ComplaintClassificationService:
             
             if start != -1 and end != 0:
                 json_str = response_text[start:end]
-                result = json.loads(json_str)
-                
-                # Validate and enrich result
-                department = result.get('department', '').upper()
-                if department not in self.DEPARTMENTS:
-                    department = 'INFRASTRUCTURE'  # Safe fallback
-                
-                dept_info = self.DEPARTMENTS[department]
-                
-                return {
-                    'department': department,
-                    'department_name': dept_info['name'],
-                    'department_description': dept_info['description'],
-                    'department_icon': dept_info['icon'],
-                    'department_color': dept_info['color'],
-                    'confidence': min(1.0, float(result.get('confidence', 0.7))),
-                    'urgency_level': result.get('urgency_level', 'medium'),
-                    'reasoning': result.get('reasoning', 'AI classification completed'),
-                    'secondary_departments': result.get('secondary_departments', []),
-                    'estimated_resolution_days': result.get('estimated_resolution_days', 7),
-                    'required_documents': result.get('required_documents', []),
-                    'escalation_needed': result.get('escalation_needed', False),
-                    'method': 'ai_enhanced',
-                    'processing_info': processed_data,
-                    'from_cache': False
-                }
+                result = self._build_ai_result(json.loads(json_str), processed_data)
+                if result is None:
+                    raise ValueError("Invalid classification fields in AI response")
+                return result
             else:
                 raise ValueError("No valid JSON found in AI response")
                 
@@ -443,6 +613,37 @@ class ComplaintClassificationService:
             logger.error(f"Error parsing enhanced AI response: {str(e)}")
             return self._get_intelligent_fallback(processed_data['text'], '', str(e))
     
+    def _build_ai_result(self, result: Dict, processed_data: Dict) -> Optional[Dict[str, any]]:
+        """Validate and enrich one parsed AI classification"""
+        try:
+            # Validate and enrich result
+            department = str(result.get('department', '')).upper()
+            if department not in self.DEPARTMENTS:
+                department = 'INFRASTRUCTURE'  # Safe fallback
+            
+            dept_info = self.DEPARTMENTS[department]
+            
+            return {
+                'department': department,
+                'department_name': dept_info['name'],
+                'department_description': dept_info['description'],
+                'department_icon': dept_info['icon'],
+                'department_color': dept_info['color'],
+                'confidence': min(1.0, float(result.get('confidence', 0.7))),
+                'urgency_level': result.get('urgency_level', 'medium'),
+                'reasoning': result.get('reasoning', 'AI classification completed'),
+                'secondary_departments': result.get('secondary_departments', []),
+                'estimated_resolution_days': result.get('estimated_resolution_days', 7),
+                'required_documents': result.get('required_documents', []),
+                'escalation_needed': result.get('escalation_needed', False),
+                'method': 'ai_enhanced',
+                'processing_info': processed_data,
+                'from_cache': False
+            }
+        except (AttributeError, TypeError, ValueError) as e:
+            logger.error(f"Invalid AI classification item: {str(e)}")
+            return None
+    
     def _get_intelligent_fallback(self, complaint_text: str, complaint_title: str, error: str) -> Dict[str, any]:
         """Intelligent fallback with enhanced reasoning"""
         # Use quick classification as fallback
@@ -477,8 +678,7 @@ class ComplaintClassificationService:
             urgency = 'critical'
         elif processed_data['urgency_score'] >= 1:
             urgency = 'high'
-        elif any(keyword in processed_data['text'].lower() 
-                for keyword in dept_info['priority_keywords']):
+        elif result['department'] in self.priority_matcher.matches_by_label(processed_data['text']):
             urgency = 'high'
         
         result.update({
@@ -517,6 +717,7 @@ class ComplaintClassificationService:
         else:
             metrics['success_rate'] = 0
             metrics['cache_hit_rate'] = 0
+        metrics['cache'] = self.classification_cache.get_stats()
         
         return metrics
     
@@ -542,7 +743,7 @@ class ComplaintClassificationService:
                 'departments_available': len(self.DEPARTMENTS),
                 'test_classification_successful': 'department' in test_result,
                 'performance_metrics': metrics,
-                'cache_size': len(self.classification_cache),
+                'cache_size': len(self.classification_cache.local),
                 'last_test_result': test_result.get('department', 'unknown')
             }
             
@@ -20,6 +20,8 @@ from django.utils import timezone
 
 from .base import BaseModelService, SearchableService, AuditableService
 from ..models import Complaint, Department, AuditTrail, GPSValidation
+from ..spatial import filter_within_radius
+from ..text_dedup import flag_possible_duplicate
 
 if TYPE_CHECKING:
     from django.contrib.auth.models import AbstractUser
@@ -250,6 +252,9 @@ class ComplaintService(SearchableService, AuditableService):
         with transaction.atomic():
             complaint = self.create(complaint_data, created_by=user)
             
+            # Link (never reject) a near-duplicate of a nearby complaint of the same department
+            flag_possible_duplicate(complaint)
+            
             # Create GPS validation record
             self._create_gps_validation(complaint, complaint_data)
             
@@ -410,30 +415,9 @@ class ComplaintService(SearchableService, AuditableService):
     
     def _filter_by_location(self, queryset: QuerySet, latitude: float, 
                            longitude: float, radius_km: float) -> QuerySet:
-        """Filter queryset by location using spatial queries"""
-        # Simple distance calculation - in production, use PostGIS for better performance
-        from math import radians, cos, sin, asin, sqrt
-        
-        def haversine_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
-            """Calculate haversine distance between two points"""
-            lat1, lon1, lat2, lon2 = map(radians, [lat1, lon1, lat2, lon2])
-            dlat = lat2 - lat1
-            dlon = lon2 - lon1
-            a = sin(dlat/2)**2 + cos(lat1) * cos(lat2) * sin(dlon/2)**2
-            return 2 * asin(sqrt(a)) * 6371  # Earth radius in km
-        
-        # Filter complaints within radius
-        nearby_complaints = []
-        for complaint in queryset:
-            if complaint.latitude and complaint.longitude:
-                distance = haversine_distance(
-                    latitude, longitude, 
-                    float(complaint.latitude), float(complaint.longitude)
-                )
-                if distance <= radius_km:
-                    nearby_complaints.append(complaint.id)
-        
-        return queryset.filter(id__in=nearby_complaints)
+        """Filter queryset by location using the geohash cell index"""
+        # Indexed prefix scan over covering cells, exact haversine on candidates only
+        return filter_within_radius(queryset, latitude, longitude, radius_km)
         """
         Get complaints within a geographical area.
         Uses Haversine formula approximation for distance calculation.
@@ -11,6 +11,8 @@ from pathlib import Path
 from PIL import Image
 import mimetypes
 
+from smartgriev.media_cache import cached_analysis
+
 logger = logging.getLogger(__name__)
 
 
@@ -29,6 +31,9 @@ class GeminiVisionService:
     MAX_IMAGE_SIZE_MB = 20
     MAX_VIDEO_SIZE_MB = 100
     
+    # Model name, part of the media analysis cache key
+    MODEL_NAME = 'gemini-1.5-pro'
+    
     def __init__(self, api_key: Optional[str] = None):
         """
         Initialize Gemini Vision Service
@@ -50,7 +55,7 @@ class GeminiVisionService:
         genai.configure(api_key=self.api_key)
         
         # Use Gemini 1.5 Pro for vision tasks (supports multimodal input)
-        self.model = genai.GenerativeModel('gemini-1.5-pro')
+        self.model = genai.GenerativeModel(self.MODEL_NAME)
         
         logger.info("GeminiVisionService initialized with Gemini 1.5 Pro")
     
@@ -69,6 +74,15 @@ class GeminiVisionService:
         Returns:
             Analysis results with issue detection, severity, description
         """
+        # Identical re-uploads are answered from the media analysis cache
+        return cached_analysis(
+            'gemini_vision', self.MODEL_NAME, image_path,
+            lambda: self._analyze_image_uncached(image_path, context),
+            params=(context,)
+        )
+    
+    def _analyze_image_uncached(self, image_path: str, context: Optional[str]) -> Dict[str, Any]:
+        """Call Gemini for one image (see analyze_image)"""
         try:
             # Validate image file
             validation = self._validate_image(image_path)
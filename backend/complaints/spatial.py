@@ -0,0 +1,174 @@
+"""
+Spatial Index Helpers
+
+Geohash cell encoding, cell-cover planning and vectorized haversine filtering
+for radius queries over complaints. Every geo-tagged complaint stores its
+geohash cell in an indexed column, so a radius query becomes a handful of
+indexed prefix scans followed by an exact distance check on the candidates.
+"""
+import math
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from django.db.models import F, Q, QuerySet
+from django.db.models.functions import Coalesce
+
+EARTH_RADIUS_KM = 6371.0
+
+# Precision stored on Complaint.geohash (~153m x 153m cells)
+GEOHASH_PRECISION = 7
+
+# Upper bound on the number of prefixes a single radius query expands to
+MAX_COVER_CELLS = 16
+
+_BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+
+def encode_geohash(latitude: float, longitude: float, precision: int = GEOHASH_PRECISION) -> str:
+    """Encode a coordinate into a geohash string of the given precision"""
+    lat_lo, lat_hi = -90.0, 90.0
+    lon_lo, lon_hi = -180.0, 180.0
+    chars = []
+    bits = 0
+    bit_count = 0
+    even = True
+
+    while len(chars) < precision:
+        if even:
+            mid = (lon_lo + lon_hi) / 2
+            if longitude >= mid:
+                bits = (bits << 1) | 1
+                lon_lo = mid
+            else:
+                bits <<= 1
+                lon_hi = mid
+        else:
+            mid = (lat_lo + lat_hi) / 2
+            if latitude >= mid:
+                bits = (bits << 1) | 1
+                lat_lo = mid
+            else:
+                bits <<= 1
+                lat_hi = mid
+        even = not even
+        bit_count += 1
+
+        if bit_count == 5:
+            chars.append(_BASE32[bits])
+            bits = 0
+            bit_count = 0
+
+    return ''.join(chars)
+
+
+def cell_size(precision: int) -> Tuple[float, float]:
+    """Return (lat_height, lon_width) in degrees of a geohash cell"""
+    total_bits = 5 * precision
+    lon_bits = (total_bits + 1) // 2
+    lat_bits = total_bits // 2
+    return 180.0 / (1 << lat_bits), 360.0 / (1 << lon_bits)
+
+
+def _bounding_box(latitude: float, longitude: float,
+                  radius_km: float) -> Tuple[float, float, float, float]:
+    """Degree bounding box that fully contains the search circle"""
+    lat_delta = math.degrees(radius_km / EARTH_RADIUS_KM)
+    cos_lat = max(math.cos(math.radians(latitude)), 1e-6)
+    lon_delta = min(math.degrees(radius_km / (EARTH_RADIUS_KM * cos_lat)), 180.0)
+    return (
+        max(latitude - lat_delta, -90.0),
+        min(latitude + lat_delta, 90.0),
+        longitude - lon_delta,
+        longitude + lon_delta,
+    )
+
+
+def cover_cells(latitude: float, longitude: float, radius_km: float,
+                max_cells: int = MAX_COVER_CELLS) -> List[str]:
+    """
+    Plan the set of geohash prefixes covering a (lat, lon, radius) circle.
+
+    Picks the finest precision (up to GEOHASH_PRECISION) whose cells tile the
+    circle's bounding box in at most ``max_cells`` cells, then enumerates
+    those cells.
+    """
+    lat_min, lat_max, lon_min, lon_max = _bounding_box(latitude, longitude, radius_km)
+
+    for precision in range(GEOHASH_PRECISION, 0, -1):
+        cell_h, cell_w = cell_size(precision)
+        rows = range(math.floor((lat_min + 90.0) / cell_h), math.floor((lat_max + 90.0) / cell_h) + 1)
+        cols = range(math.floor((lon_min + 180.0) / cell_w), math.floor((lon_max + 180.0) / cell_w) + 1)
+        if len(rows) * len(cols) <= max_cells:
+            break
+
+    n_rows = int(round(180.0 / cell_h))
+    n_cols = int(round(360.0 / cell_w))
+    cells = set()
+    for row in rows:
+        center_lat = -90.0 + (min(row, n_rows - 1) + 0.5) * cell_h
+        for col in cols:
+            # Wrap across the antimeridian
+            center_lon = -180.0 + ((col % n_cols) + 0.5) * cell_w
+            cells.add(encode_geohash(center_lat, center_lon, precision))
+
+    return sorted(cells)
+
+
+def cover_query(cells: Iterable[str], field: str = 'geohash') -> Q:
+    """Build an OR of indexed prefix lookups for the given cells"""
+    query = Q()
+    for cell in cells:
+        query |= Q(**{f'{field}__startswith': cell})
+    return query
+
+
+def haversine_km(latitude: float, longitude: float,
+                 latitudes: Sequence[float], longitudes: Sequence[float]) -> np.ndarray:
+    """Vectorized great-circle distance (km) from one point to many"""
+    lat1 = np.radians(latitude)
+    lon1 = np.radians(longitude)
+    lat2 = np.radians(np.asarray(latitudes, dtype=np.float64))
+    lon2 = np.radians(np.asarray(longitudes, dtype=np.float64))
+
+    a = (np.sin((lat2 - lat1) / 2.0) ** 2
+         + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2.0) ** 2)
+    return 2.0 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def nearby_ids(queryset: QuerySet, latitude: float, longitude: float,
+               radius_km: float, limit: Optional[int] = None) -> List[int]:
+    """
+    Return ids of complaints in ``queryset`` within ``radius_km`` of the point,
+    ordered by distance.
+
+    Only rows in the covering geohash cells are fetched, and only their
+    (id, lat, lon) columns.
+    """
+    candidates = list(
+        queryset.filter(cover_query(cover_cells(latitude, longitude, radius_km)))
+        .annotate(
+            _lat=Coalesce(F('incident_latitude'), F('location_lat')),
+            _lon=Coalesce(F('incident_longitude'), F('location_lon')),
+        )
+        .values_list('id', '_lat', '_lon')
+    )
+    if not candidates:
+        return []
+
+    ids = np.fromiter((row[0] for row in candidates), dtype=np.int64, count=len(candidates))
+    lats = np.fromiter((row[1] for row in candidates), dtype=np.float64, count=len(candidates))
+    lons = np.fromiter((row[2] for row in candidates), dtype=np.float64, count=len(candidates))
+
+    distances = haversine_km(latitude, longitude, lats, lons)
+    mask = distances <= radius_km
+    order = np.argsort(distances[mask], kind='stable')
+    result = ids[mask][order]
+    if limit is not None:
+        result = result[:limit]
+    return result.tolist()
+
+
+def filter_within_radius(queryset: QuerySet, latitude: float, longitude: float,
+                         radius_km: float) -> QuerySet:
+    """Restrict a complaint queryset to rows within ``radius_km`` of the point"""
+    return queryset.filter(id__in=nearby_ids(queryset, latitude, longitude, radius_km))
@@ -0,0 +1,240 @@
+"""
+Near-Duplicate Complaint Text Detection
+
+Complaint text is normalized, cut into overlapping character shingles and
+summarised as a MinHash signature (NUM_PERMUTATIONS 32-bit minima, stored on
+Complaint.text_minhash). The signature is split into LSH_BANDS bands; each
+band hashes to one bucket key stored in ComplaintTextBucket. Texts whose
+shingle sets have Jaccard similarity J share at least one bucket with
+probability 1 - (1 - J^r)^b, so a duplicate lookup is one indexed
+``bucket IN (...)`` query followed by an exact signature comparison on the
+few candidates, instead of a scan over all complaints.
+
+Character shingles (rather than word shingles) keep the signature stable
+across minor rewording, spelling variants and scripts without word spacing.
+
+Similar text alone does not make a duplicate (every pothole report reads
+alike), so flag_possible_duplicate only compares complaints of the same
+department in the same geohash neighbourhood, and links the closest match
+through Complaint.possible_duplicate_of instead of rejecting the complaint.
+"""
+import hashlib
+import re
+import unicodedata
+import zlib
+from datetime import timedelta
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+from django.utils import timezone
+
+from .spatial import cover_cells, cover_query
+
+NUM_PERMUTATIONS = 128
+LSH_BANDS = 32
+ROWS_PER_BAND = NUM_PERMUTATIONS // LSH_BANDS
+
+SHINGLE_SIZE = 4
+
+# Estimated Jaccard similarity at which two complaints count as duplicates
+DUPLICATE_THRESHOLD = 0.7
+
+# Neighbourhood searched around the incident location
+DUPLICATE_RADIUS_KM = 0.5
+
+# Only complaints filed this recently are considered duplicates
+DUPLICATE_WINDOW_DAYS = 30
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+
+_rng = np.random.RandomState(20240601)  # Fixed seed: stored signatures depend on it
+_PERM_A = _rng.randint(1, (1 << 31) - 1, size=NUM_PERMUTATIONS, dtype=np.int64).astype(np.uint64)
+_PERM_B = _rng.randint(0, (1 << 31) - 1, size=NUM_PERMUTATIONS, dtype=np.int64).astype(np.uint64)
+
+_NON_WORD = re.compile(r'[\W_]+', re.UNICODE)
+
+
+def normalize_text(text: str) -> str:
+    """NFKC, case-fold, and collapse punctuation/whitespace runs to one space"""
+    text = unicodedata.normalize('NFKC', text or '').casefold()
+    return _NON_WORD.sub(' ', text).strip()
+
+
+def shingle_hashes(text: str, size: int = SHINGLE_SIZE) -> np.ndarray:
+    """32-bit hashes of the distinct character shingles of the normalized text"""
+    text = normalize_text(text)
+    if not text:
+        return np.empty(0, dtype=np.uint64)
+    if len(text) <= size:
+        shingles = {text}
+    else:
+        shingles = {text[i:i + size] for i in range(len(text) - size + 1)}
+    return np.fromiter(
+        (zlib.crc32(shingle.encode('utf-8')) for shingle in shingles),
+        dtype=np.uint64, count=len(shingles),
+    )
+
+
+def minhash_signature(text: str) -> Optional[np.ndarray]:
+    """MinHash signature (NUM_PERMUTATIONS uint32) of the text, or None for empty text"""
+    hashes = shingle_hashes(text)
+    if len(hashes) == 0:
+        return None
+    # (a * x + b) mod p stays below 2**64 because a, b < 2**31 and x < 2**32
+    permuted = (np.outer(hashes, _PERM_A) + _PERM_B) % _MERSENNE_PRIME
+    return (permuted & _MAX_HASH).min(axis=0).astype(np.uint32)
+
+
+def signature_to_bytes(signature: Optional[np.ndarray]) -> Optional[bytes]:
+    return None if signature is None else signature.astype('<u4').tobytes()
+
+
+def signature_from_bytes(data) -> Optional[np.ndarray]:
+    return None if not data else np.frombuffer(bytes(data), dtype='<u4')
+
+
+def band_buckets(signature: np.ndarray) -> List[int]:
+    """One signed 64-bit bucket key per LSH band (the band number is part of the key)"""
+    rows = signature.astype('<u4').reshape(LSH_BANDS, ROWS_PER_BAND)
+    buckets = []
+    for band, values in enumerate(rows):
+        digest = hashlib.blake2b(values.tobytes(), digest_size=8, person=band.to_bytes(2, 'little')).digest()
+        buckets.append(int.from_bytes(digest, 'little', signed=True))
+    return buckets
+
+
+def estimated_similarity(signature: np.ndarray, others: np.ndarray) -> np.ndarray:
+    """Estimated Jaccard similarity between one signature and a (N, NUM_PERMUTATIONS) matrix"""
+    return (np.atleast_2d(others) == signature).mean(axis=1)
+
+
+def complaint_text(complaint) -> str:
+    """Text a complaint is fingerprinted on (original plus translation)"""
+    return ' '.join(part for part in (complaint.description, complaint.translated_text) if part)
+
+
+def replace_buckets(complaint_id: int, signature: Optional[np.ndarray]) -> None:
+    """Rewrite the LSH bucket rows of one complaint"""
+    from .models import ComplaintTextBucket
+
+    ComplaintTextBucket.objects.filter(complaint_id=complaint_id).delete()
+    if signature is not None:
+        ComplaintTextBucket.objects.bulk_create(
+            ComplaintTextBucket(complaint_id=complaint_id, bucket=bucket)
+            for bucket in band_buckets(signature)
+        )
+
+
+def find_duplicate_complaints(text: str, queryset=None, threshold: float = DUPLICATE_THRESHOLD,
+                              window_days: Optional[int] = DUPLICATE_WINDOW_DAYS,
+                              exclude_ids: Sequence[int] = (), limit: int = 5,
+                              latitude: Optional[float] = None, longitude: Optional[float] = None,
+                              radius_km: float = DUPLICATE_RADIUS_KM) -> List[Dict]:
+    """
+    Recent complaints whose text is a near-duplicate of ``text``.
+
+    Args:
+        text: Incoming complaint text
+        queryset: Complaint queryset to search (default: all complaints)
+        threshold: Minimum estimated Jaccard similarity
+        window_days: Only consider complaints created within this many days (None: no limit)
+        exclude_ids: Complaint ids to skip
+        limit: Maximum number of matches
+        latitude, longitude: Only consider complaints in the geohash cells
+            covering ``radius_km`` around this point
+        radius_km: Neighbourhood radius used with ``latitude``/``longitude``
+
+    Returns:
+        List of dicts with complaint_id, complaint_number and similarity,
+        most similar first
+    """
+    from .models import Complaint, ComplaintTextBucket
+
+    signature = minhash_signature(text)
+    if signature is None:
+        return []
+
+    bucketed = ComplaintTextBucket.objects.filter(bucket__in=band_buckets(signature)).values('complaint_id')
+    candidates = (queryset if queryset is not None else Complaint.objects.all()).filter(
+        id__in=bucketed, text_minhash__isnull=False
+    ).exclude(id__in=exclude_ids)
+    if window_days is not None:
+        candidates = candidates.filter(created_at__gte=timezone.now() - timedelta(days=window_days))
+    if latitude is not None and longitude is not None:
+        candidates = candidates.filter(cover_query(cover_cells(latitude, longitude, radius_km)))
+
+    rows = list(candidates.order_by().values_list('id', 'complaint_number', 'text_minhash'))
+    if not rows:
+        return []
+
+    signatures = np.stack([signature_from_bytes(row[2]) for row in rows])
+    similarities = estimated_similarity(signature, signatures)
+    matches = [
+        {'complaint_id': row[0], 'complaint_number': row[1], 'similarity': float(similarity)}
+        for row, similarity in zip(rows, similarities)
+        if similarity >= threshold
+    ]
+    matches.sort(key=lambda match: match['similarity'], reverse=True)
+    return matches[:limit]
+
+
+def flag_possible_duplicate(complaint) -> Optional[Dict]:
+    """
+    Link a saved complaint to its closest near-duplicate, if any.
+
+    Candidates must belong to the same department (the same category when no
+    department is assigned) and lie in the complaint's neighbourhood, so a
+    complaint without coordinates is never flagged. Returns the match (see
+    find_duplicate_complaints) after setting ``possible_duplicate_of``.
+    """
+    from .models import Complaint
+
+    coordinates = complaint.get_incident_coordinates()
+    if coordinates.latitude is None or coordinates.longitude is None:
+        return None
+    if complaint.department_id:
+        queryset = Complaint.objects.filter(department_id=complaint.department_id)
+    elif complaint.category_id:
+        queryset = Complaint.objects.filter(category_id=complaint.category_id)
+    else:
+        return None
+
+    matches = find_duplicate_complaints(
+        complaint_text(complaint), queryset,
+        exclude_ids=[complaint.pk], limit=1,
+        latitude=coordinates.latitude, longitude=coordinates.longitude,
+    )
+    if not matches:
+        return None
+    complaint.possible_duplicate_of_id = matches[0]['complaint_id']
+    Complaint.objects.filter(pk=complaint.pk).update(possible_duplicate_of_id=complaint.possible_duplicate_of_id)
+    return matches[0]
+
+
+def find_intake_duplicate(text: str, latitude: Optional[float],
+                          longitude: Optional[float]) -> Optional[Dict]:
+    """
+    Closest near-duplicate of a complaint that has not been classified yet.
+
+    The department is not known at this point, so every nearby complaint is
+    a candidate. Returns the match (see find_duplicate_complaints) with the
+    original's category, department_id and urgency_level, which intake reuses
+    instead of classifying the text again, or None.
+    """
+    from .models import Complaint
+
+    if latitude is None or longitude is None:
+        return None
+    for match in find_duplicate_complaints(text, limit=1, latitude=latitude, longitude=longitude):
+        original = (Complaint.objects.select_related('category')
+                    .filter(pk=match['complaint_id']).first())
+        if original is None:
+            return None
+        return {
+            **match,
+            'category': original.category.name if original.category else 'General',
+            'department_id': original.department_id,
+            'urgency_level': original.urgency_level,
+        }
+    return None
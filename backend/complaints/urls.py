@@ -12,6 +12,7 @@ from .views import (
     GPSValidationView,
     validate_gps_location,
     nearby_complaints,
+    similar_image_complaints,
     classify_complaint_text,
 )
 from .api_views import (
@@ -95,6 +96,7 @@ urlpatterns = [
     path('<int:pk>/gps-validation/', GPSValidationView.as_view(), name='gps-validation'),
     path('<int:complaint_id>/validate-gps/', validate_gps_location, name='validate-gps-location'),
     path('nearby/', nearby_complaints, name='nearby-complaints'),
+    path('similar-images/', similar_image_complaints, name='similar-image-complaints'),
     path('location-history/', IncidentLocationHistoryView.as_view(), name='all-location-history'),
     
     # AI Classification
@@ -1,6 +1,19 @@
+from collections import defaultdict
 from math import radians, sin, cos, sqrt, atan2
+
+import numpy as np
 from django.conf import settings
+from django.db.models import Q
+
 from .models import Complaint
+from .spatial import GEOHASH_PRECISION, cover_cells, cover_query, haversine_km, nearby_ids
+
+# Complaints closer than this are flagged as a possible duplicate location
+DUPLICATE_LOCATION_RADIUS_M = 100
+
+# Max cells per geohash__in lookup when loading reference points in bulk mode
+_CELL_LOOKUP_CHUNK = 500
+
 
 def calculate_distance(lat1, lon1, lat2, lon2):
     R = 6371000  # Earth radius in meters
@@ -14,9 +27,8 @@ def calculate_distance(lat1, lon1, lat2, lon2):
     
     return R * c
 
-def perform_gps_validation(complaint):
-    """Perform GPS validation checks"""
-    results = {
+def _new_results():
+    return {
         'accuracy_check': True,
         'range_check': True,
         'duplicate_check': True,
@@ -25,42 +37,133 @@ def perform_gps_validation(complaint):
         'is_valid': True,
         'notes': ''
     }
-    
-    notes = []
-    
+
+def _check_accuracy_and_range(results, notes, latitude, longitude, gps_accuracy):
+    """Accuracy threshold and service-area checks (no DB access)"""
     # Check GPS accuracy
-    if complaint.gps_accuracy and complaint.gps_accuracy > settings.GPS_ACCURACY_THRESHOLD:
+    if gps_accuracy and gps_accuracy > settings.GPS_ACCURACY_THRESHOLD:
         results['accuracy_check'] = False
-        notes.append(f"GPS accuracy too low: {complaint.gps_accuracy}m")
-    
+        notes.append(f"GPS accuracy too low: {gps_accuracy}m")
+
     # Check if coordinates are within service area
-    if complaint.incident_latitude and complaint.incident_longitude:
-        if not (settings.MIN_LAT <= complaint.incident_latitude <= settings.MAX_LAT and \
-                settings.MIN_LON <= complaint.incident_longitude <= settings.MAX_LON):
+    if latitude and longitude:
+        if not (settings.MIN_LAT <= latitude <= settings.MAX_LAT and \
+                settings.MIN_LON <= longitude <= settings.MAX_LON):
             results['range_check'] = False
             notes.append("Location outside service area")
-    
-    # Check for duplicate locations
-    if complaint.incident_latitude and complaint.incident_longitude:
-        nearby_complaints = Complaint.objects.filter(
-            incident_latitude__isnull=False,
-            incident_longitude__isnull=False
-        ).exclude(id=complaint.id)
-        
-        for nearby in nearby_complaints:
-            distance = calculate_distance(
-                complaint.incident_latitude, complaint.incident_longitude,
-                nearby.incident_latitude, nearby.incident_longitude
-            )
-            if distance < 100:  # Within 100 meters
-                results['duplicate_check'] = False
-                notes.append(f"Similar location within 100m (Complaint #{nearby.id})")
-                break
-    
+
+def _finalize_results(results, notes):
     # Calculate overall score
     checks = [results['accuracy_check'], results['range_check'], results['duplicate_check'], results['speed_check']]
     results['score'] = sum(checks) / len(checks)
     results['is_valid'] = results['score'] >= 0.75
     results['notes'] = '; '.join(notes) if notes else 'All validation checks passed'
-    
     return results
+
+def perform_gps_validation(complaint):
+    """Perform GPS validation checks"""
+    results = _new_results()
+    notes = []
+
+    _check_accuracy_and_range(
+        results, notes,
+        complaint.incident_latitude, complaint.incident_longitude, complaint.gps_accuracy
+    )
+
+    # Check for duplicate locations (geohash cell lookup, exact distance on candidates)
+    if complaint.incident_latitude and complaint.incident_longitude:
+        nearest = nearby_ids(
+            Complaint.objects.filter(incident_latitude__isnull=False, incident_longitude__isnull=False)
+            .exclude(id=complaint.id),
+            complaint.incident_latitude, complaint.incident_longitude,
+            DUPLICATE_LOCATION_RADIUS_M / 1000.0,
+            limit=1
+        )
+        if nearest:
+            results['duplicate_check'] = False
+            notes.append(f"Similar location within {DUPLICATE_LOCATION_RADIUS_M}m (Complaint #{nearest[0]})")
+
+    return _finalize_results(results, notes)
+
+def _load_reference_points(cells):
+    """
+    Load geo-tagged complaints in the given geohash cells.
+
+    Returns {cell: (ids, lats, lons)} with NumPy arrays per cell.
+    """
+    by_precision = defaultdict(list)
+    for cell in cells:
+        by_precision[len(cell)].append(cell)
+
+    grouped = defaultdict(list)
+    for precision, precision_cells in by_precision.items():
+        for start in range(0, len(precision_cells), _CELL_LOOKUP_CHUNK):
+            chunk = precision_cells[start:start + _CELL_LOOKUP_CHUNK]
+            if precision == GEOHASH_PRECISION:
+                cell_filter = Q(geohash__in=chunk)
+            else:
+                cell_filter = cover_query(chunk)
+            rows = (
+                Complaint.objects.filter(
+                    cell_filter,
+                    incident_latitude__isnull=False,
+                    incident_longitude__isnull=False
+                )
+                .values_list('id', 'incident_latitude', 'incident_longitude', 'geohash')
+            )
+            for complaint_id, lat, lon, geohash in rows:
+                grouped[geohash[:precision]].append((complaint_id, lat, lon))
+
+    index = {}
+    for cell, points in grouped.items():
+        ids, lats, lons = zip(*points)
+        index[cell] = (
+            np.asarray(ids, dtype=np.int64),
+            np.asarray(lats, dtype=np.float64),
+            np.asarray(lons, dtype=np.float64),
+        )
+    return index
+
+def perform_bulk_gps_validation(queryset):
+    """
+    Validate every complaint in ``queryset`` in one pass.
+
+    Reference points for the duplicate check are loaded once, bucketed by
+    geohash cell, and each complaint is compared only against the points in
+    its covering cells with a vectorized haversine. Returns
+    {complaint_id: results} in the same shape as perform_gps_validation.
+    """
+    radius_km = DUPLICATE_LOCATION_RADIUS_M / 1000.0
+    rows = list(queryset.values_list('id', 'incident_latitude', 'incident_longitude', 'gps_accuracy'))
+
+    covers = {
+        complaint_id: cover_cells(lat, lon, radius_km)
+        for complaint_id, lat, lon, _ in rows
+        if lat and lon
+    }
+    index = _load_reference_points({cell for cells in covers.values() for cell in cells})
+
+    all_results = {}
+    for complaint_id, lat, lon, gps_accuracy in rows:
+        results = _new_results()
+        notes = []
+        _check_accuracy_and_range(results, notes, lat, lon, gps_accuracy)
+
+        buckets = [index[cell] for cell in covers.get(complaint_id, ()) if cell in index]
+        if buckets:
+            ids = np.concatenate([bucket[0] for bucket in buckets])
+            lats = np.concatenate([bucket[1] for bucket in buckets])
+            lons = np.concatenate([bucket[2] for bucket in buckets])
+
+            distances = haversine_km(lat, lon, lats, lons)
+            distances[ids == complaint_id] = np.inf
+            nearest = int(np.argmin(distances))
+            if distances[nearest] < radius_km:
+                results['duplicate_check'] = False
+                notes.append(
+                    f"Similar location within {DUPLICATE_LOCATION_RADIUS_M}m (Complaint #{int(ids[nearest])})"
+                )
+
+        all_results[complaint_id] = _finalize_results(results, notes)
+
+    return all_results
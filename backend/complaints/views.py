@@ -3,7 +3,6 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.decorators import api_view, permission_classes
 from django.db.models import Q, Count
-from math import cos, radians
 import logging
 import traceback
 
@@ -20,6 +19,7 @@ from complaints.serializers import (
 from complaints.services import ComplaintService
 from complaints.services.classification_service import complaint_classifier
 from complaints.utils import perform_gps_validation
+from complaints.spatial import nearby_ids
 
 logger = logging.getLogger(__name__)
 
@@ -377,16 +377,7 @@ def nearby_complaints(request):
     
     lat, lon = float(lat), float(lon)
     
-    # Simple bounding box search (for better performance, consider using PostGIS)
-    lat_range = radius / 111000  # Rough conversion: 1 degree ≈ 111km
-    lon_range = radius / (111000 * cos(radians(lat)))
-    
-    nearby = Complaint.objects.filter(
-        incident_latitude__range=[lat - lat_range, lat + lat_range],
-        incident_longitude__range=[lon - lon_range, lon + lon_range],
-        incident_latitude__isnull=False,
-        incident_longitude__isnull=False
-    )
+    nearby = Complaint.objects.all()
     
     # Filter by user permissions
     if not request.user.is_officer:
@@ -394,8 +385,70 @@ def nearby_complaints(request):
     else:
         nearby = nearby.filter(department__officer=request.user)
     
+    # Geohash cell cover + exact distance filter, nearest first
+    ids = nearby_ids(nearby, lat, lon, radius / 1000.0)
+    by_id = Complaint.objects.select_related('user', 'department').in_bulk(ids)
+    nearby = [by_id[complaint_id] for complaint_id in ids]
+    
     serializer = ComplaintSerializer(nearby, many=True)
     return Response({
-        'count': nearby.count(),
+        'count': len(nearby),
         'complaints': serializer.data
+    })
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def similar_image_complaints(request):
+    """Find visually similar complaints near a location (duplicate check at intake)"""
+    from PIL import Image
+    from machine_learning.image_index import find_similar_complaints
+    
+    image_file = request.FILES.get('image')
+    lat = request.data.get('lat')
+    lon = request.data.get('lon')
+    
+    if not image_file or not lat or not lon:
+        return Response({'error': 'Image, latitude and longitude required'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    try:
+        lat, lon = float(lat), float(lon)
+        radius = min(max(float(request.data.get('radius', 500)), 0.0), 5000.0)  # Default 500m, max 5km
+        limit = min(max(int(request.data.get('limit', 10)), 1), 50)
+    except (TypeError, ValueError):
+        return Response({'error': 'lat, lon, radius and limit must be numbers'}, status=status.HTTP_400_BAD_REQUEST)
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180) or radius != radius:
+        return Response({'error': 'Invalid coordinates or radius'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    try:
+        image = Image.open(image_file)
+        image.load()
+    except Exception:
+        return Response({'error': 'Invalid image file'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    matches = find_similar_complaints(image, lat, lon, radius / 1000.0, k=limit)
+    if matches is None:
+        return Response({'error': 'Image similarity is not available'}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+    
+    # Only report complaints the user may see (same rules as nearby_complaints)
+    visible = Complaint.objects.filter(id__in=[m['complaint_id'] for m in matches])
+    if not request.user.is_officer:
+        visible = visible.filter(user=request.user)
+    else:
+        visible = visible.filter(department__officer=request.user)
+    by_id = visible.select_related('user', 'department').in_bulk()
+    
+    results = []
+    for match in matches:
+        complaint = by_id.get(match['complaint_id'])
+        if complaint is None:
+            continue
+        results.append({
+            'similarity': round(match['similarity'], 4),
+            'distance_m': round(match['distance_km'] * 1000.0, 1),
+            'complaint': ComplaintSerializer(complaint).data,
+        })
+    
+    return Response({
+        'count': len(results),
+        'matches': results
     })
\ No newline at end of file
@@ -3,14 +3,23 @@ Advanced Multi-Model Image Processing for SmartGriev
 Combines YOLO, OCR, Scene Detection, and other models for comprehensive analysis
 """
 
+import hashlib
 import logging
 import os
+import weakref
 from typing import Dict, List, Any, Optional, Tuple
 from pathlib import Path
 import cv2
 import numpy as np
 from PIL import Image
 import json
+from django.conf import settings
+import threading
+
+from smartgriev.media_cache import cached_analysis
+
+from .model_registry import get_model_registry
+from .onnx_backend import EAGER, ONNX_AVAILABLE, ONNX_BACKENDS, OnnxCLIP, get_backend, softmax
 
 logger = logging.getLogger(__name__)
 
@@ -93,6 +102,69 @@ except Exception as e:
     keras_image = None
     logger.warning(f"Failed to import TensorFlow: {e}")
 
+# Default zero-shot scene labels for CLIP; override with settings.CLIP_SCENE_LABELS
+SCENE_CATEGORIES = [
+    "damaged road with potholes",
+    "garbage and waste dumping",
+    "water leakage and flooding",
+    "broken street light",
+    "illegal construction",
+    "traffic congestion",
+    "tree cutting or damage",
+    "public property damage",
+    "cleanliness issue",
+    "infrastructure problem",
+]
+
+# Normalized label embeddings per loaded CLIP model, dropped with the model on eviction
+_LABEL_EMBEDDINGS = weakref.WeakKeyDictionary()
+_LABEL_EMBEDDINGS_LOCK = threading.Lock()
+
+# Model registry names; each model is loaded on first use or when warmed
+YOLO_MODEL = 'yolov8n'
+EASYOCR_MODEL = 'easyocr'
+CLIP_MODEL = 'clip-vit-base-patch32'
+RESNET_MODEL = 'resnet50'
+
+
+def _load_clip():
+    return (
+        CLIPModel.from_pretrained("openai/clip-vit-base-patch32"),
+        CLIPProcessor.from_pretrained("openai/clip-vit-base-patch32"),
+    )
+
+
+def _onnx_clip_loader(backend: str):
+    def load():
+        return (
+            OnnxCLIP("openai/clip-vit-base-patch32", backend),
+            CLIPProcessor.from_pretrained("openai/clip-vit-base-patch32"),
+        )
+    return load
+
+
+def register_models(registry) -> None:
+    """Register the models whose libraries are installed"""
+    if YOLO_AVAILABLE:
+        registry.register(YOLO_MODEL, lambda: YOLO('yolov8n.pt'), size_mb=50)  # YOLOv8 nano for speed
+    if OCR_AVAILABLE:
+        registry.register(EASYOCR_MODEL, lambda: easyocr.Reader(['en', 'hi']), size_mb=300)  # English and Hindi
+    if TRANSFORMERS_AVAILABLE:
+        registry.register(CLIP_MODEL, _load_clip, size_mb=600)
+        if ONNX_AVAILABLE:
+            for backend, size_mb in zip(ONNX_BACKENDS, (600, 160)):
+                registry.register(f'{CLIP_MODEL}-{backend}', _onnx_clip_loader(backend), size_mb=size_mb)
+    if KERAS_AVAILABLE:
+        registry.register(RESNET_MODEL, lambda: ResNet50(weights='imagenet'), size_mb=200)
+
+
+register_models(get_model_registry())
+
+
+def _normalize_rows(embeddings: np.ndarray) -> np.ndarray:
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    return embeddings / np.maximum(np.linalg.norm(embeddings, axis=-1, keepdims=True), 1e-12)
+
 
 class AdvancedImageProcessor:
     """
@@ -115,48 +187,51 @@ class AdvancedImageProcessor:
         'construction': ['construction', 'building', 'excavation', 'debris']
     }
     
-    def __init__(self):
-        """Initialize all available models"""
-        self.yolo_model = None
-        self.ocr_reader = None
-        self.clip_model = None
-        self.clip_processor = None
-        self.resnet_model = None
-        
-        self._initialize_models()
+    def __init__(self, clip_backend: Optional[str] = None, scene_labels: Optional[List[str]] = None):
+        """
+        Models are loaded lazily through the model registry.
+        
+        Args:
+            clip_backend: 'eager', 'onnx' or 'onnx-int8' (default: INFERENCE_BACKENDS['clip'])
+            scene_labels: Zero-shot CLIP labels (default: settings.CLIP_SCENE_LABELS or SCENE_CATEGORIES)
+        """
+        self.registry = get_model_registry()
+        self.clip_backend = get_backend('clip', clip_backend)
+        self.clip_registry_name = CLIP_MODEL if self.clip_backend == EAGER else f'{CLIP_MODEL}-{self.clip_backend}'
+        self.scene_labels = list(scene_labels or getattr(settings, 'CLIP_SCENE_LABELS', None) or SCENE_CATEGORIES)
+    
+    @property
+    def scene_labels_digest(self) -> str:
+        """Short hash of the scene label set (changing the labels changes results)"""
+        return hashlib.sha1('\n'.join(self.scene_labels).encode()).hexdigest()[:12]
     
-    def _initialize_models(self):
-        """Load all available AI models"""
-        try:
-            # Initialize YOLO
-            if YOLO_AVAILABLE:
-                logger.info("Loading YOLO model...")
-                self.yolo_model = YOLO('yolov8n.pt')  # Using YOLOv8 nano for speed
-                logger.info("✓ YOLO model loaded")
-            
-            # Initialize OCR
-            if OCR_AVAILABLE:
-                logger.info("Loading OCR models...")
-                self.ocr_reader = easyocr.Reader(['en', 'hi'])  # English and Hindi
-                logger.info("✓ OCR models loaded")
-            
-            # Initialize CLIP for scene understanding
-            if TRANSFORMERS_AVAILABLE:
-                logger.info("Loading CLIP model...")
-                self.clip_model = CLIPModel.from_pretrained("openai/clip-vit-base-patch32")
-                self.clip_processor = CLIPProcessor.from_pretrained("openai/clip-vit-base-patch32")
-                logger.info("✓ CLIP model loaded")
-            
-            # Initialize ResNet for classification
-            if KERAS_AVAILABLE:
-                logger.info("Loading ResNet model...")
-                self.resnet_model = ResNet50(weights='imagenet')
-                logger.info("✓ ResNet model loaded")
-            
-            logger.info("Advanced Image Processor initialized successfully")
-            
-        except Exception as e:
-            logger.error(f"Model initialization error: {str(e)}")
+    def _get_model(self, name: str):
+        """Registered model (loading it if needed), or None when unavailable"""
+        return self.registry.get(name) if self.registry.is_registered(name) else None
+    
+    @property
+    def yolo_model(self):
+        return self._get_model(YOLO_MODEL)
+    
+    @property
+    def ocr_reader(self):
+        return self._get_model(EASYOCR_MODEL)
+    
+    @property
+    def clip_model(self):
+        clip = self._get_model(self.clip_registry_name)
+        return clip[0] if clip else None
+    
+    @property
+    def resnet_model(self):
+        return self._get_model(RESNET_MODEL)
+    
+    def available_models(self) -> List[str]:
+        """Registered models that have not failed to load (without loading them)"""
+        return [
+            name for name in (YOLO_MODEL, EASYOCR_MODEL, self.clip_registry_name, RESNET_MODEL)
+            if self.registry.is_registered(name) and not self.registry.is_failed(name)
+        ]
     
     def analyze_image(self, image_path: str) -> Dict[str, Any]:
         """
@@ -168,13 +243,24 @@ class AdvancedImageProcessor:
         Returns:
             Complete analysis results
         """
+        if not os.path.exists(image_path):
+            return {'success': False, 'error': 'Image file not found'}
+        
+        # The available models are part of the key: results differ when one is missing
+        result = cached_analysis(
+            'image_processor', '+'.join(self.available_models()), image_path,
+            lambda: self._analyze_image_uncached(image_path),
+            params=(self.scene_labels_digest,)
+        )
+        if result.get('cache_hit'):
+            result['image_path'] = image_path
+        return result
+    
+    def _analyze_image_uncached(self, image_path: str) -> Dict[str, Any]:
+        """Run every available model on one image (see analyze_image)"""
         logger.info(f"Starting comprehensive image analysis: {image_path}")
         
         try:
-            # Load image
-            if not os.path.exists(image_path):
-                return {'success': False, 'error': 'Image file not found'}
-            
             # Read image
             img = cv2.imread(image_path)
             if img is None:
@@ -245,7 +331,8 @@ class AdvancedImageProcessor:
             return {'success': False, 'error': 'YOLO model not available'}
             
         try:
-            results = self.yolo_model(image_path)
+            with self.registry.use(YOLO_MODEL) as yolo_model:
+                results = yolo_model(image_path)
             
             detected_objects = []
             for result in results:
@@ -276,7 +363,8 @@ class AdvancedImageProcessor:
         # Method 1: EasyOCR
         if self.ocr_reader:
             try:
-                easy_results = self.ocr_reader.readtext(cv_img)
+                with self.registry.use(EASYOCR_MODEL) as ocr_reader:
+                    easy_results = ocr_reader.readtext(cv_img)
                 easy_text = ' '.join([text[1] for text in easy_results])
                 if easy_text.strip():
                     extracted_texts.append(easy_text)
@@ -318,54 +406,96 @@ class AdvancedImageProcessor:
     
     def _classify_scene(self, pil_img) -> Dict[str, Any]:
         """Classify scene using CLIP model"""
-        if not TRANSFORMERS_AVAILABLE or not self.clip_model:
-            return {'success': False, 'error': 'CLIP model not available'}
+        return self.classify_scenes([pil_img])[0]
+    
+    def classify_scenes(self, images: List[Image.Image], labels: Optional[List[str]] = None,
+                        top_k: int = 3, batch_size: int = 32) -> List[Dict[str, Any]]:
+        """
+        Zero-shot scene classification of many images with CLIP.
+        
+        Label embeddings are computed once per loaded model and label set, so
+        each image costs one image-encoder pass plus a matrix multiply, however
+        many labels there are.
+        
+        Args:
+            images: PIL images
+            labels: Scene labels (default: self.scene_labels)
+            top_k: Scenes reported per image
+            batch_size: Images per image-encoder pass
             
+        Returns:
+            One result dict per image, in input order
+        """
+        if not TRANSFORMERS_AVAILABLE or not self.clip_model:
+            return [{'success': False, 'error': 'CLIP model not available'} for _ in images]
+        labels = labels or self.scene_labels
+        
         try:
-            # Complaint-related scene categories
-            scene_categories = [
-                "damaged road with potholes",
-                "garbage and waste dumping",
-                "water leakage and flooding",
-                "broken street light",
-                "illegal construction",
-                "traffic congestion",
-                "tree cutting or damage",
-                "public property damage",
-                "cleanliness issue",
-                "infrastructure problem"
+            with self.registry.use(self.clip_registry_name) as (clip_model, clip_processor):
+                label_embeddings, logit_scale = self._label_embeddings(clip_model, clip_processor, labels)
+                image_embeddings = np.concatenate([
+                    self._image_embeddings(clip_model, clip_processor, images[start:start + batch_size])
+                    for start in range(0, len(images), batch_size)
+                ]) if images else np.empty((0, label_embeddings.shape[1]), dtype=np.float32)
+            
+            probs = softmax(logit_scale * image_embeddings @ label_embeddings.T)
+        except Exception as e:
+            logger.error(f"Scene classification error: {str(e)}")
+            return [{'success': False, 'error': str(e)} for _ in images]
+        
+        results = []
+        for image_probs in probs:
+            top_indices = np.argsort(image_probs)[::-1][:top_k]
+            scenes = [
+                {'scene': labels[idx], 'confidence': float(image_probs[idx])}
+                for idx in top_indices
             ]
-            
-            inputs = self.clip_processor(
-                text=scene_categories,
-                images=pil_img,
-                return_tensors="pt",
-                padding=True
-            )
-            
-            outputs = self.clip_model(**inputs)
-            logits_per_image = outputs.logits_per_image
-            probs = logits_per_image.softmax(dim=1)
-            
-            # Get top 3 scenes
-            top_probs, top_indices = torch.topk(probs[0], k=3)
-            
-            scenes = []
-            for prob, idx in zip(top_probs, top_indices):
-                scenes.append({
-                    'scene': scene_categories[idx],
-                    'confidence': float(prob)
-                })
-            
-            return {
+            results.append({
                 'success': True,
                 'primary_scene': scenes[0]['scene'],
                 'primary_confidence': scenes[0]['confidence'],
                 'all_scenes': scenes
-            }
-        except Exception as e:
-            logger.error(f"Scene classification error: {str(e)}")
-            return {'success': False, 'error': str(e)}
+            })
+        return results
+    
+    def _label_embeddings(self, clip_model, clip_processor, labels: List[str]) -> Tuple[np.ndarray, float]:
+        """L2-normalized (labels, D) text embeddings and the logit scale, cached per model and label set"""
+        key = tuple(labels)
+        with _LABEL_EMBEDDINGS_LOCK:
+            cached = _LABEL_EMBEDDINGS.setdefault(clip_model, {}).get(key)
+        if cached is not None:
+            return cached
+        
+        chunks = []
+        for start in range(0, len(labels), 256):
+            inputs = clip_processor(
+                text=list(labels[start:start + 256]),
+                return_tensors="pt" if self.clip_backend == EAGER else "np",
+                padding=True
+            )
+            if self.clip_backend == EAGER:
+                with torch.inference_mode():
+                    chunks.append(clip_model.get_text_features(**inputs).float().numpy())
+            else:
+                chunks.append(clip_model.text_embeds(inputs['input_ids'], inputs['attention_mask']))
+        embeddings = _normalize_rows(np.concatenate(chunks))
+        logit_scale = float(clip_model.logit_scale.exp()) if self.clip_backend == EAGER else clip_model.logit_scale
+        
+        with _LABEL_EMBEDDINGS_LOCK:
+            _LABEL_EMBEDDINGS.setdefault(clip_model, {})[key] = (embeddings, logit_scale)
+        logger.info(f"Cached CLIP embeddings for {len(labels)} scene labels")
+        return embeddings, logit_scale
+    
+    def _image_embeddings(self, clip_model, clip_processor, images: List[Image.Image]) -> np.ndarray:
+        """L2-normalized (images, D) CLIP image embeddings"""
+        if self.clip_backend == EAGER:
+            inputs = clip_processor(images=images, return_tensors="pt")
+            with torch.inference_mode():
+                embeddings = clip_model.get_image_features(**inputs).float().numpy()
+        else:
+            inputs = clip_processor(images=images, return_tensors="np")
+            embeddings = clip_model.image_embeds(inputs['pixel_values'])
+        return _normalize_rows(embeddings)
     
     def _classify_with_resnet(self, image_path: str) -> Dict[str, Any]:
         """Classify image using ResNet"""
@@ -378,7 +508,8 @@ class AdvancedImageProcessor:
             img_array = np.expand_dims(img_array, axis=0)
             img_array = resnet_preprocess(img_array)
             
-            predictions = self.resnet_model.predict(img_array)
+            with self.registry.use(RESNET_MODEL) as resnet_model:
+                predictions = resnet_model.predict(img_array)
             
             from tensorflow.keras.applications.resnet50 import decode_predictions
             decoded = decode_predictions(predictions, top=5)[0]
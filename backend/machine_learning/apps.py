@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class MachineLearningConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'machine_learning'
+    
+    def ready(self):
+        import machine_learning.signals  # Keep the image similarity index in sync
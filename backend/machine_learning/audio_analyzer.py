@@ -7,20 +7,16 @@ and urgency level assessment from audio files.
 
 import os
 import logging
-from typing import Dict, List, Optional, Any
+from typing import Callable, Dict, List, Optional, Any
 from pathlib import Path
 import json
 
+from smartgriev.keywords import get_matcher
+from smartgriev.media_cache import cached_analysis
+
 logger = logging.getLogger(__name__)
 
 # Try to import audio processing libraries
-try:
-    import whisper
-    WHISPER_AVAILABLE = True
-except ImportError:
-    WHISPER_AVAILABLE = False
-    logger.warning("Whisper not available. Audio transcription will be limited.")
-
 try:
     import torch
     TORCH_AVAILABLE = True
@@ -34,6 +30,18 @@ try:
 except ImportError:
     TRANSFORMERS_AVAILABLE = False
 
+from .model_registry import get_model_registry
+from .transcription import TranscriptionEngine
+
+EMOTION_MODEL = 'emotion-classifier'
+
+if TRANSFORMERS_AVAILABLE:
+    get_model_registry().register(EMOTION_MODEL, lambda: hf_pipeline(
+        "text-classification",
+        model="j-hartmann/emotion-english-distilroberta-base",
+        top_k=None
+    ), size_mb=350)
+
 
 class AudioAnalyzer:
     """
@@ -52,70 +60,81 @@ class AudioAnalyzer:
     URGENCY_HIGH_KEYWORDS = ['urgent', 'emergency', 'dangerous', 'critical', 'immediately', 'help']
     URGENCY_MEDIUM_KEYWORDS = ['soon', 'quickly', 'please fix', 'not working']
     
-    def __init__(self, model_size: str = "base"):
+    # Keyword tables compiled once for single-pass matching
+    EMOTION_MATCHER = get_matcher(EMOTION_KEYWORDS)
+    URGENCY_MATCHER = get_matcher({
+        'high': [(keyword, 3) for keyword in URGENCY_HIGH_KEYWORDS],
+        'medium': [(keyword, 1) for keyword in URGENCY_MEDIUM_KEYWORDS],
+    })
+    
+    def __init__(self, model_size: Optional[str] = None, backend: Optional[str] = None):
         """
         Initialize AudioAnalyzer with Whisper model.
         
         Args:
-            model_size: Whisper model size (tiny, base, small, medium, large)
+            model_size: Whisper model size (tiny, base, small, medium, large);
+                        None picks it from the speech duration (TRANSCRIPTION['MODEL_SIZES'])
+            backend: 'whisper' or 'faster-whisper' (default: TRANSCRIPTION['BACKEND'])
         """
         self.model_size = model_size
-        self._whisper_model = None
-        self._emotion_classifier = None
-        self.fallback_mode = False
+        self.registry = get_model_registry()
+        self.transcriber = TranscriptionEngine(backend=backend, model_size=model_size)
+        self.fallback_mode = not self.transcriber.available
         
-        logger.info(f"AudioAnalyzer initialized with model size: {model_size}")
-    
-    @property
-    def whisper_model(self):
-        """Lazy loading of Whisper model."""
-        if self._whisper_model is None and WHISPER_AVAILABLE and not self.fallback_mode:
-            try:
-                logger.info(f"Loading Whisper model: {self.model_size}")
-                self._whisper_model = whisper.load_model(self.model_size)
-                logger.info("Whisper model loaded successfully")
-            except Exception as e:
-                logger.warning(f"Failed to load Whisper model: {str(e)}. Using fallback mode.")
-                self.fallback_mode = True
-        return self._whisper_model
+        logger.info(f"AudioAnalyzer initialized with model size: {model_size or 'auto'} "
+                    f"({self.transcriber.backend})")
     
-    def transcribe_audio(self, audio_path: str) -> Dict[str, Any]:
+    def transcribe_audio(self, audio_path: str,
+                         on_segment: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
         """
         Transcribe audio to text with language detection.
         
+        Silence is trimmed and the speech is transcribed in chunks (see
+        machine_learning.transcription).
+        
         Args:
             audio_path: Path to audio file
+            on_segment: Called with each transcribed segment as soon as it is ready
             
         Returns:
             Dict with transcription, language, and confidence
         """
+        if not os.path.exists(audio_path):
+            return {
+                'success': False,
+                'error': 'Audio file not found'
+            }
+        
+        if self.fallback_mode:
+            # Fallback: return placeholder
+            return {
+                'success': True,
+                'text': '[Audio transcription temporarily unavailable]',
+                'language': 'unknown',
+                'method': 'fallback'
+            }
+        
+        # Identical re-uploads are answered from the media analysis cache
+        result = cached_analysis(
+            'whisper', self.transcriber.cache_version, audio_path,
+            lambda: self._transcribe_with_whisper(audio_path, on_segment)
+        )
+        if on_segment is not None and result.get('cache_hit'):
+            for segment in result.get('segments', []):
+                on_segment(segment)
+        return result
+    
+    def _transcribe_with_whisper(self, audio_path: str,
+                                 on_segment: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+        """Run the chunked transcription engine on one audio file (see transcribe_audio)"""
         try:
-            if not os.path.exists(audio_path):
-                return {
-                    'success': False,
-                    'error': 'Audio file not found'
-                }
+            result = self.transcriber.transcribe(audio_path, on_segment=on_segment)
+            logger.info(
+                f"Transcribed {result['duration']:.0f}s of audio ({result['speech_duration']:.0f}s speech, "
+                f"{result['chunks']} chunks, {result['model_size']}) in {result['processing_time']:.1f}s"
+            )
+            return result
             
-            if self.whisper_model is not None:
-                # Use Whisper for transcription
-                result = self.whisper_model.transcribe(audio_path)
-                
-                return {
-                    'success': True,
-                    'text': result['text'].strip(),
-                    'language': result.get('language', 'unknown'),
-                    'segments': result.get('segments', []),
-                    'method': 'whisper'
-                }
-            else:
-                # Fallback: return placeholder
-                return {
-                    'success': True,
-                    'text': '[Audio transcription temporarily unavailable]',
-                    'language': 'unknown',
-                    'method': 'fallback'
-                }
-                
         except Exception as e:
             logger.error(f"Audio transcription error: {str(e)}")
             return {
@@ -134,15 +153,8 @@ class AudioAnalyzer:
             Dict with detected emotion and confidence
         """
         try:
-            text_lower = text.lower()
-            
             # Rule-based emotion detection using keywords
-            emotion_scores = {}
-            
-            for emotion, keywords in self.EMOTION_KEYWORDS.items():
-                score = sum(1 for keyword in keywords if keyword in text_lower)
-                if score > 0:
-                    emotion_scores[emotion] = score
+            emotion_scores = self.EMOTION_MATCHER.scores(text)
             
             # Determine primary emotion
             if emotion_scores:
@@ -153,21 +165,13 @@ class AudioAnalyzer:
                 confidence = 0.5
             
             # Try ML-based emotion detection if available
-            if TRANSFORMERS_AVAILABLE and self._emotion_classifier is None:
-                try:
-                    self._emotion_classifier = hf_pipeline(
-                        "text-classification",
-                        model="j-hartmann/emotion-english-distilroberta-base",
-                        top_k=None
-                    )
-                except:
-                    pass
-            
             ml_emotions = []
-            if self._emotion_classifier is not None:
+            if TRANSFORMERS_AVAILABLE:
                 try:
-                    ml_result = self._emotion_classifier(text[:512])  # Limit text length
-                    ml_emotions = ml_result[0] if ml_result else []
+                    with self.registry.use(EMOTION_MODEL) as emotion_classifier:
+                        if emotion_classifier is not None:
+                            ml_result = emotion_classifier(text[:512])  # Limit text length
+                            ml_emotions = ml_result[0] if ml_result else []
                 except:
                     pass
             
@@ -199,21 +203,13 @@ class AudioAnalyzer:
             Dict with urgency level and reasoning
         """
         try:
-            text_lower = text.lower()
             urgency_score = 0
             indicators = []
             
-            # Check for high urgency keywords
-            for keyword in self.URGENCY_HIGH_KEYWORDS:
-                if keyword in text_lower:
-                    urgency_score += 3
-                    indicators.append(f"high_urgency_keyword: {keyword}")
-            
-            # Check for medium urgency keywords
-            for keyword in self.URGENCY_MEDIUM_KEYWORDS:
-                if keyword in text_lower:
-                    urgency_score += 1
-                    indicators.append(f"medium_urgency_keyword: {keyword}")
+            # High urgency keywords weigh 3, medium ones 1
+            for match in self.URGENCY_MATCHER.find(text):
+                urgency_score += match.weight
+                indicators.append(f"{match.label}_urgency_keyword: {match.keyword}")
             
             # Consider emotion
             emotion = emotion_data.get('primary_emotion', 'neutral')
@@ -247,19 +243,21 @@ class AudioAnalyzer:
                 'error': str(e)
             }
     
-    def analyze_audio(self, audio_path: str) -> Dict[str, Any]:
+    def analyze_audio(self, audio_path: str,
+                      on_segment: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
         """
         Comprehensive audio analysis including transcription, emotion, and urgency.
         
         Args:
             audio_path: Path to audio file
+            on_segment: Called with each transcribed segment as soon as it is ready
             
         Returns:
             Complete audio analysis results
         """
         try:
             # Transcribe audio
-            transcription = self.transcribe_audio(audio_path)
+            transcription = self.transcribe_audio(audio_path, on_segment=on_segment)
             
             if not transcription.get('success'):
                 return {
@@ -280,7 +278,11 @@ class AudioAnalyzer:
                 'transcription': {
                     'text': text,
                     'language': transcription.get('language', 'unknown'),
-                    'method': transcription.get('method', 'unknown')
+                    'method': transcription.get('method', 'unknown'),
+                    'model_size': transcription.get('model_size'),
+                    'duration': transcription.get('duration'),
+                    'speech_duration': transcription.get('speech_duration'),
+                    'segments': transcription.get('segments', [])
                 },
                 'emotion': {
                     'primary_emotion': emotion_data.get('primary_emotion', 'unknown'),
@@ -308,7 +310,7 @@ class AudioAnalyzer:
 _audio_analyzer = None
 
 
-def get_audio_analyzer(model_size: str = "base") -> AudioAnalyzer:
+def get_audio_analyzer(model_size: Optional[str] = None) -> AudioAnalyzer:
     """Get or create global audio analyzer instance."""
     global _audio_analyzer
     if _audio_analyzer is None:
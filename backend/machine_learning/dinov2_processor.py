@@ -35,10 +35,71 @@ except ImportError:
 import warnings
 warnings.filterwarnings("ignore")
 
+from smartgriev.media_cache import cached_analysis
+
+from .model_registry import get_model_registry
+from .onnx_backend import EAGER, ONNX_AVAILABLE, ONNX_BACKENDS, OnnxDINOv2, get_backend
+
 logger = logging.getLogger(__name__)
 
-# Global model cache
-_DINOV2_CACHE = {}
+# A PIL image or an in-memory BGR frame as decoded by OpenCV (VideoProcessor.extract_key_frames)
+ImageInput = Union[Image.Image, np.ndarray]
+
+
+def to_pil_image(image: ImageInput) -> Image.Image:
+    """Wrap an OpenCV BGR frame as an RGB PIL image without touching disk"""
+    if isinstance(image, np.ndarray):
+        if image.ndim == 2:
+            return Image.fromarray(image)
+        return Image.fromarray(np.ascontiguousarray(image[:, :, ::-1]))
+    return image
+
+
+def l2_normalize(embeddings: np.ndarray) -> np.ndarray:
+    """Scale each row to unit length (all-zero rows are left as zeros)"""
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    norms = np.linalg.norm(embeddings, axis=-1, keepdims=True)
+    return embeddings / np.maximum(norms, np.finfo(np.float32).tiny)
+
+
+def cosine_similarity_matrix(embeddings: np.ndarray, others: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Pairwise cosine similarity between the rows of two embedding matrices.
+    
+    Args:
+        embeddings: (N, D) matrix
+        others: (M, D) matrix; defaults to ``embeddings`` itself
+        
+    Returns:
+        (N, M) float32 matrix computed with a single matrix multiply
+    """
+    left = l2_normalize(embeddings)
+    right = left if others is None else l2_normalize(others)
+    return left @ right.T
+
+
+def _load_dinov2(model_name: str):
+    """(image processor, eval-mode model on the best device) for one DINOv2 checkpoint"""
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+    processor = AutoImageProcessor.from_pretrained(model_name)
+    model = AutoModel.from_pretrained(model_name).to(device)
+    model.eval()
+    return processor, model
+
+
+def _onnx_loader(backend: str):
+    def load(model_name: str):
+        return AutoImageProcessor.from_pretrained(model_name), OnnxDINOv2(model_name, backend)
+    return load
+
+
+if DINOV2_AVAILABLE:
+    # Loaded on first use as 'dinov2:<model name>', e.g. 'dinov2:facebook/dinov2-base',
+    # or 'dinov2-onnx-int8:<model name>' for the quantized ONNX Runtime backend
+    get_model_registry().register_family('dinov2', _load_dinov2, size_mb=400)
+    if ONNX_AVAILABLE:
+        for _backend, _size_mb in zip(ONNX_BACKENDS, (350, 100)):
+            get_model_registry().register_family(f'dinov2-{_backend}', _onnx_loader(_backend), size_mb=_size_mb)
 
 
 class DINOv2Processor:
@@ -53,7 +114,7 @@ class DINOv2Processor:
     - Provide embeddings for similarity search
     """
     
-    def __init__(self, model_name: str = "facebook/dinov2-base"):
+    def __init__(self, model_name: str = "facebook/dinov2-base", backend: Optional[str] = None):
         """
         Initialize DINOv2 processor.
         
@@ -61,14 +122,21 @@ class DINOv2Processor:
             model_name: Name of the DINOv2 model to use
                        Options: 'facebook/dinov2-small', 'facebook/dinov2-base', 
                                'facebook/dinov2-large', 'facebook/dinov2-giant'
+            backend: 'eager', 'onnx' or 'onnx-int8' (default: INFERENCE_BACKENDS['dinov2'])
         """
         self.model_name = model_name
-        self.device = "cuda" if DINOV2_AVAILABLE and torch and torch.cuda.is_available() else "cpu"
-        self._processor = None
-        self._model = None
+        self.backend = get_backend('dinov2', backend)
+        if self.backend == EAGER:
+            self.device = "cuda" if DINOV2_AVAILABLE and torch and torch.cuda.is_available() else "cpu"
+            self.registry_name = f"dinov2:{model_name}"
+        else:
+            self.device = "cpu"
+            self.registry_name = f"dinov2-{self.backend}:{model_name}"
+        self.registry = get_model_registry()
         self.fallback_mode = not DINOV2_AVAILABLE
         
-        logger.info(f"Initializing DINOv2Processor with model: {model_name} on device: {self.device}")
+        logger.info(f"Initializing DINOv2Processor with model: {model_name} on device: {self.device} "
+                    f"({self.backend} backend)")
         
         # Define complaint-related categories for classification
         self.complaint_categories = {
@@ -81,45 +149,26 @@ class DINOv2Processor:
             'environmental': ['tree', 'plant', 'animal', 'nature', 'weather'],
         }
     
+    def _loaded(self):
+        """(processor, model) from the model registry, loading them on first use"""
+        if self.fallback_mode:
+            return None
+        loaded = self.registry.get(self.registry_name)
+        if loaded is None:
+            self.fallback_mode = True
+        return loaded
+    
     @property
     def processor(self):
         """Lazy loading of image processor"""
-        if self._processor is None and not self.fallback_mode:
-            cache_key = f"{self.model_name}_processor"
-            if cache_key in _DINOV2_CACHE:
-                self._processor = _DINOV2_CACHE[cache_key]
-                logger.info("Using cached DINOv2 processor")
-            else:
-                try:
-                    logger.info(f"Loading DINOv2 processor: {self.model_name}")
-                    self._processor = AutoImageProcessor.from_pretrained(self.model_name)
-                    _DINOV2_CACHE[cache_key] = self._processor
-                    logger.info("DINOv2 processor loaded and cached")
-                except Exception as e:
-                    logger.warning(f"Failed to load DINOv2 processor: {str(e)}")
-                    self.fallback_mode = True
-        return self._processor
+        loaded = self._loaded()
+        return loaded[0] if loaded else None
     
     @property
     def model(self):
         """Lazy loading of DINOv2 model"""
-        if self._model is None and not self.fallback_mode:
-            cache_key = f"{self.model_name}_model_{self.device}"
-            if cache_key in _DINOV2_CACHE:
-                self._model = _DINOV2_CACHE[cache_key]
-                logger.info("Using cached DINOv2 model")
-            else:
-                try:
-                    logger.info(f"Loading DINOv2 model: {self.model_name}")
-                    self._model = AutoModel.from_pretrained(self.model_name)
-                    self._model = self._model.to(self.device)
-                    self._model.eval()
-                    _DINOV2_CACHE[cache_key] = self._model
-                    logger.info("DINOv2 model loaded and cached")
-                except Exception as e:
-                    logger.warning(f"Failed to load DINOv2 model: {str(e)}")
-                    self.fallback_mode = True
-        return self._model
+        loaded = self._loaded()
+        return loaded[1] if loaded else None
     
     def _fallback_analysis(self, image: Image.Image) -> Dict:
         """
@@ -193,42 +242,84 @@ class DINOv2Processor:
         except:
             return False
     
-    def extract_features(self, image: Image.Image) -> Dict:
+    def extract_embeddings(
+        self,
+        images: List[ImageInput],
+        normalize: bool = False,
+        dtype=np.float32,
+        batch_size: int = 32,
+    ) -> Optional[np.ndarray]:
+        """
+        Extract CLS embeddings for many images with batched forward passes.
+        
+        Args:
+            images: PIL Images or in-memory BGR frames
+            normalize: L2-normalize each embedding (dot product == cosine similarity)
+            dtype: np.float32, or np.float16 to halve storage
+            batch_size: Images per forward pass
+            
+        Returns:
+            Contiguous (N, D) matrix in ``dtype``, or None if DINOv2 is unavailable
+        """
+        if self._loaded() is None:
+            return None
+        
+        with self.registry.use(self.registry_name) as loaded:
+            if loaded is None:
+                return None
+            processor, model = loaded
+            embeddings = None
+            
+            for start in range(0, len(images), batch_size):
+                batch = []
+                for image in images[start:start + batch_size]:
+                    image = to_pil_image(image)
+                    batch.append(image if image.mode == 'RGB' else image.convert('RGB'))
+                
+                # The processor resizes and crops every image to the same input size
+                if self.backend == EAGER:
+                    inputs = processor(images=batch, return_tensors="pt")
+                    inputs = {k: v.to(self.device) for k, v in inputs.items()}
+                    
+                    with torch.inference_mode():
+                        outputs = model(**inputs)
+                    hidden_state = outputs.last_hidden_state.float().cpu().numpy()
+                else:
+                    inputs = processor(images=batch, return_tensors="np")
+                    hidden_state = model.last_hidden_state(inputs['pixel_values'])
+                
+                # Use CLS token (first token) as image representation
+                cls = hidden_state[:, 0, :]
+                if embeddings is None:
+                    embeddings = np.empty((len(images), cls.shape[1]), dtype=np.float32)
+                embeddings[start:start + len(batch)] = cls
+            
+            if embeddings is None:
+                return np.empty((0, 0), dtype=dtype)
+        
+        if normalize:
+            embeddings = l2_normalize(embeddings)
+        return np.ascontiguousarray(embeddings, dtype=dtype)
+    
+    def extract_features(self, image: ImageInput) -> Dict:
         """
         Extract visual features from image using DINOv2.
         
         Args:
-            image: PIL Image object
+            image: PIL Image object or in-memory BGR frame
             
         Returns:
             Dict containing features and embeddings
         """
         start_time = time.time()
+        image = to_pil_image(image)
         
         try:
             # Check for fallback mode
             if self.fallback_mode or self.processor is None or self.model is None:
                 return self._fallback_analysis(image)
             
-            # Prepare image
-            if image.mode != 'RGB':
-                image = image.convert('RGB')
-            
-            # Process image
-            inputs = self.processor(images=image, return_tensors="pt")
-            inputs = {k: v.to(self.device) for k, v in inputs.items()}
-            
-            # Extract features
-            with torch.no_grad():
-                outputs = self.model(**inputs)
-            
-            # Get embeddings
-            # DINOv2 outputs include last_hidden_state and pooler_output
-            last_hidden_state = outputs.last_hidden_state
-            pooler_output = outputs.pooler_output if hasattr(outputs, 'pooler_output') else None
-            
-            # Use CLS token (first token) as image representation
-            cls_embedding = last_hidden_state[:, 0, :].cpu().numpy()[0]
+            cls_embedding = self.extract_embeddings([image])[0]
             
             # Calculate statistics
             embedding_mean = float(cls_embedding.mean())
@@ -255,18 +346,19 @@ class DINOv2Processor:
             logger.error(f"Feature extraction failed: {str(e)}")
             return self._fallback_analysis(image)
     
-    def analyze_complaint_image(self, image: Image.Image) -> Dict:
+    def analyze_complaint_image(self, image: ImageInput) -> Dict:
         """
         Comprehensive analysis of a complaint image.
         
         Args:
-            image: PIL Image object
+            image: PIL Image object or in-memory BGR frame
             
         Returns:
             Dict with detailed analysis including scene classification,
             detected elements, and complaint categorization
         """
         start_time = time.time()
+        image = to_pil_image(image)
         
         try:
             # Get features
@@ -401,14 +493,14 @@ class DINOv2Processor:
         
         return indicators
     
-    def compare_images(self, image1: Image.Image, image2: Image.Image) -> Dict:
+    def compare_images(self, image1: ImageInput, image2: ImageInput) -> Dict:
         """
         Compare two images using their DINOv2 embeddings.
         Useful for finding similar complaints.
         
         Args:
-            image1: First PIL Image
-            image2: Second PIL Image
+            image1: First PIL Image or BGR frame
+            image2: Second PIL Image or BGR frame
             
         Returns:
             Dict with similarity score and comparison metrics
@@ -421,25 +513,20 @@ class DINOv2Processor:
                     'message': 'DINOv2 not available for comparison'
                 }
             
-            # Extract features from both images
-            features1 = self.extract_features(image1)
-            features2 = self.extract_features(image2)
-            
-            if features1.get('analysis_method') == 'fallback' or features2.get('analysis_method') == 'fallback':
+            # Embed both images in one forward pass
+            embeddings = self.extract_embeddings([image1, image2], normalize=True)
+            if embeddings is None:
                 return {
                     'similarity_score': 0.0,
                     'analysis_method': 'fallback',
                     'message': 'Feature extraction failed'
                 }
             
-            # Calculate cosine similarity
-            emb1 = np.array(features1['embedding_vector'])
-            emb2 = np.array(features2['embedding_vector'])
-            
-            similarity = np.dot(emb1, emb2) / (np.linalg.norm(emb1) * np.linalg.norm(emb2))
+            # Rows are unit length, so the dot product is the cosine similarity
+            similarity = float(embeddings[0] @ embeddings[1])
             
             return {
-                'similarity_score': float(similarity),
+                'similarity_score': similarity,
                 'analysis_method': 'dinov2',
                 'comparison_type': 'cosine_similarity',
                 'are_similar': similarity > 0.8,
@@ -453,6 +540,21 @@ class DINOv2Processor:
                 'error': str(e),
                 'analysis_method': 'error',
             }
+    
+    def similarity_matrix(self, images: List[ImageInput]) -> Optional[np.ndarray]:
+        """
+        Pairwise cosine similarity of a set of images.
+        
+        Args:
+            images: PIL Images or in-memory BGR frames
+            
+        Returns:
+            (N, N) float32 similarity matrix, or None if DINOv2 is unavailable
+        """
+        embeddings = self.extract_embeddings(images, normalize=True)
+        if embeddings is None:
+            return None
+        return embeddings @ embeddings.T
 
 
 # Global instance
@@ -467,6 +569,11 @@ def get_dinov2_processor(model_name: str = "facebook/dinov2-base") -> DINOv2Proc
     return _global_dinov2_processor
 
 
+def _is_dinov2_result(result: Dict) -> bool:
+    """Only model results are cached; fallback analyses are retried once DINOv2 loads"""
+    return result.get('analysis_method') == 'dinov2'
+
+
 def analyze_complaint_image(image_path: str) -> Dict:
     """
     Analyze a complaint image using DINOv2.
@@ -481,10 +588,12 @@ def analyze_complaint_image(image_path: str) -> Dict:
         if not os.path.exists(image_path):
             raise FileNotFoundError(f"Image file not found: {image_path}")
         
-        image = Image.open(image_path)
         processor = get_dinov2_processor()
-        
-        return processor.analyze_complaint_image(image)
+        return cached_analysis(
+            'dinov2', processor.registry_name, image_path,
+            lambda: processor.analyze_complaint_image(Image.open(image_path)),
+            cacheable=_is_dinov2_result
+        )
         
     except Exception as e:
         logger.error(f"Error analyzing image {image_path}: {str(e)}")
@@ -502,13 +611,15 @@ def analyze_complaint_image_bytes(image_bytes) -> Dict:
         Dict with comprehensive image analysis
     """
     try:
-        if hasattr(image_bytes, 'seek'):
-            image_bytes.seek(0)
-        
-        image = Image.open(image_bytes)
         processor = get_dinov2_processor()
         
-        return processor.analyze_complaint_image(image)
+        def analyze():
+            if hasattr(image_bytes, 'seek'):
+                image_bytes.seek(0)
+            return processor.analyze_complaint_image(Image.open(image_bytes))
+        
+        return cached_analysis('dinov2', processor.registry_name, image_bytes, analyze,
+                               cacheable=_is_dinov2_result)
         
     except Exception as e:
         logger.error(f"Error analyzing image from bytes: {str(e)}")
@@ -516,9 +627,12 @@ def analyze_complaint_image_bytes(image_bytes) -> Dict:
 
 
 def clear_dinov2_cache():
-    """Clear DINOv2 model cache"""
-    global _DINOV2_CACHE, _global_dinov2_processor
-    _DINOV2_CACHE.clear()
+    """Unload DINOv2 models from the model registry"""
+    global _global_dinov2_processor
+    registry = get_model_registry()
+    for name in registry.stats()['loaded_models']:
+        if name.startswith('dinov2'):
+            registry.reset(name)
     _global_dinov2_processor = None
     logger.info("DINOv2 cache cleared")
 
@@ -531,6 +645,7 @@ def get_dinov2_info() -> Dict:
         'available': not processor.fallback_mode,
         'model_name': processor.model_name,
         'device': processor.device,
+        'backend': processor.backend,
         'cuda_available': DINOV2_AVAILABLE and torch and torch.cuda.is_available(),
         'complaint_categories': list(processor.complaint_categories.keys()),
         'version': '1.0',
@@ -0,0 +1,479 @@
+"""
+Complaint Image Similarity Index
+
+Persistent approximate-nearest-neighbour index over DINOv2 embeddings of
+complaint images, used to spot duplicate reports (the same pothole or garbage
+heap photographed by several citizens) at intake.
+
+Layout on disk (IMAGE_INDEX['ROOT']), one directory per shard:
+
+    <shard>/header.json   count, dim, capacity and IVF training state
+    <shard>/vectors.f16   (capacity, dim) float16 unit-length embeddings
+    <shard>/ids.i64       complaint id per row (-1 = removed)
+    <shard>/coords.f32    (lat, lon) per row
+    <shard>/lists.i32     IVF list per row (-1 before training)
+    <shard>/centroids.npy IVF centroids (only once trained)
+
+Shards are geohash cells at SHARD_PRECISION (~20km x 39km, roughly a city),
+so a "similar complaints within R km" query only opens the shards covering
+that circle. Within a shard the radius filter runs first; if more candidates
+than IVF_MIN_CANDIDATES remain and the shard is trained, only the nprobe
+closest IVF lists are scored. Scoring is a single float16 -> float32 matrix
+product over the candidate rows.
+
+Rows are appended in place (the files grow by doubling); re-indexing a
+complaint marks its old row removed. Writers serialize per shard on a file
+lock; readers memory-map the files read-only and reopen a shard when its
+header changes.
+"""
+import json
+import logging
+import math
+import os
+import shutil
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+from django.conf import settings
+
+from complaints.spatial import cover_cells, encode_geohash, haversine_km
+from .dinov2_processor import l2_normalize
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to in-process locking only
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+SHARD_PRECISION = 4
+
+_DEFAULTS = {
+    'ROOT': os.path.join(settings.PRIVATE_DATA_ROOT, 'image_index'),
+    'IVF_MIN_VECTORS': 4096,      # Shards smaller than this are searched exhaustively
+    'IVF_MIN_CANDIDATES': 2048,   # Radius matches below this are scored exhaustively
+    'NPROBE': 8,
+    'INITIAL_CAPACITY': 1024,
+}
+
+
+def index_settings() -> Dict:
+    return {**_DEFAULTS, **getattr(settings, 'IMAGE_INDEX', {})}
+
+
+def shard_key(latitude: float, longitude: float) -> str:
+    return encode_geohash(latitude, longitude, SHARD_PRECISION)
+
+
+def _kmeans(vectors: np.ndarray, nlist: int, iterations: int = 10, seed: int = 0) -> np.ndarray:
+    """Spherical k-means on unit-length rows; returns unit-length centroids"""
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), nlist, replace=False)].copy()
+    for _ in range(iterations):
+        assignment = np.argmax(vectors @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignment, vectors)
+        empty = ~sums.any(axis=1)
+        # Reseed empty lists so every list stays usable
+        sums[empty] = vectors[rng.choice(len(vectors), int(empty.sum()), replace=False)]
+        centroids = l2_normalize(sums)
+    return centroids
+
+
+class ImageIndexShard:
+    """One geohash shard: memory-mapped rows plus optional IVF lists"""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._stamp = None
+        self.header = None
+        self.vectors = self.ids = self.coords = self.lists = None
+        self.centroids = None
+
+    # ------------------------------------------------------------------ files
+
+    def _file(self, name: str) -> Path:
+        return self.path / name
+
+    def _header_stamp(self):
+        try:
+            stat = self._file('header.json').stat()
+        except FileNotFoundError:
+            return None
+        # The header is replaced atomically, so a new inode means a new version
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    def _map(self, mode: str) -> None:
+        header = self.header
+        shape = (header['capacity'],)
+        self.vectors = np.memmap(self._file('vectors.f16'), dtype=np.float16, mode=mode,
+                                 shape=(header['capacity'], header['dim']))
+        self.ids = np.memmap(self._file('ids.i64'), dtype=np.int64, mode=mode, shape=shape)
+        self.coords = np.memmap(self._file('coords.f32'), dtype=np.float32, mode=mode,
+                                shape=(header['capacity'], 2))
+        self.lists = np.memmap(self._file('lists.i32'), dtype=np.int32, mode=mode, shape=shape)
+        centroids = self._file('centroids.npy')
+        self.centroids = np.load(centroids) if header['nlist'] and centroids.exists() else None
+
+    def refresh(self) -> bool:
+        """(Re)open the shard read-only if its header changed; False if it does not exist"""
+        stamp = self._header_stamp()
+        if stamp is None:
+            return False
+        with self._lock:
+            if stamp != self._stamp:
+                with open(self._file('header.json')) as f:
+                    self.header = json.load(f)
+                self._map('r')
+                self._stamp = stamp
+        return True
+
+    def _write_header(self) -> None:
+        tmp = self._file('header.json.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(self.header, f)
+        os.replace(tmp, self._file('header.json'))
+
+    def _allocate(self, capacity: int) -> None:
+        """Grow (or create) the row files to ``capacity`` rows"""
+        dim = self.header['dim']
+        for name, row_bytes, fill in (
+            ('vectors.f16', dim * 2, None),
+            ('ids.i64', 8, -1),
+            ('coords.f32', 8, None),
+            ('lists.i32', 4, -1),
+        ):
+            path = self._file(name)
+            old_size = path.stat().st_size if path.exists() else 0
+            with open(path, 'ab') as f:
+                f.truncate(capacity * row_bytes)
+            if fill is not None and capacity * row_bytes > old_size:
+                dtype = np.int64 if row_bytes == 8 else np.int32
+                tail = np.memmap(path, dtype=dtype, mode='r+', offset=old_size,
+                                 shape=((capacity * row_bytes - old_size) // row_bytes,))
+                tail[:] = fill
+                tail.flush()
+                del tail
+        self.header['capacity'] = capacity
+
+    @contextmanager
+    def writing(self, dim: int):
+        """Exclusive write access, creating the shard on first use"""
+        self.path.mkdir(parents=True, exist_ok=True)
+        with _local_lock(self.path), open(self._file('.lock'), 'a') as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                if self._header_stamp() is None:
+                    self.header = {'count': 0, 'dim': dim, 'capacity': 0, 'nlist': 0, 'trained_count': 0}
+                    self._allocate(index_settings()['INITIAL_CAPACITY'])
+                    self._write_header()
+                else:
+                    with open(self._file('header.json')) as f:
+                        self.header = json.load(f)
+                if self.header['dim'] != dim:
+                    raise ValueError(f"Embedding dim {dim} does not match shard dim {self.header['dim']}")
+                self._map('r+')
+                yield self
+                for array in (self.vectors, self.ids, self.coords, self.lists):
+                    array.flush()
+                self._write_header()
+            finally:
+                self._stamp = None
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    # ----------------------------------------------------------------- writes
+
+    def append(self, ids: np.ndarray, vectors: np.ndarray, coords: np.ndarray) -> None:
+        """Append rows (call inside ``writing``)"""
+        count = self.header['count']
+        needed = count + len(ids)
+        if needed > self.header['capacity']:
+            capacity = self.header['capacity']
+            while capacity < needed:
+                capacity *= 2
+            self._allocate(capacity)
+            self._map('r+')
+
+        rows = slice(count, needed)
+        self.vectors[rows] = vectors
+        self.ids[rows] = ids
+        self.coords[rows] = coords
+        if self.centroids is not None:
+            self.lists[rows] = np.argmax(vectors.astype(np.float32) @ self.centroids.T, axis=1)
+        self.header['count'] = needed
+
+    def remove(self, complaint_ids: Iterable[int]) -> int:
+        """Mark rows of the given complaints removed (call inside ``writing``)"""
+        count = self.header['count']
+        rows = np.flatnonzero(np.isin(self.ids[:count], np.fromiter(complaint_ids, dtype=np.int64)))
+        self.ids[rows] = -1
+        return len(rows)
+
+    def train(self, nlist: Optional[int] = None, sample_size: int = 65536) -> int:
+        """Cluster the live rows into IVF lists (call inside ``writing``)"""
+        count = self.header['count']
+        live = np.flatnonzero(self.ids[:count] >= 0)
+        if len(live) == 0:
+            return 0
+        nlist = min(nlist or int(math.sqrt(len(live))), len(live))
+        sample = live
+        if len(live) > sample_size:
+            sample = np.sort(np.random.default_rng(0).choice(live, sample_size, replace=False))
+        centroids = _kmeans(np.asarray(self.vectors[sample], dtype=np.float32), nlist)
+
+        for start in range(0, count, 65536):
+            block = np.asarray(self.vectors[start:start + 65536], dtype=np.float32)
+            self.lists[start:start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+        np.save(self._file('centroids.npy'), centroids)
+        self.centroids = centroids
+        self.header['nlist'] = nlist
+        self.header['trained_count'] = len(live)
+        return nlist
+
+    def needs_training(self) -> bool:
+        rows = self.header['count']
+        if rows < index_settings()['IVF_MIN_VECTORS']:
+            return False
+        # Retrain once the shard has doubled since the last training
+        return not self.header['nlist'] or rows >= 2 * self.header['trained_count']
+
+    # ------------------------------------------------------------------ reads
+
+    def search(self, query: np.ndarray, latitude: float, longitude: float,
+               radius_km: float, k: int, nprobe: int):
+        """Top-k (ids, similarities, distances) within ``radius_km``; call after ``refresh``"""
+        with self._lock:
+            count = self.header['count']
+            vectors, ids, coords, lists, centroids = (
+                self.vectors, self.ids[:count], self.coords[:count], self.lists[:count], self.centroids
+            )
+        distances = haversine_km(latitude, longitude, coords[:, 0], coords[:, 1])
+        mask = (distances <= radius_km) & (ids >= 0)
+
+        if centroids is not None and mask.sum() > index_settings()['IVF_MIN_CANDIDATES']:
+            probe = np.argsort(centroids @ query)[-nprobe:]
+            mask &= np.isin(lists, probe)
+
+        rows = np.flatnonzero(mask)
+        if len(rows) == 0:
+            return rows, np.empty(0, dtype=np.float32), np.empty(0)
+        similarities = np.asarray(vectors[rows], dtype=np.float32) @ query
+        if len(rows) > k:
+            top = np.argpartition(-similarities, k - 1)[:k]
+            rows, similarities = rows[top], similarities[top]
+        return np.asarray(ids[rows]), similarities, distances[rows]
+
+
+_local_locks: Dict[str, threading.Lock] = {}
+_local_locks_guard = threading.Lock()
+
+
+@contextmanager
+def _local_lock(path: Path):
+    """flock is per process; threads of one worker also need to take turns"""
+    with _local_locks_guard:
+        lock = _local_locks.setdefault(str(path), threading.Lock())
+    with lock:
+        yield
+
+
+class ImageSimilarityIndex:
+    """
+    Sharded complaint image index (see module docstring).
+
+    ``shard()`` returns the cached read-only view used by searches; writes go
+    through a separate shard object so they never remap arrays under a reader.
+    """
+
+    def __init__(self, root: Optional[str] = None):
+        self.root = Path(root or index_settings()['ROOT'])
+        self._shards: Dict[str, ImageIndexShard] = {}
+
+    def shard(self, key: str) -> ImageIndexShard:
+        if key not in self._shards:
+            self._shards[key] = ImageIndexShard(self.root / key)
+        return self._shards[key]
+
+    def shard_keys(self) -> List[str]:
+        if not self.root.exists():
+            return []
+        return sorted(p.name for p in self.root.iterdir() if (p / 'header.json').exists())
+
+    def _shards_covering(self, latitude: float, longitude: float, radius_km: float) -> List[str]:
+        keys = set()
+        existing = None
+        for cell in cover_cells(latitude, longitude, radius_km):
+            if len(cell) >= SHARD_PRECISION:
+                keys.add(cell[:SHARD_PRECISION])
+            else:
+                # Radius wider than a shard: take every shard inside the coarse cell
+                existing = self.shard_keys() if existing is None else existing
+                keys.update(key for key in existing if key.startswith(cell))
+        return sorted(keys)
+
+    def add(self, complaint_ids: Sequence[int], embeddings: np.ndarray,
+            latitudes: Sequence[float], longitudes: Sequence[float]) -> int:
+        """
+        Index (or re-index) complaints.
+
+        Embeddings are L2-normalized and stored as float16. Any earlier rows
+        of the same complaints are removed, including from other shards.
+        """
+        embeddings = l2_normalize(np.atleast_2d(embeddings)).astype(np.float16)
+        ids = np.asarray(complaint_ids, dtype=np.int64)
+        coords = np.column_stack([np.asarray(latitudes, dtype=np.float32),
+                                  np.asarray(longitudes, dtype=np.float32)])
+
+        self.remove(ids.tolist())
+        by_shard: Dict[str, List[int]] = {}
+        for row, (lat, lon) in enumerate(coords):
+            by_shard.setdefault(shard_key(float(lat), float(lon)), []).append(row)
+
+        for key, rows in by_shard.items():
+            shard = ImageIndexShard(self.root / key)
+            with shard.writing(embeddings.shape[1]):
+                shard.append(ids[rows], embeddings[rows], coords[rows])
+                if shard.needs_training():
+                    nlist = shard.train()
+                    logger.info(f"Trained image index shard {key} with {nlist} IVF lists")
+        return len(ids)
+
+    def remove(self, complaint_ids: Sequence[int]) -> int:
+        """Mark every row of the given complaints removed"""
+        if not len(complaint_ids):
+            return 0
+        targets = np.asarray(complaint_ids, dtype=np.int64)
+        removed = 0
+        for key in self.shard_keys():
+            reader = self.shard(key)
+            if not reader.refresh() or not np.isin(reader.ids[:reader.header['count']], targets).any():
+                continue
+            shard = ImageIndexShard(self.root / key)
+            with shard.writing(reader.header['dim']):
+                removed += shard.remove(targets)
+        return removed
+
+    def train(self, nlist: Optional[int] = None) -> Dict[str, int]:
+        """(Re)train IVF lists for every shard large enough to benefit"""
+        trained = {}
+        for key in self.shard_keys():
+            reader = self.shard(key)
+            reader.refresh()
+            if reader.header['count'] < index_settings()['IVF_MIN_VECTORS']:
+                continue
+            shard = ImageIndexShard(self.root / key)
+            with shard.writing(reader.header['dim']):
+                trained[key] = shard.train(nlist)
+        return trained
+
+    def search(self, embedding: np.ndarray, latitude: float, longitude: float,
+               radius_km: float, k: int = 10, exclude_ids: Iterable[int] = (),
+               nprobe: Optional[int] = None) -> List[Dict]:
+        """
+        Most similar indexed complaint images within ``radius_km`` of a point.
+
+        Returns up to ``k`` dicts with complaint_id, similarity (cosine) and
+        distance_km, most similar first.
+        """
+        query = l2_normalize(np.asarray(embedding, dtype=np.float32).reshape(1, -1))[0]
+        nprobe = nprobe or index_settings()['NPROBE']
+        exclude = set(exclude_ids)
+        fetch = k + len(exclude)
+
+        ids, similarities, distances = [], [], []
+        for key in self._shards_covering(latitude, longitude, radius_km):
+            shard = self.shard(key)
+            if not shard.refresh():
+                continue
+            shard_ids, shard_sims, shard_dists = shard.search(query, latitude, longitude, radius_km, fetch, nprobe)
+            ids.append(shard_ids)
+            similarities.append(shard_sims)
+            distances.append(shard_dists)
+
+        if not ids:
+            return []
+        ids = np.concatenate(ids)
+        similarities = np.concatenate(similarities)
+        distances = np.concatenate(distances)
+
+        results = []
+        for row in np.argsort(-similarities, kind='stable'):
+            complaint_id = int(ids[row])
+            if complaint_id in exclude:
+                continue
+            results.append({
+                'complaint_id': complaint_id,
+                'similarity': float(similarities[row]),
+                'distance_km': float(distances[row]),
+            })
+            if len(results) == k:
+                break
+        return results
+
+    def stats(self) -> Dict:
+        shards = {}
+        for key in self.shard_keys():
+            shard = self.shard(key)
+            shard.refresh()
+            count = shard.header['count']
+            shards[key] = {
+                'rows': count,
+                'live': int((shard.ids[:count] >= 0).sum()),
+                'ivf_lists': shard.header['nlist'],
+            }
+        return {'root': str(self.root), 'shards': shards}
+
+    def clear(self) -> None:
+        """Delete the whole index from disk"""
+        self._shards.clear()
+        shutil.rmtree(self.root, ignore_errors=True)
+
+
+# Global instance
+_global_image_index = None
+
+
+def get_image_index() -> ImageSimilarityIndex:
+    """Get or create the process-wide image index"""
+    global _global_image_index
+    if _global_image_index is None:
+        _global_image_index = ImageSimilarityIndex()
+    return _global_image_index
+
+
+def complaint_image_source(complaint):
+    """The stored image file of a complaint (new field first, then legacy), or None"""
+    for field in (complaint.image_file, complaint.media):
+        if field:
+            return field
+    return None
+
+
+def find_similar_complaints(image, latitude: float, longitude: float, radius_km: float = 0.5,
+                            k: int = 10, exclude_ids: Iterable[int] = ()) -> Optional[List[Dict]]:
+    """
+    Embed an image and return the most similar indexed complaints nearby.
+
+    Args:
+        image: PIL Image or in-memory BGR frame
+        latitude, longitude: Incident location
+        radius_km: Search radius
+        k: Maximum number of matches
+        exclude_ids: Complaint ids to skip (e.g. the complaint itself)
+
+    Returns:
+        List of matches (see ImageSimilarityIndex.search), or None if DINOv2
+        is unavailable
+    """
+    from .dinov2_processor import get_dinov2_processor
+
+    embeddings = get_dinov2_processor().extract_embeddings([image], normalize=True)
+    if embeddings is None:
+        return None
+    return get_image_index().search(embeddings[0], latitude, longitude, radius_km, k, exclude_ids)
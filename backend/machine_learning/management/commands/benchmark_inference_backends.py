@@ -0,0 +1,134 @@
+"""
+Management command comparing an alternative inference backend against eager PyTorch
+Checks output parity and per-image latency; exits with an error when parity fails,
+so it can gate switching INFERENCE_BACKENDS in a deployment
+"""
+
+import statistics
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+from PIL import Image
+
+from machine_learning.onnx_backend import EAGER, ONNX_INT8, TORCH_INT8
+
+
+class Command(BaseCommand):
+    help = 'Compare eager PyTorch with the ONNX/int8 backends for DINOv2, CLIP and TrOCR'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--models',
+            nargs='+',
+            choices=['dinov2', 'clip', 'trocr'],
+            default=['dinov2', 'clip', 'trocr'],
+            help='Models to benchmark (default: all)',
+        )
+        parser.add_argument(
+            '--backend',
+            default=ONNX_INT8,
+            help=f'Backend compared with eager for DINOv2/CLIP (default: {ONNX_INT8}; TrOCR always uses {TORCH_INT8})',
+        )
+        parser.add_argument(
+            '--images',
+            nargs='*',
+            default=[],
+            help='Sample images (default: synthetic images)',
+        )
+        parser.add_argument(
+            '--repeats',
+            type=int,
+            default=5,
+            help='Timed runs per image (default: 5)',
+        )
+        parser.add_argument(
+            '--min-similarity',
+            type=float,
+            default=0.98,
+            help='Minimum cosine similarity of DINOv2 embeddings (default: 0.98)',
+        )
+        parser.add_argument(
+            '--min-agreement',
+            type=float,
+            default=0.8,
+            help='Minimum share of images where CLIP top scene / TrOCR text match eager (default: 0.8)',
+        )
+
+    def handle(self, *args, **options):
+        images = self._load_images(options['images'])
+        failures = []
+        for model in options['models']:
+            backend = TORCH_INT8 if model == 'trocr' else options['backend']
+            eager_outputs, eager_latency = self._run(model, EAGER, images, options['repeats'])
+            outputs, latency = self._run(model, backend, images, options['repeats'])
+
+            if model == 'dinov2':
+                similarity = np.sum(eager_outputs * outputs, axis=1)
+                parity = float(similarity.min())
+                passed = parity >= options['min_similarity']
+                parity_text = f"min cosine similarity {parity:.4f} (mean {similarity.mean():.4f})"
+            else:
+                parity = sum(a == b for a, b in zip(eager_outputs, outputs)) / len(images)
+                passed = parity >= options['min_agreement']
+                parity_text = f"{parity:.0%} of outputs identical"
+
+            self.stdout.write(
+                f"{model}: eager {eager_latency:.1f} ms/image, {backend} {latency:.1f} ms/image "
+                f"({eager_latency / latency:.2f}x), {parity_text}"
+            )
+            if not passed:
+                failures.append(model)
+
+        if failures:
+            raise CommandError(f"Parity check failed for: {', '.join(failures)}")
+        self.stdout.write(self.style.SUCCESS('All backends match eager within tolerance'))
+
+    def _load_images(self, paths):
+        if paths:
+            return [Image.open(path).convert('RGB') for path in paths]
+        # Smooth synthetic scenes rather than noise, so OCR and CLIP outputs are stable
+        rng = np.random.RandomState(0)
+        images = []
+        for _ in range(8):
+            gradient = np.linspace(0, 255, 256, dtype=np.float32)
+            pixels = np.stack([
+                np.add.outer(gradient * rng.rand(), gradient * rng.rand()) / 2 for _ in range(3)
+            ], axis=-1)
+            images.append(Image.fromarray(pixels.astype(np.uint8)))
+        return images
+
+    def _run(self, model, backend, images, repeats):
+        """Outputs for every image and median per-image latency in ms"""
+        run = self._runner(model, backend)
+        outputs = [run(image) for image in images]  # Warm-up, and the outputs compared for parity
+        timings = []
+        for image in images:
+            for _ in range(repeats):
+                start = time.perf_counter()
+                run(image)
+                timings.append((time.perf_counter() - start) * 1000)
+        if model == 'dinov2':
+            outputs = np.concatenate(outputs)
+        return outputs, statistics.median(timings)
+
+    def _runner(self, model, backend):
+        if model == 'dinov2':
+            from machine_learning.dinov2_processor import DINOv2Processor
+            processor = DINOv2Processor(backend=backend)
+            if processor.backend != backend or processor.model is None:
+                raise CommandError(f'DINOv2 is not available with the {backend} backend')
+            return lambda image: processor.extract_embeddings([image], normalize=True)
+
+        if model == 'clip':
+            from machine_learning.advanced_image_processor import AdvancedImageProcessor
+            processor = AdvancedImageProcessor(clip_backend=backend)
+            if processor.clip_backend != backend or processor.clip_model is None:
+                raise CommandError(f'CLIP is not available with the {backend} backend')
+            return lambda image: processor._classify_scene(image).get('primary_scene')
+
+        from machine_learning.ocr_processor import AdvancedOCRProcessor
+        processor = AdvancedOCRProcessor(backend=backend)
+        if processor.backend != backend or processor.pipeline is None:
+            raise CommandError(f'TrOCR is not available with the {backend} backend')
+        return lambda image: processor.extract_text_advanced(image, preprocess=False)['extracted_text']
@@ -0,0 +1,91 @@
+"""
+Management command to (re)build the complaint image similarity index
+Use it to backfill existing complaints or to rebuild after changing the model
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+from PIL import Image
+
+from complaints.models import Complaint
+from machine_learning.dinov2_processor import get_dinov2_processor
+from machine_learning.image_index import complaint_image_source, get_image_index
+
+
+class Command(BaseCommand):
+    help = 'Embed complaint images with DINOv2 and build the image similarity index'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=32,
+            help='Images per DINOv2 forward pass (default: 32)',
+        )
+        parser.add_argument(
+            '--clear',
+            action='store_true',
+            help='Delete the existing index before building',
+        )
+        parser.add_argument(
+            '--train-only',
+            action='store_true',
+            help='Only retrain the IVF lists of the existing index',
+        )
+
+    def handle(self, *args, **options):
+        index = get_image_index()
+
+        if options['train_only']:
+            trained = index.train()
+            self.stdout.write(self.style.SUCCESS(f"Retrained {len(trained)} shards: {trained}"))
+            return
+
+        processor = get_dinov2_processor()
+        if processor.fallback_mode or processor.model is None:
+            raise CommandError('DINOv2 is not available; install torch and transformers')
+
+        if options['clear']:
+            index.clear()
+
+        complaints = Complaint.objects.filter(
+            ~Q(image_file='') & Q(image_file__isnull=False) | ~Q(media='') & Q(media__isnull=False)
+        ).only(
+            'id', 'image_file', 'media', 'incident_latitude', 'incident_longitude', 'location_lat', 'location_lon'
+        ).order_by('id')
+
+        indexed = skipped = 0
+        batch = []
+        for complaint in complaints.iterator(chunk_size=options['batch_size']):
+            coords = complaint.get_incident_coordinates()
+            if coords.latitude is None or coords.longitude is None:
+                skipped += 1
+                continue
+            try:
+                with complaint_image_source(complaint).open('rb') as f:
+                    image = Image.open(f)
+                    image.load()
+            except Exception as e:
+                self.stderr.write(f"Skipping complaint {complaint.id}: {e}")
+                skipped += 1
+                continue
+            batch.append((complaint.id, image, coords))
+            if len(batch) >= options['batch_size']:
+                indexed += self._index_batch(processor, index, batch)
+                batch = []
+        if batch:
+            indexed += self._index_batch(processor, index, batch)
+
+        trained = index.train()
+        self.stdout.write(self.style.SUCCESS(
+            f"Indexed {indexed} complaint images ({skipped} skipped), "
+            f"IVF lists trained for {len(trained)} shards"
+        ))
+
+    def _index_batch(self, processor, index, batch):
+        ids, images, coords = zip(*batch)
+        embeddings = processor.extract_embeddings(list(images), normalize=True, batch_size=len(images))
+        return index.add(
+            list(ids), embeddings,
+            [c.latitude for c in coords], [c.longitude for c in coords],
+        )
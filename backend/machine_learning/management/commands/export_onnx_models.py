@@ -0,0 +1,48 @@
+"""
+Management command to export the vision models to ONNX ahead of time
+Run it at image build or deploy time so workers never export on first use
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from machine_learning.onnx_backend import ONNX, ONNX_AVAILABLE, ONNX_BACKENDS, ONNX_INT8, OnnxCLIP, OnnxDINOv2
+
+
+class Command(BaseCommand):
+    help = 'Export DINOv2 and CLIP to ONNX (fp32 and dynamically quantized int8)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--models',
+            nargs='+',
+            choices=['dinov2', 'clip'],
+            default=['dinov2', 'clip'],
+            help='Models to export (default: both)',
+        )
+        parser.add_argument(
+            '--dinov2-model',
+            default='facebook/dinov2-base',
+            help='DINOv2 checkpoint (default: facebook/dinov2-base)',
+        )
+        parser.add_argument(
+            '--fp32-only',
+            action='store_true',
+            help='Skip int8 quantization',
+        )
+
+    def handle(self, *args, **options):
+        if not ONNX_AVAILABLE:
+            raise CommandError('onnxruntime is not installed; install onnx and onnxruntime')
+
+        backends = [ONNX] if options['fp32_only'] else list(ONNX_BACKENDS)
+        for backend in backends:
+            if 'dinov2' in options['models']:
+                OnnxDINOv2(options['dinov2_model'], backend)
+                self.stdout.write(f"Exported {options['dinov2_model']} ({backend})")
+            if 'clip' in options['models']:
+                OnnxCLIP('openai/clip-vit-base-patch32', backend)
+                self.stdout.write(f"Exported openai/clip-vit-base-patch32 ({backend})")
+
+        self.stdout.write(self.style.SUCCESS(
+            'ONNX export complete' + ('' if options['fp32_only'] else f' (including {ONNX_INT8})')
+        ))
@@ -0,0 +1,372 @@
+"""
+Model Registry for SmartGriev
+
+Heavyweight models (YOLO, EasyOCR, CLIP, ResNet50, DINOv2, TrOCR, Whisper,
+...) are registered here with a loader instead of being loaded in a
+constructor or kept in a module-level dict. A model is loaded on first use,
+or at worker boot when it is listed in MODEL_REGISTRY['WARM_MODELS'], so a
+worker only pays for the models its queues actually run.
+
+Each load records the resident memory it added to the process. When the
+loaded models exceed MODEL_REGISTRY['MEMORY_BUDGET_MB'], the least recently
+used models that are not running an inference are evicted. Load, eviction
+and inference counts and times are kept per model (see ModelRegistry.stats).
+
+Parametrised models are registered as a family: ``register_family('whisper',
+factory)`` makes ``get('whisper:base')`` call ``factory('base')``.
+"""
+import gc
+import importlib
+import logging
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional
+
+from django.conf import settings
+
+from smartgriev.caching import PROMETHEUS_AVAILABLE
+
+logger = logging.getLogger(__name__)
+
+try:
+    import psutil
+    PSUTIL_AVAILABLE = True
+except ImportError:
+    PSUTIL_AVAILABLE = False
+
+if PROMETHEUS_AVAILABLE:
+    from prometheus_client import Counter, Gauge, Histogram
+
+    model_events = Counter(
+        'smartgriev_model_registry_events_total',
+        'Model loads, load failures and evictions',
+        ['model', 'event']
+    )
+    model_resident_memory = Gauge(
+        'smartgriev_model_resident_megabytes',
+        'Resident memory attributed to each loaded model',
+        ['model']
+    )
+    model_inference_duration = Histogram(
+        'smartgriev_model_inference_duration_seconds',
+        'Time spent inside ModelRegistry.use() per model',
+        ['model']
+    )
+
+_DEFAULTS = {
+    'MEMORY_BUDGET_MB': 0,  # 0 disables eviction
+    'WARM_MODELS': [],
+    # Modules that register models; imported before warming so their names resolve
+    'MODULES': [
+        'machine_learning.advanced_image_processor',
+        'machine_learning.dinov2_processor',
+        'machine_learning.ocr_processor',
+        'machine_learning.audio_analyzer',
+        'machine_learning.transcription',
+    ],
+}
+
+
+def resident_memory_mb() -> float:
+    """Resident set size of this process in MB (0 when it cannot be read)"""
+    if PSUTIL_AVAILABLE:
+        return psutil.Process().memory_info().rss / (1024 * 1024)
+    try:
+        with open('/proc/self/statm') as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        return 0.0
+
+
+def _release_memory() -> None:
+    gc.collect()
+    torch = sys.modules.get('torch')
+    if torch is not None and torch.cuda.is_available():
+        torch.cuda.empty_cache()
+
+
+@dataclass
+class ModelSpec:
+    """How to load (and optionally unload) one model"""
+    name: str
+    loader: Callable[[], Any]
+    size_mb: float = 0  # Estimate used before the first load and when RSS cannot be measured
+    unloader: Optional[Callable[[Any], None]] = None
+
+
+class ModelRegistry:
+    """Lazily loaded, memory-budgeted models (see module docstring)"""
+
+    def __init__(self, budget_mb: Optional[float] = None, options: Optional[Dict] = None):
+        self.options = {**_DEFAULTS, **getattr(settings, 'MODEL_REGISTRY', {}), **(options or {})}
+        self.budget_mb = self.options['MEMORY_BUDGET_MB'] if budget_mb is None else budget_mb
+        self._specs: Dict[str, ModelSpec] = {}
+        self._families: Dict[str, tuple] = {}
+        self._loaded: 'OrderedDict[str, Any]' = OrderedDict()  # Least recently used first
+        self._resident: Dict[str, float] = {}
+        self._in_use: Dict[str, int] = {}
+        self._failed: Dict[str, str] = {}
+        self._stats: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.RLock()
+        # Loads are serialised so the RSS delta of each load belongs to one model
+        self._load_lock = threading.Lock()
+
+    # ------------------------------------------------------------ registration
+
+    def register(self, name: str, loader: Callable[[], Any], size_mb: float = 0,
+                 unloader: Optional[Callable[[Any], None]] = None) -> None:
+        """Register a model loader; registering an existing name again is a no-op"""
+        with self._lock:
+            self._specs.setdefault(name, ModelSpec(name, loader, size_mb, unloader))
+
+    def register_family(self, family: str, factory: Callable[[str], Any], size_mb: float = 0,
+                        unloader: Optional[Callable[[Any], None]] = None) -> None:
+        """Register ``family:<arg>`` names whose loader is ``factory(arg)``"""
+        with self._lock:
+            self._families.setdefault(family, (factory, size_mb, unloader))
+
+    def _spec(self, name: str) -> ModelSpec:
+        with self._lock:
+            spec = self._specs.get(name)
+            if spec is None:
+                family, _, arg = name.partition(':')
+                if not arg or family not in self._families:
+                    raise KeyError(f"Model '{name}' is not registered")
+                factory, size_mb, unloader = self._families[family]
+                spec = self._specs[name] = ModelSpec(name, lambda: factory(arg), size_mb, unloader)
+            return spec
+
+    def is_registered(self, name: str) -> bool:
+        try:
+            self._spec(name)
+            return True
+        except KeyError:
+            return False
+
+    def is_loaded(self, name: str) -> bool:
+        return name in self._loaded
+
+    def is_failed(self, name: str) -> bool:
+        return name in self._failed
+
+    # ---------------------------------------------------------------- loading
+
+    def get(self, name: str) -> Optional[Any]:
+        """
+        Return the model, loading it first if needed.
+
+        Returns None when the model failed to load; the failure is remembered
+        until reset() so callers fall back instead of retrying every request.
+        """
+        with self._lock:
+            if name in self._loaded:
+                self._loaded.move_to_end(name)
+                return self._loaded[name]
+            if name in self._failed:
+                return None
+        spec = self._spec(name)
+
+        with self._load_lock:
+            with self._lock:
+                if name in self._loaded:
+                    self._loaded.move_to_end(name)
+                    return self._loaded[name]
+                if name in self._failed:
+                    return None
+            self._make_room(spec.size_mb, keep=name)
+
+            before = resident_memory_mb()
+            start = time.perf_counter()
+            try:
+                logger.info(f"Loading model: {name}")
+                model = spec.loader()
+                if model is None:
+                    raise RuntimeError('loader returned None')
+            except Exception as e:
+                logger.warning(f"Failed to load model {name}: {e}")
+                with self._lock:
+                    self._failed[name] = str(e)
+                    self._counters(name)['failures'] += 1
+                self._emit(name, 'failure')
+                return None
+            elapsed = time.perf_counter() - start
+            measured = resident_memory_mb() - before
+            size_mb = measured if measured > 0 else spec.size_mb
+
+            with self._lock:
+                self._loaded[name] = model
+                self._resident[name] = size_mb
+                counters = self._counters(name)
+                counters['loads'] += 1
+                counters['load_time'] += elapsed
+                counters['last_load_time'] = elapsed
+            logger.info(f"Model {name} loaded in {elapsed:.1f}s (~{size_mb:.0f} MB)")
+            self._emit(name, 'load')
+            if PROMETHEUS_AVAILABLE:
+                model_resident_memory.labels(model=name).set(size_mb)
+
+            self._make_room(0, keep=name)
+        return model
+
+    @contextmanager
+    def use(self, name: str) -> Iterator[Optional[Any]]:
+        """
+        Yield the model for one inference.
+
+        The model cannot be evicted while inside the block, and the time
+        spent there is recorded as inference time. Yields None when the model
+        is unavailable.
+        """
+        model = self.get(name)
+        if model is None:
+            yield None
+            return
+        with self._lock:
+            self._in_use[name] = self._in_use.get(name, 0) + 1
+        start = time.perf_counter()
+        try:
+            yield model
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self._in_use[name] -= 1
+                counters = self._counters(name)
+                counters['inferences'] += 1
+                counters['inference_time'] += elapsed
+            if PROMETHEUS_AVAILABLE:
+                model_inference_duration.labels(model=name).observe(elapsed)
+
+    def warm(self, names: Optional[Iterable[str]] = None) -> Dict[str, bool]:
+        """
+        Load the given models (default: MODEL_REGISTRY['WARM_MODELS']).
+
+        Returns a dict of model name to whether it is now loaded.
+        """
+        names = list(self.options['WARM_MODELS'] if names is None else names)
+        if not names:
+            return {}
+        for module in self.options['MODULES']:
+            try:
+                importlib.import_module(module)
+            except Exception as e:
+                logger.warning(f"Could not import model module {module}: {e}")
+
+        status = {}
+        for name in names:
+            try:
+                status[name] = self.get(name) is not None
+            except KeyError as e:
+                logger.warning(f"Cannot warm model: {e}")
+                status[name] = False
+        logger.info(f"Warm models: {status}")
+        return status
+
+    # --------------------------------------------------------------- eviction
+
+    def _make_room(self, incoming_mb: float, keep: Optional[str] = None) -> None:
+        """Evict least recently used idle models until incoming_mb fits the budget"""
+        if not self.budget_mb:
+            return
+        while True:
+            with self._lock:
+                if sum(self._resident.values()) + incoming_mb <= self.budget_mb:
+                    return
+                victim = next((
+                    name for name in self._loaded
+                    if name != keep and not self._in_use.get(name)
+                ), None)
+            if victim is None:
+                logger.warning(
+                    f"Model memory budget of {self.budget_mb} MB exceeded but every other model is in use"
+                )
+                return
+            self.evict(victim)
+
+    def evict(self, name: str) -> bool:
+        """Drop a loaded model; it is reloaded on next use"""
+        with self._lock:
+            if name not in self._loaded:
+                return False
+            model = self._loaded.pop(name)
+            size_mb = self._resident.pop(name, 0)
+            self._counters(name)['evictions'] += 1
+            spec = self._specs.get(name)
+        if spec is not None and spec.unloader is not None:
+            try:
+                spec.unloader(model)
+            except Exception as e:
+                logger.warning(f"Unloading model {name} failed: {e}")
+        del model
+        _release_memory()
+        logger.info(f"Evicted model {name} (~{size_mb:.0f} MB)")
+        self._emit(name, 'eviction')
+        if PROMETHEUS_AVAILABLE:
+            model_resident_memory.labels(model=name).set(0)
+        return True
+
+    def reset(self, name: Optional[str] = None) -> None:
+        """Evict one model (or all) and forget earlier load failures"""
+        names = [name] if name else list(self._loaded)
+        for model_name in names:
+            self.evict(model_name)
+        with self._lock:
+            if name:
+                self._failed.pop(name, None)
+            else:
+                self._failed.clear()
+
+    # ---------------------------------------------------------------- metrics
+
+    def _counters(self, name: str) -> Dict[str, float]:
+        return self._stats.setdefault(name, {
+            'loads': 0, 'load_time': 0.0, 'last_load_time': 0.0, 'failures': 0,
+            'evictions': 0, 'inferences': 0, 'inference_time': 0.0,
+        })
+
+    @staticmethod
+    def _emit(name: str, event: str) -> None:
+        if PROMETHEUS_AVAILABLE:
+            model_events.labels(model=name, event=event).inc()
+
+    def stats(self) -> Dict[str, Any]:
+        """Budget, memory in use and per-model load/inference statistics"""
+        with self._lock:
+            models = {}
+            for name in sorted(set(self._specs) | set(self._stats)):
+                counters = dict(self._counters(name))
+                inferences = counters['inferences']
+                counters.update({
+                    'loaded': name in self._loaded,
+                    'resident_mb': round(self._resident.get(name, 0), 1),
+                    'in_use': self._in_use.get(name, 0),
+                    'avg_inference_ms': counters['inference_time'] / inferences * 1000 if inferences else 0.0,
+                    'error': self._failed.get(name),
+                })
+                models[name] = counters
+            return {
+                'budget_mb': self.budget_mb,
+                'loaded_mb': round(sum(self._resident.values()), 1),
+                'process_rss_mb': round(resident_memory_mb(), 1),
+                'loaded_models': list(self._loaded),
+                'models': models,
+            }
+
+
+_global_model_registry: Optional[ModelRegistry] = None
+_global_model_registry_lock = threading.Lock()
+
+
+def get_model_registry() -> ModelRegistry:
+    """Process-wide model registry"""
+    global _global_model_registry
+    if _global_model_registry is None:
+        with _global_model_registry_lock:
+            if _global_model_registry is None:
+                _global_model_registry = ModelRegistry()
+    return _global_model_registry
@@ -11,11 +11,13 @@ This module coordinates the complete multimodal complaint analysis pipeline:
 
 import os
 import logging
-from typing import Dict, List, Optional, Any
+from typing import Any, Callable, Dict, List, Optional
 from pathlib import Path
 import json
 import time
 
+from .pipeline import StageGraph, record_stage_time
+
 logger = logging.getLogger(__name__)
 
 # Import analysis modules
@@ -41,6 +43,8 @@ class MultimodalAnalyzer:
     Orchestrates complete multimodal complaint analysis.
     """
     
+    PIPELINE_NAME = 'video_complaint'
+    
     # Department mapping based on complaint content
     DEPARTMENT_MAPPING = {
         'pothole': 'Public Works Department',
@@ -83,64 +87,57 @@ class MultimodalAnalyzer:
         
         logger.info("MultimodalAnalyzer initialized")
     
-    def analyze_video_complaint(self, video_path: str) -> Dict[str, Any]:
+    def analyze_video_complaint(
+        self,
+        video_path: str,
+        on_stage: Optional[Callable[[str, str, Any, float], None]] = None
+    ) -> Dict[str, Any]:
         """
         Perform complete multimodal analysis of video complaint.
         
+        Audio (extraction, transcription) and visual (key frames, frame
+        analysis) branches run concurrently once the video is validated.
+        
         Args:
             video_path: Path to video file
+            on_stage: Optional callback(name, status, result, seconds) invoked
+                as each stage finishes, for streaming partial results
             
         Returns:
-            Complete analysis results with AI response
+            Complete analysis results with AI response and per-stage timings
         """
         start_time = time.time()
         
         try:
-            # Validate video
-            logger.info(f"Validating video: {video_path}")
-            validation = self.video_processor.validate_video(video_path)
+            run = self._build_video_graph(video_path).run(on_stage=on_stage)
             
-            if not validation.get('valid'):
+            if not run.succeeded('validate'):
                 return {
                     'success': False,
-                    'error': validation.get('error', 'Video validation failed')
+                    'error': run.errors.get('validate', 'Video validation failed'),
+                    'pipeline': run.summary()
                 }
             
-            # Extract audio
-            logger.info("Extracting audio from video")
-            audio_result = self.video_processor.extract_audio(video_path)
-            
-            audio_analysis = None
-            if audio_result.get('success'):
-                # Analyze audio
-                logger.info("Analyzing audio")
-                audio_analysis = self.audio_analyzer.analyze_audio(
-                    audio_result['audio_path']
-                )
-            
-            # Extract key frames
-            logger.info("Extracting key frames")
-            frames_result = self.video_processor.extract_key_frames(video_path, num_frames=5)
-            
-            visual_analysis = None
-            if frames_result.get('success'):
-                # Analyze frames
-                logger.info("Analyzing visual content")
-                visual_analysis = self.visual_analyzer.analyze_frames(
-                    frames_result['frame_paths']
-                )
+            validation = run.results['validate']
+            audio_analysis = run.results.get('analyze_audio')
+            visual_analysis = run.results.get('analyze_frames')
             
-            # Fuse multimodal information
+            # Fuse multimodal information and generate the AI response
             logger.info("Fusing multimodal data")
+            stage_start = time.perf_counter()
             fused_analysis = self._fuse_multimodal_data(
                 audio_analysis,
                 visual_analysis,
                 validation['metadata']
             )
-            
-            # Generate AI response
-            logger.info("Generating AI response")
             ai_response = self._generate_response(fused_analysis)
+            response_time = time.perf_counter() - stage_start
+            record_stage_time(self.PIPELINE_NAME, 'fuse_and_respond', response_time)
+            
+            pipeline = run.summary()
+            pipeline['stage_timings']['fuse_and_respond'] = round(response_time, 3)
+            if on_stage:
+                on_stage('fuse_and_respond', 'success', None, response_time)
             
             # Combine all results
             processing_time = time.time() - start_time
@@ -158,7 +155,8 @@ class MultimodalAnalyzer:
                 'suggested_department': ai_response.get('department', 'General Administration'),
                 'suggested_priority': ai_response.get('priority', 'Medium'),
                 'processing_time': processing_time,
-                'video_metadata': validation['metadata']
+                'video_metadata': validation['metadata'],
+                'pipeline': pipeline
             }
             
             logger.info(f"Analysis completed in {processing_time:.2f}s")
@@ -171,6 +169,51 @@ class MultimodalAnalyzer:
                 'error': f'Analysis failed: {str(e)}'
             }
     
+    def _build_video_graph(self, video_path: str) -> StageGraph:
+        """
+        Stage graph for a video complaint:
+        
+            validate -> extract_audio -> analyze_audio
+                     -> extract_frames -> analyze_frames
+        """
+        def validate(_):
+            logger.info(f"Validating video: {video_path}")
+            validation = self.video_processor.validate_video(video_path)
+            if not validation.get('valid'):
+                raise ValueError(validation.get('error', 'Video validation failed'))
+            return validation
+        
+        def extract_audio(_):
+            logger.info("Extracting audio from video")
+            audio_result = self.video_processor.extract_audio(video_path)
+            if not audio_result.get('success'):
+                raise RuntimeError(audio_result.get('error', 'Audio extraction failed'))
+            return audio_result
+        
+        def analyze_audio(results):
+            logger.info("Analyzing audio")
+            return self.audio_analyzer.analyze_audio(results['extract_audio']['audio_path'])
+        
+        def extract_frames(_):
+            logger.info("Extracting key frames")
+            frames_result = self.video_processor.extract_key_frames(video_path, num_frames=5)
+            if not frames_result.get('success'):
+                raise RuntimeError(frames_result.get('error', 'Key frame extraction failed'))
+            return frames_result
+        
+        def analyze_frames(results):
+            logger.info("Analyzing visual content")
+            return self.visual_analyzer.analyze_frames(results['extract_frames']['frames'])
+        
+        return (
+            StageGraph(self.PIPELINE_NAME)
+            .add('validate', validate)
+            .add('extract_audio', extract_audio, depends_on=['validate'])
+            .add('analyze_audio', analyze_audio, depends_on=['extract_audio'])
+            .add('extract_frames', extract_frames, depends_on=['validate'])
+            .add('analyze_frames', analyze_frames, depends_on=['extract_frames'])
+        )
+    
     def _fuse_multimodal_data(
         self,
         audio_analysis: Optional[Dict[str, Any]],
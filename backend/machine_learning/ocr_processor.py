@@ -38,18 +38,64 @@ except ImportError:
 import cv2
 import time
 import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from io import BytesIO
 import torch
 from functools import lru_cache
 import warnings
 
+from smartgriev.media_cache import cached_analysis, get_media_cache
+
+from .model_registry import get_model_registry
+from .onnx_backend import EAGER, TORCH_INT8, get_backend, quantize_torch_model
+
 # Suppress warnings for cleaner output
 warnings.filterwarnings("ignore")
 
 logger = logging.getLogger(__name__)
 
-# Global model cache to avoid reloading
-_MODEL_CACHE = {}
+
+def _load_trocr_pipeline(model_name: str):
+    return pipeline(
+        "image-to-text",
+        model=model_name,
+        tokenizer=model_name,
+        device=0 if torch.cuda.is_available() else -1
+    )
+
+
+def _load_quantized_trocr_pipeline(model_name: str):
+    """CPU pipeline with int8 Linear layers (the decoder loop keeps TrOCR out of ONNX)"""
+    ocr_pipeline = pipeline("image-to-text", model=model_name, tokenizer=model_name, device=-1)
+    ocr_pipeline.model = quantize_torch_model(ocr_pipeline.model)
+    return ocr_pipeline
+
+
+if TRANSFORMERS_AVAILABLE:
+    # Loaded on first use as 'trocr:<model name>', e.g. 'trocr:microsoft/trocr-base-printed'
+    get_model_registry().register_family('trocr', _load_trocr_pipeline, size_mb=1400)
+    get_model_registry().register_family(f'trocr-{TORCH_INT8}', _load_quantized_trocr_pipeline, size_mb=500)
+
+# Throughput counters reported by get_ocr_performance_stats
+_THROUGHPUT = {
+    'images_processed': 0,
+    'processing_time': 0.0,
+    'batches_processed': 0,
+    'last_batch_size': 0,
+    'last_batch_images_per_second': 0.0,
+}
+_THROUGHPUT_LOCK = threading.Lock()
+
+
+def _record_throughput(image_count: int, elapsed: float, batch: bool = False) -> None:
+    with _THROUGHPUT_LOCK:
+        _THROUGHPUT['images_processed'] += image_count
+        _THROUGHPUT['processing_time'] += elapsed
+        if batch:
+            _THROUGHPUT['batches_processed'] += 1
+            _THROUGHPUT['last_batch_size'] = image_count
+            _THROUGHPUT['last_batch_images_per_second'] = image_count / elapsed if elapsed > 0 else 0.0
 
 class AdvancedOCRProcessor:
     """
@@ -57,43 +103,34 @@ class AdvancedOCRProcessor:
     and performance optimization for better text extraction accuracy.
     """
     
-    def __init__(self, model_name: str = "microsoft/trocr-base-printed"):
+    def __init__(self, model_name: str = "microsoft/trocr-base-printed", backend: Optional[str] = None):
+        """
+        Args:
+            model_name: TrOCR checkpoint
+            backend: 'eager' or 'torch-int8' (default: INFERENCE_BACKENDS['trocr'])
+        """
         self.model_name = model_name
-        self.device = "cuda" if torch.cuda.is_available() else "cpu"
-        self._pipeline = None
-        self._processor = None
-        self._model = None
-        self.fallback_mode = False
+        self.backend = get_backend('trocr', backend, supported=(EAGER, TORCH_INT8))
+        if self.backend == EAGER:
+            self.device = "cuda" if torch.cuda.is_available() else "cpu"
+            self.registry_name = f"trocr:{model_name}"
+        else:
+            self.device = "cpu"
+            self.registry_name = f"trocr-{self.backend}:{model_name}"
+        self.registry = get_model_registry()
+        self.fallback_mode = not TRANSFORMERS_AVAILABLE
         logger.info(f"Initializing AdvancedOCRProcessor with device: {self.device}")
     
     @property
     def pipeline(self):
-        """Lazy loading of OCR pipeline with caching and fallback handling"""
-        if self._pipeline is None and not self.fallback_mode:
-            cache_key = f"{self.model_name}_{self.device}"
-            if cache_key in _MODEL_CACHE:
-                self._pipeline = _MODEL_CACHE[cache_key]
-                logger.info("Using cached OCR pipeline")
-            else:
-                try:
-                    if not TRANSFORMERS_AVAILABLE:
-                        raise ImportError("Transformers not available")
-                    
-                    logger.info(f"Loading OCR model: {self.model_name}")
-                    self._pipeline = pipeline(
-                        "image-to-text",
-                        model=self.model_name,
-                        tokenizer=self.model_name,
-                        device=0 if self.device == "cuda" else -1
-                    )
-                    _MODEL_CACHE[cache_key] = self._pipeline
-                    logger.info("OCR pipeline loaded and cached")
-                except Exception as e:
-                    logger.warning(f"Failed to load TrOCR model: {str(e)}. Switching to fallback mode.")
-                    logger.info("OCR will operate in fallback mode (basic text extraction)")
-                    self.fallback_mode = True
-                    self._pipeline = None
-        return self._pipeline
+        """OCR pipeline from the model registry (loaded on first use), None in fallback mode"""
+        if self.fallback_mode:
+            return None
+        ocr_pipeline = self.registry.get(self.registry_name)
+        if ocr_pipeline is None:
+            logger.info("OCR will operate in fallback mode (basic text extraction)")
+            self.fallback_mode = True
+        return ocr_pipeline
     
     def preprocess_image(self, image: Image.Image) -> Image.Image:
         """
@@ -174,6 +211,39 @@ class AdvancedOCRProcessor:
             logger.error(f"Fallback OCR failed: {str(e)}")
             return [{'generated_text': f'[OCR Error: {str(e)}]'}]
     
+    def _build_result(self, extracted_text: str, processing_time: float, 
+                      preprocess: bool) -> Dict[str, Union[str, float, List]]:
+        """Confidence scoring and metadata for one extracted text"""
+        # Adjust confidence based on the OCR method used
+        if not extracted_text:
+            confidence = 0.0
+        elif self.fallback_mode:
+            if '[OCR functionality temporarily unavailable]' in extracted_text or '[OCR Error:' in extracted_text:
+                confidence = 0.0
+            elif TESSERACT_AVAILABLE:
+                confidence = min(0.7, len(extracted_text) / 150.0 + 0.3)  # Lower confidence for Tesseract
+            else:
+                confidence = 0.1  # Very low confidence for placeholder text
+        else:
+            # Standard confidence for TrOCR
+            confidence = min(0.9, len(extracted_text) / 100.0 + 0.5)
+        
+        # Determine the model/method used
+        model_info = "fallback-tesseract" if self.fallback_mode and TESSERACT_AVAILABLE else \
+                    "fallback-placeholder" if self.fallback_mode else self.model_name
+        
+        return {
+            'extracted_text': extracted_text,
+            'confidence': confidence,
+            'processing_time': processing_time,
+            'character_count': len(extracted_text),
+            'word_count': len(extracted_text.split()),
+            'preprocessing_applied': preprocess,
+            'model_used': model_info,
+            'device_used': self.device,
+            'fallback_mode': self.fallback_mode
+        }
+    
     def extract_text_advanced(self, image: Image.Image, 
                             preprocess: bool = True,
                             confidence_threshold: float = 0.5) -> Dict[str, Union[str, float, List]]:
@@ -192,53 +262,21 @@ class AdvancedOCRProcessor:
         
         try:
             # Preprocess image if requested
-            if preprocess:
-                processed_image = self.preprocess_image(image)
-            else:
-                processed_image = image.convert('RGB') if image.mode != 'RGB' else image
+            processed_image = self._prepare_image(image, preprocess)
             
             # Try to extract text using the TrOCR pipeline first
             if not self.fallback_mode and self.pipeline is not None:
-                results = self.pipeline(processed_image)
+                with self.registry.use(self.registry_name) as ocr_pipeline:
+                    results = ocr_pipeline(processed_image)
             else:
                 # Use fallback OCR method
                 results = self._fallback_ocr(processed_image)
             
-            # Process results
-            if results and len(results) > 0:
-                extracted_text = results[0].get('generated_text', '')
-                # Adjust confidence based on the OCR method used
-                if self.fallback_mode:
-                    if '[OCR functionality temporarily unavailable]' in extracted_text or '[OCR Error:' in extracted_text:
-                        confidence = 0.0
-                    elif TESSERACT_AVAILABLE:
-                        confidence = min(0.7, len(extracted_text) / 150.0 + 0.3)  # Lower confidence for Tesseract
-                    else:
-                        confidence = 0.1  # Very low confidence for placeholder text
-                else:
-                    # Standard confidence for TrOCR
-                    confidence = min(0.9, len(extracted_text) / 100.0 + 0.5)
-            else:
-                extracted_text = ''
-                confidence = 0.0
-            
+            extracted_text = results[0].get('generated_text', '') if results else ''
             processing_time = time.time() - start_time
-            
-            # Determine the model/method used
-            model_info = "fallback-tesseract" if self.fallback_mode and TESSERACT_AVAILABLE else \
-                        "fallback-placeholder" if self.fallback_mode else self.model_name
-            
-            result = {
-                'extracted_text': extracted_text,
-                'confidence': confidence,
-                'processing_time': processing_time,
-                'character_count': len(extracted_text),
-                'word_count': len(extracted_text.split()),
-                'preprocessing_applied': preprocess,
-                'model_used': model_info,
-                'device_used': self.device,
-                'fallback_mode': self.fallback_mode
-            }
+            result = self._build_result(extracted_text, processing_time, preprocess)
+            confidence = result['confidence']
+            _record_throughput(1, processing_time)
             
             logger.info(f"Advanced OCR completed in {processing_time:.2f}s, "
                        f"extracted {len(extracted_text)} characters with confidence {confidence:.2f}")
@@ -249,30 +287,96 @@ class AdvancedOCRProcessor:
             logger.error(f"Advanced OCR processing error: {str(e)}")
             raise Exception(f"Advanced OCR processing failed: {str(e)}")
     
-    def batch_extract_text(self, images: List[Image.Image]) -> List[Dict]:
+    def _prepare_image(self, image: Image.Image, preprocess: bool) -> Image.Image:
+        if preprocess:
+            return self.preprocess_image(image)
+        return image.convert('RGB') if image.mode != 'RGB' else image
+    
+    def _recognize_batch(self, images: List[Image.Image], batch_size: int,
+                         executor: ThreadPoolExecutor) -> List[Union[str, Exception]]:
+        """Recognize prepared images; returns text or the exception per image, in order"""
+        if self.fallback_mode or self.pipeline is None:
+            # Tesseract runs out of process, so the fallback parallelizes on the pool
+            outputs = list(executor.map(self._fallback_ocr, images))
+            return [output[0].get('generated_text', '') if output else '' for output in outputs]
+        
+        with self.registry.use(self.registry_name) as ocr_pipeline:
+            try:
+                outputs = ocr_pipeline(images, batch_size=batch_size)
+                return [output[0].get('generated_text', '') if output else '' for output in outputs]
+            except Exception as e:
+                logger.warning(f"Batched OCR failed ({str(e)}), retrying images one at a time")
+            
+            # Isolate the failing image(s) so the rest of the batch still gets results
+            texts = []
+            for image in images:
+                try:
+                    output = ocr_pipeline(image)
+                    texts.append(output[0].get('generated_text', '') if output else '')
+                except Exception as e:
+                    texts.append(e)
+            return texts
+    
+    def batch_extract_text(self, images: List[Image.Image], preprocess: bool = True,
+                           batch_size: int = 8, max_workers: Optional[int] = None) -> List[Dict]:
         """
         Process multiple images in batch for better performance.
         
+        Preprocessing runs on a thread pool (OpenCV releases the GIL) and the
+        TrOCR pipeline is called once with ``batch_size``, so per-call model
+        overhead is paid per batch rather than per image.
+        
         Args:
             images: List of PIL Image objects
+            preprocess: Whether to apply image preprocessing
+            batch_size: Images per model forward pass
+            max_workers: Preprocessing threads (default: min(8, CPU count))
             
         Returns:
-            List of extraction results
+            List of extraction results, one per input image and in the same
+            order; failed images carry an 'error' key
         """
-        results = []
-        for i, image in enumerate(images):
+        if not images:
+            return []
+        
+        start_time = time.time()
+        max_workers = max_workers or min(8, os.cpu_count() or 1, len(images))
+        results: List[Optional[Dict]] = [None] * len(images)
+        
+        def prepare(image):
             try:
-                result = self.extract_text_advanced(image)
-                result['image_index'] = i
-                results.append(result)
+                return self._prepare_image(image, preprocess)
             except Exception as e:
-                logger.error(f"Error processing image {i}: {str(e)}")
-                results.append({
+                return e
+        
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            prepared = list(executor.map(prepare, images))
+            valid = [i for i, image in enumerate(prepared) if not isinstance(image, Exception)]
+            texts = self._recognize_batch([prepared[i] for i in valid], batch_size, executor) if valid else []
+        
+        elapsed = time.time() - start_time
+        per_image_time = elapsed / len(images)
+        
+        for i, text in zip(valid, texts):
+            if isinstance(text, Exception):
+                prepared[i] = text
+                continue
+            results[i] = self._build_result(text, per_image_time, preprocess)
+        
+        for i, outcome in enumerate(prepared):
+            if results[i] is None:
+                logger.error(f"Error processing image {i}: {str(outcome)}")
+                results[i] = {
                     'extracted_text': '',
                     'confidence': 0.0,
-                    'error': str(e),
-                    'image_index': i
-                })
+                    'error': str(outcome),
+                }
+            results[i]['image_index'] = i
+            results[i]['batch_processing_time'] = elapsed
+        
+        _record_throughput(len(images), elapsed, batch=True)
+        logger.info(f"Batch OCR processed {len(images)} images in {elapsed:.2f}s "
+                    f"({len(images) / elapsed if elapsed > 0 else 0.0:.1f} images/s)")
         return results
 
 # Global instance for backward compatibility
@@ -362,34 +466,51 @@ def extract_text_from_image_bytes(image_bytes) -> Dict[str, str]:
         if hasattr(image_bytes, 'seek'):
             image_bytes.seek(0)  # Reset file pointer if it's a file-like object
         
-        # Load the image from bytes with enhanced error handling
-        try:
-            image = Image.open(image_bytes)
-        except Exception as e:
-            raise Exception(f"Failed to load image from bytes: {str(e)}")
-        
-        # Get image metadata for logging
-        image_format = getattr(image, 'format', 'Unknown')
-        image_size = image.size
-        
-        logger.info(f"Processing image from bytes (Format: {image_format}, Size: {image_size})")
-        
-        # Use advanced OCR processor with preprocessing
+        # Re-uploads of the same image are served from the media analysis cache
         ocr_processor = get_ocr_processor()
-        result = ocr_processor.extract_text_advanced(image, preprocess=True)
-        
-        # Log processing results
-        logger.info(f"OCR from bytes completed: {result['character_count']} chars, "
-                   f"confidence: {result['confidence']:.2f}, time: {result['processing_time']:.2f}s")
-        
-        # Return backward-compatible result
-        return {'extracted_text': result['extracted_text']}
+        ocr_processor.pipeline  # Resolve fallback mode before it becomes part of the cache key
+        version = 'fallback' if ocr_processor.fallback_mode else ocr_processor.registry_name
+        return cached_analysis(
+            'ocr', version, image_bytes,
+            lambda: _extract_text_from_bytes(image_bytes, ocr_processor),
+            cacheable=lambda result: bool(result.get('extracted_text')) and not result['extracted_text'].startswith('[OCR')
+        )
         
     except Exception as e:
         logger.error(f"OCR processing error from bytes: {str(e)}")
         raise Exception(f"Error during OCR processing from bytes: {str(e)}")
 
 
+def _extract_text_from_bytes(image_bytes, ocr_processor: AdvancedOCRProcessor) -> Dict[str, str]:
+    """Uncached body of extract_text_from_image_bytes"""
+    if isinstance(image_bytes, (bytes, bytearray)):
+        image_bytes = BytesIO(image_bytes)
+    elif hasattr(image_bytes, 'seek'):
+        image_bytes.seek(0)  # Hashing for the cache key moved the file pointer
+    
+    # Load the image from bytes with enhanced error handling
+    try:
+        image = Image.open(image_bytes)
+    except Exception as e:
+        raise Exception(f"Failed to load image from bytes: {str(e)}")
+    
+    # Get image metadata for logging
+    image_format = getattr(image, 'format', 'Unknown')
+    image_size = image.size
+    
+    logger.info(f"Processing image from bytes (Format: {image_format}, Size: {image_size})")
+    
+    # Use advanced OCR processor with preprocessing
+    result = ocr_processor.extract_text_advanced(image, preprocess=True)
+    
+    # Log processing results
+    logger.info(f"OCR from bytes completed: {result['character_count']} chars, "
+               f"confidence: {result['confidence']:.2f}, time: {result['processing_time']:.2f}s")
+    
+    # Return backward-compatible result
+    return {'extracted_text': result['extracted_text']}
+
+
 def _validate_image_format(image_path: str) -> bool:
     """
     Private helper function to validate image format.
@@ -417,19 +538,35 @@ def get_ocr_performance_stats() -> Dict[str, Union[str, int, float]]:
     return {
         'model_name': ocr_processor.model_name,
         'device': ocr_processor.device,
+        'backend': ocr_processor.backend,
         'cuda_available': torch.cuda.is_available(),
-        'cached_models': len(_MODEL_CACHE),
+        'cached_models': sum(name.startswith('trocr') for name in get_model_registry().stats()['loaded_models']),
         'supported_formats': ['.jpg', '.jpeg', '.png', '.bmp', '.tiff', '.gif', '.webp'],
         'preprocessing_available': True,
         'batch_processing_available': True,
+        'throughput': get_ocr_throughput(),
+        'analysis_cache': get_media_cache().get_stats(),
         'version': '2.0-enhanced'
     }
 
 
+def get_ocr_throughput() -> Dict[str, Union[int, float]]:
+    """Images processed so far in this process and the resulting images/sec"""
+    with _THROUGHPUT_LOCK:
+        stats = dict(_THROUGHPUT)
+    elapsed = stats.pop('processing_time')
+    stats['total_processing_time'] = elapsed
+    stats['images_per_second'] = stats['images_processed'] / elapsed if elapsed > 0 else 0.0
+    return stats
+
+
 def clear_model_cache():
-    """Clear the model cache to free up memory."""
-    global _MODEL_CACHE, _global_ocr_processor
-    _MODEL_CACHE.clear()
+    """Unload TrOCR models from the model registry to free up memory."""
+    global _global_ocr_processor
+    registry = get_model_registry()
+    for name in registry.stats()['loaded_models']:
+        if name.startswith('trocr'):
+            registry.reset(name)
     _global_ocr_processor = None
     logger.info("OCR model cache cleared")
 
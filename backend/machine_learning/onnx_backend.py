@@ -0,0 +1,265 @@
+"""
+ONNX Runtime Inference Backend for SmartGriev Vision Models
+
+Workers are CPU-only, where eager fp32 PyTorch is the slowest way to run the
+vision transformers. Each processor can pick its inference backend per model
+(settings.INFERENCE_BACKENDS or the ``backend`` constructor argument):
+
+- ``eager``: the transformers model in PyTorch (default)
+- ``onnx``: the model exported to ONNX and run by onnxruntime
+- ``onnx-int8``: the ONNX export with dynamically quantized int8 weights
+- ``torch-int8``: PyTorch dynamic int8 quantization of the Linear layers,
+  used for TrOCR, whose autoregressive decoder does not export to a single
+  ONNX graph
+
+Exports are written once to ONNX_INFERENCE['MODEL_DIR'] (on first use, or
+ahead of time with ``manage.py export_onnx_models``) and reused by every
+worker. The directory lives under PRIVATE_DATA_ROOT, not the publicly served
+MEDIA_ROOT, since workers load whatever graph they find there.
+``manage.py benchmark_inference_backends`` checks parity and latency against
+the eager path.
+"""
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Optional
+
+import numpy as np
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+try:
+    import onnxruntime as ort
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    ONNX_AVAILABLE = True
+except ImportError:
+    ort = None
+    ONNX_AVAILABLE = False
+
+EAGER = 'eager'
+ONNX = 'onnx'
+ONNX_INT8 = 'onnx-int8'
+TORCH_INT8 = 'torch-int8'
+
+ONNX_BACKENDS = (ONNX, ONNX_INT8)
+
+_DEFAULTS = {
+    'MODEL_DIR': os.path.join(settings.PRIVATE_DATA_ROOT, 'onnx_models'),
+    'INTRA_OP_THREADS': 0,  # 0 lets onnxruntime use one thread per physical core
+    'OPSET': 17,
+}
+
+# One export at a time per process; exports of the same model in other processes
+# are made safe by writing to a temporary file and renaming
+_export_lock = threading.Lock()
+
+
+def onnx_options() -> Dict:
+    return {**_DEFAULTS, **getattr(settings, 'ONNX_INFERENCE', {})}
+
+
+def get_backend(model: str, backend: Optional[str] = None, supported=(EAGER, ONNX, ONNX_INT8)) -> str:
+    """
+    Backend to run ``model`` ('dinov2', 'clip', 'trocr') with.
+
+    An explicit ``backend`` wins over settings.INFERENCE_BACKENDS. Backends
+    that are unsupported for the model, or need onnxruntime when it is not
+    installed, fall back to eager.
+    """
+    backend = backend or getattr(settings, 'INFERENCE_BACKENDS', {}).get(model, EAGER)
+    if backend not in supported:
+        logger.warning(f"Inference backend '{backend}' is not supported for {model}; using eager")
+        return EAGER
+    if backend in ONNX_BACKENDS and not ONNX_AVAILABLE:
+        logger.warning(f"onnxruntime is not installed; running {model} eagerly")
+        return EAGER
+    return backend
+
+
+def export_dir(model_name: str) -> Path:
+    return Path(onnx_options()['MODEL_DIR']) / model_name.replace('/', '__')
+
+
+def create_session(path: Path) -> 'ort.InferenceSession':
+    """CPU inference session with the configured intra-op thread count"""
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    options.intra_op_num_threads = onnx_options()['INTRA_OP_THREADS']
+    options.inter_op_num_threads = 1
+    return ort.InferenceSession(str(path), sess_options=options, providers=['CPUExecutionProvider'])
+
+
+def _export(module, inputs: tuple, input_names, output_names, dynamic_axes, path: Path) -> None:
+    import torch
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(f'.{os.getpid()}.tmp')
+    with torch.no_grad():
+        torch.onnx.export(
+            module, inputs, str(tmp_path),
+            input_names=input_names, output_names=output_names,
+            dynamic_axes=dynamic_axes, opset_version=onnx_options()['OPSET'],
+        )
+    os.replace(tmp_path, path)
+
+
+def _quantize(fp32_path: Path, int8_path: Path) -> None:
+    tmp_path = int8_path.with_suffix(f'.{os.getpid()}.tmp')
+    quantize_dynamic(str(fp32_path), str(tmp_path), weight_type=QuantType.QInt8)
+    os.replace(tmp_path, int8_path)
+
+
+def _model_path(model_name: str, graph: str, backend: str, export) -> Path:
+    """Path of one exported graph, exporting (and quantizing) it first if missing"""
+    directory = export_dir(model_name)
+    fp32_path = directory / f'{graph}.onnx'
+    path = directory / f'{graph}.int8.onnx' if backend == ONNX_INT8 else fp32_path
+    with _export_lock:
+        if not fp32_path.exists():
+            logger.info(f"Exporting {model_name} ({graph}) to ONNX")
+            export(fp32_path)
+        if backend == ONNX_INT8 and not path.exists():
+            logger.info(f"Quantizing {model_name} ({graph}) to int8")
+            _quantize(fp32_path, path)
+    return path
+
+
+# --------------------------------------------------------------------- DINOv2
+
+def _export_dinov2(model_name: str, path: Path) -> None:
+    import torch
+    from transformers import AutoModel
+
+    model = AutoModel.from_pretrained(model_name).eval()
+
+    class LastHiddenState(torch.nn.Module):
+        def __init__(self, model):
+            super().__init__()
+            self.model = model
+
+        def forward(self, pixel_values):
+            return self.model(pixel_values=pixel_values).last_hidden_state
+
+    _export(
+        LastHiddenState(model), (torch.zeros(1, 3, 224, 224),),
+        ['pixel_values'], ['last_hidden_state'],
+        {'pixel_values': {0: 'batch'}, 'last_hidden_state': {0: 'batch', 1: 'tokens'}},
+        path,
+    )
+
+
+class OnnxDINOv2:
+    """DINOv2 backbone returning the last hidden state as a NumPy array"""
+
+    def __init__(self, model_name: str, backend: str = ONNX_INT8):
+        path = _model_path(model_name, 'dinov2', backend, lambda p: _export_dinov2(model_name, p))
+        self.session = create_session(path)
+
+    def last_hidden_state(self, pixel_values: np.ndarray) -> np.ndarray:
+        return self.session.run(
+            ['last_hidden_state'], {'pixel_values': pixel_values.astype(np.float32, copy=False)}
+        )[0]
+
+
+# ----------------------------------------------------------------------- CLIP
+
+def _load_clip_for_export(model_name: str):
+    from transformers import CLIPModel
+    return CLIPModel.from_pretrained(model_name).eval()
+
+
+def _export_clip_vision(model_name: str, path: Path) -> None:
+    import torch
+
+    model = _load_clip_for_export(model_name)
+
+    class ImageFeatures(torch.nn.Module):
+        def __init__(self, model):
+            super().__init__()
+            self.model = model
+
+        def forward(self, pixel_values):
+            return self.model.get_image_features(pixel_values=pixel_values)
+
+    _export(
+        ImageFeatures(model), (torch.zeros(1, 3, 224, 224),),
+        ['pixel_values'], ['image_embeds'],
+        {'pixel_values': {0: 'batch'}, 'image_embeds': {0: 'batch'}},
+        path,
+    )
+    # The logit scale is a learned scalar outside both graphs
+    with open(path.parent / 'clip.json', 'w') as f:
+        json.dump({'logit_scale': float(model.logit_scale.exp())}, f)
+
+
+def _export_clip_text(model_name: str, path: Path) -> None:
+    import torch
+
+    model = _load_clip_for_export(model_name)
+
+    class TextFeatures(torch.nn.Module):
+        def __init__(self, model):
+            super().__init__()
+            self.model = model
+
+        def forward(self, input_ids, attention_mask):
+            return self.model.get_text_features(input_ids=input_ids, attention_mask=attention_mask)
+
+    tokens = torch.ones(1, 8, dtype=torch.long)
+    _export(
+        TextFeatures(model), (tokens, tokens),
+        ['input_ids', 'attention_mask'], ['text_embeds'],
+        {'input_ids': {0: 'batch', 1: 'sequence'}, 'attention_mask': {0: 'batch', 1: 'sequence'},
+         'text_embeds': {0: 'batch'}},
+        path,
+    )
+
+
+class OnnxCLIP:
+    """
+    CLIP as separate image and text encoders.
+
+    ``logits_per_image`` matches CLIPModel(...).logits_per_image: scaled
+    cosine similarity between the projected image and text embeddings.
+    """
+
+    def __init__(self, model_name: str, backend: str = ONNX_INT8):
+        vision_path = _model_path(model_name, 'clip_vision', backend, lambda p: _export_clip_vision(model_name, p))
+        text_path = _model_path(model_name, 'clip_text', backend, lambda p: _export_clip_text(model_name, p))
+        self.vision = create_session(vision_path)
+        self.text = create_session(text_path)
+        with open(vision_path.parent / 'clip.json') as f:
+            self.logit_scale = json.load(f)['logit_scale']
+
+    def image_embeds(self, pixel_values: np.ndarray) -> np.ndarray:
+        return self.vision.run(['image_embeds'], {'pixel_values': pixel_values.astype(np.float32, copy=False)})[0]
+
+    def text_embeds(self, input_ids: np.ndarray, attention_mask: np.ndarray) -> np.ndarray:
+        return self.text.run(['text_embeds'], {
+            'input_ids': input_ids.astype(np.int64, copy=False),
+            'attention_mask': attention_mask.astype(np.int64, copy=False),
+        })[0]
+
+    def logits_per_image(self, pixel_values: np.ndarray, input_ids: np.ndarray,
+                         attention_mask: np.ndarray) -> np.ndarray:
+        image = self.image_embeds(pixel_values)
+        text = self.text_embeds(input_ids, attention_mask)
+        image = image / np.linalg.norm(image, axis=-1, keepdims=True)
+        text = text / np.linalg.norm(text, axis=-1, keepdims=True)
+        return self.logit_scale * image @ text.T
+
+
+# ---------------------------------------------------------------------- TrOCR
+
+def quantize_torch_model(model):
+    """PyTorch dynamic int8 quantization of the Linear layers (CPU only)"""
+    import torch
+    return torch.quantization.quantize_dynamic(model.to('cpu').eval(), {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def softmax(logits: np.ndarray, axis: int = -1) -> np.ndarray:
+    shifted = np.exp(logits - logits.max(axis=axis, keepdims=True))
+    return shifted / shifted.sum(axis=axis, keepdims=True)
@@ -0,0 +1,188 @@
+"""
+Stage Graph Executor for SmartGriev Analysis Pipelines
+
+Runs the stages of an analysis pipeline (extraction, transcription, frame
+analysis, ...) on a shared thread pool as soon as their dependencies have
+finished, so independent branches overlap and end-to-end latency tracks the
+slowest branch instead of the sum of all stages. Per-stage timings are
+returned with the results and exported to Prometheus.
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+try:
+    from prometheus_client import Histogram
+    PROMETHEUS_AVAILABLE = True
+except ImportError:
+    PROMETHEUS_AVAILABLE = False
+
+if PROMETHEUS_AVAILABLE:
+    stage_duration = Histogram(
+        'smartgriev_pipeline_stage_seconds',
+        'Duration of analysis pipeline stages',
+        ['pipeline', 'stage', 'status'],
+        buckets=[0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120]
+    )
+
+DEFAULT_MAX_WORKERS = 4
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_pipeline_executor() -> ThreadPoolExecutor:
+    """
+    Process-wide pool for pipeline stages.
+
+    Threads rather than processes: the heavy stages are Whisper/Torch
+    inference and ffmpeg subprocesses, which release the GIL, and the
+    models are loaded once per process.
+    """
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                try:
+                    from django.conf import settings
+                    max_workers = getattr(settings, 'ML_PIPELINE_MAX_WORKERS', DEFAULT_MAX_WORKERS)
+                except Exception:
+                    max_workers = DEFAULT_MAX_WORKERS
+                _executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='ml-stage')
+    return _executor
+
+
+@dataclass
+class Stage:
+    name: str
+    func: Callable[[Dict[str, Any]], Any]
+    depends_on: Tuple[str, ...] = ()
+
+
+@dataclass
+class StageGraphRun:
+    """Outcome of one graph execution"""
+    results: Dict[str, Any] = field(default_factory=dict)
+    timings: Dict[str, float] = field(default_factory=dict)
+    errors: Dict[str, str] = field(default_factory=dict)
+    skipped: List[str] = field(default_factory=list)
+    wall_time: float = 0.0
+
+    def succeeded(self, name: str) -> bool:
+        return name in self.results
+
+    def summary(self) -> Dict[str, Any]:
+        """JSON-friendly timing summary for API responses"""
+        return {
+            'stage_timings': {name: round(seconds, 3) for name, seconds in self.timings.items()},
+            'stage_errors': dict(self.errors),
+            'skipped_stages': list(self.skipped),
+            'pipeline_time': round(self.wall_time, 3),
+            'sequential_time': round(sum(self.timings.values()), 3),
+        }
+
+
+class StageGraph:
+    """
+    Dependency graph of pipeline stages.
+
+    Each stage function receives the results of the stages that already
+    finished (a dict keyed by stage name) and returns its own result. A stage
+    that raises is recorded as failed and every stage depending on it is
+    skipped; independent branches keep running.
+    """
+
+    def __init__(self, name: str, executor: Optional[ThreadPoolExecutor] = None):
+        self.name = name
+        self.executor = executor
+        self.stages: Dict[str, Stage] = {}
+
+    def add(self, name: str, func: Callable[[Dict[str, Any]], Any],
+            depends_on: Iterable[str] = ()) -> 'StageGraph':
+        depends_on = tuple(depends_on)
+        missing = [dep for dep in depends_on if dep not in self.stages]
+        if missing:
+            raise ValueError(f"Stage '{name}' depends on unknown stages: {missing}")
+        self.stages[name] = Stage(name, func, depends_on)
+        return self
+
+    def run(self, on_stage: Optional[Callable[[str, str, Any, float], None]] = None) -> StageGraphRun:
+        """
+        Execute the graph and wait for every runnable stage.
+
+        ``on_stage(name, status, result, seconds)`` is called from the
+        coordinating thread as each stage completes (status is 'success',
+        'failed' or 'skipped') so callers can stream partial results.
+        """
+        executor = self.executor or get_pipeline_executor()
+        run = StageGraphRun()
+        pending = dict(self.stages)
+        running = {}
+        start = time.perf_counter()
+
+        while pending or running:
+            for name, stage in list(pending.items()):
+                if any(dep in run.errors or dep in run.skipped for dep in stage.depends_on):
+                    del pending[name]
+                    run.skipped.append(name)
+                    self._notify(on_stage, name, 'skipped', None, 0.0)
+                elif all(dep in run.results for dep in stage.depends_on):
+                    del pending[name]
+                    running[executor.submit(self._timed, stage, dict(run.results))] = name
+
+            if not running:
+                break
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                result, error, seconds = future.result()
+                run.timings[name] = seconds
+                if error is None:
+                    run.results[name] = result
+                    self._record(name, 'success', seconds)
+                    self._notify(on_stage, name, 'success', result, seconds)
+                else:
+                    run.errors[name] = error
+                    self._record(name, 'failed', seconds)
+                    self._notify(on_stage, name, 'failed', error, seconds)
+
+        run.wall_time = time.perf_counter() - start
+        logger.info(
+            f"Pipeline {self.name} finished in {run.wall_time:.2f}s "
+            f"(stages sum {sum(run.timings.values()):.2f}s)"
+        )
+        return run
+
+    def _timed(self, stage: Stage, inputs: Dict[str, Any]):
+        started = time.perf_counter()
+        try:
+            result = stage.func(inputs)
+            return result, None, time.perf_counter() - started
+        except Exception as e:
+            logger.warning(f"Pipeline {self.name} stage {stage.name} failed: {str(e)}")
+            return None, str(e), time.perf_counter() - started
+
+    def _record(self, stage: str, status: str, seconds: float) -> None:
+        if PROMETHEUS_AVAILABLE:
+            stage_duration.labels(pipeline=self.name, stage=stage, status=status).observe(seconds)
+
+    def _notify(self, on_stage, name: str, status: str, result: Any, seconds: float) -> None:
+        if on_stage is None:
+            return
+        try:
+            on_stage(name, status, result, seconds)
+        except Exception as e:
+            logger.warning(f"Pipeline {self.name} stage callback failed: {str(e)}")
+
+
+def record_stage_time(pipeline: str, stage: str, seconds: float, status: str = 'success') -> None:
+    """Export the timing of a stage run outside a StageGraph (e.g. the final fusion step)"""
+    if PROMETHEUS_AVAILABLE:
+        stage_duration.labels(pipeline=pipeline, stage=stage, status=status).observe(seconds)
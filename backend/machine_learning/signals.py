@@ -0,0 +1,69 @@
+"""
+Signal handlers that keep the complaint image similarity index up to date
+"""
+
+import logging
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from complaints.models import Complaint
+from .tasks import index_complaint_image_task, remove_complaint_image_task
+
+logger = logging.getLogger(__name__)
+
+# Fields whose change requires re-embedding or re-sharding a complaint image
+INDEXED_FIELDS = ('image_file', 'media', 'incident_latitude', 'incident_longitude', 'location_lat', 'location_lon')
+
+
+def _index_enabled():
+    return getattr(settings, 'IMAGE_INDEX', {}).get('ENABLED', True)
+
+
+def _indexed_state(values):
+    return tuple(str(values[field] or '') for field in INDEXED_FIELDS)
+
+
+def _enqueue(task, complaint_id):
+    def send():
+        try:
+            task.delay(complaint_id)
+        except Exception as e:
+            # build_image_index repairs anything that was missed
+            logger.error(f"Error queueing image index update for complaint {complaint_id}: {e}")
+
+    transaction.on_commit(send)
+
+
+@receiver(pre_save, sender=Complaint)
+def remember_indexed_state(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Capture the stored image and location so post_save can tell if they changed"""
+    instance._image_index_previous = None
+    if raw or instance._state.adding or not _index_enabled():
+        return
+    if update_fields is not None and not set(INDEXED_FIELDS).intersection(update_fields):
+        instance._image_index_previous = _indexed_state(instance.__dict__)
+        return
+    stored = Complaint.objects.filter(pk=instance.pk).values(*INDEXED_FIELDS).first()
+    if stored:
+        instance._image_index_previous = _indexed_state(stored)
+
+
+@receiver(post_save, sender=Complaint)
+def update_image_index_on_save(sender, instance, created, raw=False, **kwargs):
+    """Queue (re)indexing for new complaints with images and for image/location changes"""
+    if raw or not _index_enabled():
+        return
+    current = _indexed_state(instance.__dict__)
+    if created:
+        if instance.image_file or instance.media:
+            _enqueue(index_complaint_image_task, instance.pk)
+    elif current != getattr(instance, '_image_index_previous', None):
+        _enqueue(index_complaint_image_task, instance.pk)
+
+
+@receiver(post_delete, sender=Complaint)
+def update_image_index_on_delete(sender, instance, **kwargs):
+    if _index_enabled() and (instance.image_file or instance.media):
+        _enqueue(remove_complaint_image_task, instance.pk)
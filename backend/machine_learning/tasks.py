@@ -0,0 +1,66 @@
+"""
+Celery tasks for the complaint image similarity index
+Queued by machine_learning.signals when a complaint's image or location changes;
+the media analysis cache cleanup runs nightly via CELERY_BEAT_SCHEDULE
+"""
+
+from celery import shared_task
+import logging
+
+from .image_index import complaint_image_source, get_image_index
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(name='index_complaint_image')
+def index_complaint_image_task(complaint_id):
+    """
+    Embed a complaint's image with DINOv2 and (re)index it, or drop it from
+    the index if it no longer has an image or a location
+
+    Args:
+        complaint_id: Complaint primary key
+    """
+    from PIL import Image
+    from complaints.models import Complaint
+    from .dinov2_processor import get_dinov2_processor
+
+    index = get_image_index()
+    complaint = Complaint.objects.filter(pk=complaint_id).first()
+    source = complaint_image_source(complaint) if complaint else None
+    coords = complaint.get_incident_coordinates() if complaint else None
+    if source is None or coords.latitude is None or coords.longitude is None:
+        index.remove([complaint_id])
+        return f'Complaint {complaint_id} not indexed (no image or location)'
+
+    try:
+        with source.open('rb') as f:
+            image = Image.open(f)
+            image.load()
+        embeddings = get_dinov2_processor().extract_embeddings([image], normalize=True)
+        if embeddings is None:
+            return f'Complaint {complaint_id} not indexed (DINOv2 unavailable)'
+        index.add([complaint_id], embeddings, [coords.latitude], [coords.longitude])
+        return f'Complaint {complaint_id} indexed'
+    except Exception as e:
+        logger.error(f'Indexing image of complaint {complaint_id} failed: {str(e)}')
+        raise
+
+
+@shared_task(name='remove_complaint_image')
+def remove_complaint_image_task(complaint_id):
+    """Drop a deleted complaint from the image index"""
+    removed = get_image_index().remove([complaint_id])
+    return f'Removed {removed} index rows for complaint {complaint_id}'
+
+
+@shared_task(name='cleanup_media_analysis_cache')
+def cleanup_media_analysis_cache_task():
+    """Delete expired media analysis pickles and evict the oldest above MAX_DISK_BYTES"""
+    from smartgriev.media_cache import get_media_cache
+
+    summary = get_media_cache().cleanup_disk()
+    logger.info(f"Media analysis cache cleanup: removed {summary['removed']} files "
+                f"({summary['removed_bytes']} bytes), kept {summary['kept']} "
+                f"({summary['kept_bytes']} bytes)")
+    return summary
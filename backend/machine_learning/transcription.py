@@ -0,0 +1,350 @@
+"""
+Chunked, VAD-Trimmed Transcription for SmartGriev Voice Complaints
+
+Voice complaints are often minutes long with long silences and background
+noise, and Whisper's single blocking ``transcribe`` call pays for all of it
+before returning any text. TranscriptionEngine instead:
+
+1. decodes the file once to 16 kHz mono,
+2. finds speech with a lightweight energy-based voice activity detector and
+   drops the silence between utterances (the whole recording is kept when
+   the detector finds less than VAD_MIN_SPEECH_RATIO of it to be speech,
+   which happens with steady background noise or uninterrupted talking),
+3. packs the speech into chunks of at most TRANSCRIPTION['CHUNK_SECONDS']
+   (Whisper's 30 s window),
+4. picks the model size from the amount of speech (long recordings get a
+   faster model; a larger one for short clips only when SHORT_CLIP_MODEL is
+   set, since every size kept warm costs worker memory), and
+5. transcribes the chunks in order, yielding segments as each chunk
+   finishes. Segment timestamps refer to the original recording.
+
+With the ``faster-whisper`` backend (CTranslate2, int8 on CPU) chunks after
+the first are transcribed in parallel. openai-whisper installs key/value
+cache hooks on the shared model while decoding, so its chunks run one at a
+time.
+"""
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+from django.conf import settings
+
+from .model_registry import get_model_registry
+
+logger = logging.getLogger(__name__)
+
+try:
+    import whisper
+    WHISPER_AVAILABLE = True
+except ImportError:
+    whisper = None
+    WHISPER_AVAILABLE = False
+
+try:
+    from faster_whisper import WhisperModel, decode_audio
+    FASTER_WHISPER_AVAILABLE = True
+except ImportError:
+    WhisperModel = None
+    decode_audio = None
+    FASTER_WHISPER_AVAILABLE = False
+
+SAMPLE_RATE = 16000
+
+WHISPER = 'whisper'
+FASTER_WHISPER = 'faster-whisper'
+
+_DEFAULTS = {
+    'BACKEND': WHISPER,
+    'AUTO_MODEL_SIZE': True,
+    # (maximum seconds of speech, model size); the last entry applies to anything longer
+    'MODEL_SIZES': [(300, 'base'), (None, 'tiny')],
+    'SHORT_CLIP_MODEL': None,  # e.g. 'small' for clips up to SHORT_CLIP_SECONDS of speech
+    'SHORT_CLIP_SECONDS': 60,
+    'VAD': True,
+    'VAD_MIN_SPEECH_RATIO': 0.2,  # Below this share of the recording, VAD is ignored
+    'CHUNK_SECONDS': 30,
+    'MAX_WORKERS': 2,  # Parallel chunks (faster-whisper only)
+    'CPU_THREADS': 0,  # CTranslate2 threads per worker; 0 = library default
+}
+
+
+def transcription_options() -> Dict:
+    return {**_DEFAULTS, **getattr(settings, 'TRANSCRIPTION', {})}
+
+
+def _load_faster_whisper(model_size: str):
+    options = transcription_options()
+    return WhisperModel(
+        model_size, device='cpu', compute_type='int8',
+        cpu_threads=options['CPU_THREADS'], num_workers=options['MAX_WORKERS'],
+    )
+
+
+if WHISPER_AVAILABLE:
+    # Loaded on first use as 'whisper:<size>', e.g. 'whisper:base'
+    get_model_registry().register_family(WHISPER, whisper.load_model, size_mb=500)
+
+if FASTER_WHISPER_AVAILABLE:
+    # Loaded on first use as 'faster-whisper:<size>', e.g. 'faster-whisper:base'
+    get_model_registry().register_family(FASTER_WHISPER, _load_faster_whisper, size_mb=150)
+
+
+def load_audio(audio_path: str) -> np.ndarray:
+    """Decode any ffmpeg-readable file to 16 kHz mono float32"""
+    if WHISPER_AVAILABLE:
+        return whisper.load_audio(audio_path, sr=SAMPLE_RATE)
+    if FASTER_WHISPER_AVAILABLE:
+        return decode_audio(audio_path, sampling_rate=SAMPLE_RATE)
+    raise RuntimeError('No audio decoder available; install openai-whisper or faster-whisper')
+
+
+def detect_speech(audio: np.ndarray, sample_rate: int = SAMPLE_RATE, frame_ms: int = 30,
+                  min_speech_ms: int = 250, min_silence_ms: int = 500,
+                  pad_ms: int = 200) -> List[Tuple[int, int]]:
+    """
+    Speech regions as (start, end) sample offsets.
+
+    A frame is speech when its energy is 10 dB above the recording's noise
+    floor (10th percentile of frame energy) and above an absolute -50 dBFS.
+    Pauses shorter than min_silence_ms are kept inside a region, regions
+    shorter than min_speech_ms are dropped, and every region is padded by
+    pad_ms so word onsets are not clipped.
+    """
+    frame = int(sample_rate * frame_ms / 1000)
+    count = len(audio) // frame
+    if count == 0:
+        return [(0, len(audio))] if len(audio) else []
+
+    frames = audio[:count * frame].reshape(count, frame).astype(np.float32)
+    energy_db = 10 * np.log10(np.mean(frames ** 2, axis=1) + 1e-10)
+    threshold = max(np.percentile(energy_db, 10) + 10, -50)
+    speech = energy_db > threshold
+
+    # Runs of speech frames as [start, end) frame indices
+    changes = np.flatnonzero(np.diff(np.concatenate(([0], speech.astype(np.int8), [0]))))
+    runs = changes.reshape(-1, 2).tolist()
+
+    merged = []
+    min_gap = min_silence_ms // frame_ms
+    for start, end in runs:
+        if merged and start - merged[-1][1] < min_gap:
+            merged[-1][1] = end
+        else:
+            merged.append([start, end])
+
+    pad = int(sample_rate * pad_ms / 1000)
+    min_frames = max(1, min_speech_ms // frame_ms)
+    return [
+        (max(0, start * frame - pad), min(len(audio), end * frame + pad))
+        for start, end in merged if end - start >= min_frames
+    ]
+
+
+class Chunk:
+    """Speech regions packed into one model input, with the mapping back to the original timeline"""
+
+    def __init__(self):
+        self.regions: List[Tuple[int, int]] = []  # (start, end) samples in the original audio
+
+    @property
+    def samples(self) -> int:
+        return sum(end - start for start, end in self.regions)
+
+    def audio(self, audio: np.ndarray) -> np.ndarray:
+        return np.concatenate([audio[start:end] for start, end in self.regions])
+
+    def to_original(self, seconds: float) -> float:
+        """Chunk-relative time to time in the original recording"""
+        offset = seconds * SAMPLE_RATE
+        for start, end in self.regions:
+            if offset <= end - start:
+                return (start + offset) / SAMPLE_RATE
+            offset -= end - start
+        return self.regions[-1][1] / SAMPLE_RATE
+
+
+def plan_chunks(regions: List[Tuple[int, int]], max_seconds: float) -> List[Chunk]:
+    """
+    Pack consecutive speech regions into chunks of at most max_seconds.
+
+    A region that does not fit the current chunk starts a new one, so
+    utterances are only cut when a single region is longer than a chunk.
+    """
+    max_samples = int(max_seconds * SAMPLE_RATE)
+    chunks = [Chunk()]
+    for start, end in regions:
+        if chunks[-1].samples + min(end - start, max_samples) > max_samples:
+            chunks.append(Chunk())
+        while start < end:
+            take = min(end - start, max_samples - chunks[-1].samples)
+            chunks[-1].regions.append((start, start + take))
+            start += take
+            if start < end:
+                chunks.append(Chunk())
+    return [chunk for chunk in chunks if chunk.regions]
+
+
+class TranscriptionEngine:
+    """VAD-trimmed, chunked Whisper transcription (see module docstring)"""
+
+    def __init__(self, backend: Optional[str] = None, model_size: Optional[str] = None,
+                 options: Optional[Dict] = None):
+        """
+        Args:
+            backend: 'whisper' or 'faster-whisper' (default: TRANSCRIPTION['BACKEND'])
+            model_size: Fixed model size; None picks it from the speech duration
+                        when TRANSCRIPTION['AUTO_MODEL_SIZE'] is set
+            options: Overrides for settings.TRANSCRIPTION
+        """
+        self.options = {**transcription_options(), **(options or {})}
+        self.backend = backend or self.options['BACKEND']
+        if self.backend == FASTER_WHISPER and not FASTER_WHISPER_AVAILABLE:
+            logger.warning("faster-whisper is not installed; using openai-whisper")
+            self.backend = WHISPER
+        self.model_size = model_size
+        self.registry = get_model_registry()
+
+    @property
+    def available(self) -> bool:
+        return FASTER_WHISPER_AVAILABLE if self.backend == FASTER_WHISPER else WHISPER_AVAILABLE
+
+    @property
+    def cache_version(self) -> str:
+        """Everything that changes the transcript, for the media analysis cache"""
+        if self.model_size:
+            size = self.model_size
+        elif self.options['AUTO_MODEL_SIZE']:
+            size = 'auto' + (f"+{self.options['SHORT_CLIP_MODEL']}" if self.options['SHORT_CLIP_MODEL'] else '')
+        else:
+            size = 'base'
+        vad = f"{self.options['VAD_MIN_SPEECH_RATIO']}" if self.options['VAD'] else 'off'
+        return f"{self.backend}:{size}:vad={vad}:chunk={self.options['CHUNK_SECONDS']}"
+
+    def select_model_size(self, speech_seconds: float) -> str:
+        if self.model_size:
+            return self.model_size
+        if not self.options['AUTO_MODEL_SIZE']:
+            return 'base'
+        if self.options['SHORT_CLIP_MODEL'] and speech_seconds <= self.options['SHORT_CLIP_SECONDS']:
+            return self.options['SHORT_CLIP_MODEL']
+        for max_seconds, size in self.options['MODEL_SIZES']:
+            if max_seconds is None or speech_seconds <= max_seconds:
+                return size
+        return self.options['MODEL_SIZES'][-1][1]
+
+    def transcribe(self, audio_path: str,
+                   on_segment: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+        """Transcribe a whole file; on_segment is called with each segment as soon as it is ready"""
+        start_time = time.perf_counter()
+        segments = []
+        info = {}
+        first_text_seconds = None
+        for event in self.iter_transcribe(audio_path):
+            if event['type'] == 'info':
+                info = event
+                continue
+            if first_text_seconds is None:
+                first_text_seconds = time.perf_counter() - start_time
+            segments.append(event['segment'])
+            if on_segment is not None:
+                on_segment(event['segment'])
+
+        info.pop('type', None)
+        return {
+            'success': True,
+            'text': ' '.join(segment['text'] for segment in segments if segment['text']).strip(),
+            'segments': segments,
+            'method': self.backend,
+            'first_text_seconds': first_text_seconds,
+            'processing_time': time.perf_counter() - start_time,
+            **info,
+        }
+
+    def iter_transcribe(self, audio_path: str) -> Iterator[Dict[str, Any]]:
+        """
+        Yield an ``info`` event (duration, speech, model size, language),
+        then one ``segment`` event per transcribed segment in time order.
+        """
+        audio = load_audio(audio_path)
+        duration = len(audio) / SAMPLE_RATE
+        regions = detect_speech(audio) if self.options['VAD'] else [(0, len(audio))]
+        vad_fallback = False
+        if self.options['VAD'] and len(audio):
+            kept = sum(end - start for start, end in regions)
+            if kept < self.options['VAD_MIN_SPEECH_RATIO'] * len(audio):
+                # Noise floor too close to the speech level; transcribe everything rather than nothing
+                logger.debug(f"VAD kept {kept / SAMPLE_RATE:.1f}s of {duration:.1f}s; transcribing the whole file")
+                regions = [(0, len(audio))]
+                vad_fallback = True
+        chunks = plan_chunks(regions, self.options['CHUNK_SECONDS'])
+        speech_seconds = sum(chunk.samples for chunk in chunks) / SAMPLE_RATE
+        model_size = self.select_model_size(speech_seconds)
+
+        info = {
+            'type': 'info',
+            'duration': duration,
+            'speech_duration': speech_seconds,
+            'chunks': len(chunks),
+            'vad_fallback': vad_fallback,
+            'model_size': model_size,
+            'language': 'unknown',
+        }
+        if not chunks:
+            yield info
+            return
+
+        registry_name = f"{self.backend}:{model_size}"
+        with self.registry.use(registry_name) as model:
+            if model is None:
+                raise RuntimeError(f"Transcription model {registry_name} is not available")
+
+            # The first chunk fixes the language for the rest, which skips per-chunk detection
+            language, first_segments = self._transcribe_chunk(model, chunks[0], audio, None)
+            info['language'] = language or 'unknown'
+            yield info
+            for segment in first_segments:
+                yield {'type': 'segment', 'segment': segment}
+
+            rest = chunks[1:]
+            if self.backend == FASTER_WHISPER and self.options['MAX_WORKERS'] > 1 and len(rest) > 1:
+                with ThreadPoolExecutor(max_workers=self.options['MAX_WORKERS'],
+                                        thread_name_prefix='transcribe') as executor:
+                    futures = [
+                        executor.submit(self._transcribe_chunk, model, chunk, audio, language)
+                        for chunk in rest
+                    ]
+                    for future in futures:
+                        for segment in future.result()[1]:
+                            yield {'type': 'segment', 'segment': segment}
+            else:
+                for chunk in rest:
+                    for segment in self._transcribe_chunk(model, chunk, audio, language)[1]:
+                        yield {'type': 'segment', 'segment': segment}
+
+    def _transcribe_chunk(self, model, chunk: Chunk, audio: np.ndarray,
+                          language: Optional[str]) -> Tuple[Optional[str], List[Dict[str, Any]]]:
+        """(detected language, segments on the original timeline) for one chunk"""
+        chunk_audio = chunk.audio(audio)
+        if self.backend == FASTER_WHISPER:
+            raw_segments, info = model.transcribe(
+                chunk_audio, language=language, beam_size=1, condition_on_previous_text=False
+            )
+            raw = [(segment.start, segment.end, segment.text) for segment in raw_segments]
+            detected = info.language
+        else:
+            result = model.transcribe(
+                chunk_audio, language=language, fp16=False, condition_on_previous_text=False
+            )
+            raw = [(segment['start'], segment['end'], segment['text']) for segment in result.get('segments', [])]
+            detected = result.get('language')
+
+        return language or detected, [
+            {
+                'start': round(chunk.to_original(start), 2),
+                'end': round(chunk.to_original(end), 2),
+                'text': text.strip(),
+            }
+            for start, end, text in raw
+        ]
@@ -33,6 +33,9 @@ urlpatterns = [
     path('ocr/batch/', views.OCRBatchProcessView.as_view(), name='ocr-batch'),
     path('ocr/stats/', views.OCRPerformanceStatsView.as_view(), name='ocr-stats'),
     
+    # Model registry
+    path('models/registry/', views.ModelRegistryStatsView.as_view(), name='model-registry-stats'),
+    
     # Multimodal Analysis endpoints
     path('multimodal/video/', views.MultimodalVideoAnalysisView.as_view(), name='multimodal-video'),
     path('multimodal/audio/', views.AudioTranscriptionView.as_view(), name='multimodal-audio'),
@@ -47,6 +47,9 @@ class VideoProcessor:
     MAX_VIDEO_SIZE = 100 * 1024 * 1024  # 100 MB
     MAX_VIDEO_DURATION = 300  # 5 minutes in seconds
     
+    # Frames per second inspected for scene changes during key-frame extraction
+    SCENE_SAMPLES_PER_SECOND = 2
+    
     def __init__(self):
         self.temp_dir = tempfile.gettempdir()
         logger.info("VideoProcessor initialized")
@@ -188,16 +191,33 @@ class VideoProcessor:
                 'error': f'Audio extraction failed: {str(e)}'
             }
     
-    def extract_key_frames(self, video_path: str, num_frames: int = 5) -> Dict[str, Any]:
+    def extract_key_frames(
+        self,
+        video_path: str,
+        num_frames: int = 5,
+        scene_detection: bool = True,
+        save_frames: bool = False
+    ) -> Dict[str, Any]:
         """
         Extract key frames from video for visual analysis.
         
+        With scene detection the video is decoded once, front to back, and
+        only sampled frames are retrieved and compared: it is split into
+        ``num_frames`` equal segments and the sampled frame with the largest
+        colour-histogram change in each segment is kept (the segment's first
+        sample when nothing changes), so every part of the video is covered
+        by its most informative frame. Uniform spacing seeks to each frame
+        instead of decoding the whole video. Frames are returned in memory as
+        BGR arrays; nothing is written to disk unless ``save_frames`` is set.
+        
         Args:
             video_path: Path to the video file
             num_frames: Number of frames to extract
+            scene_detection: Pick frames by scene change instead of uniform spacing
+            save_frames: Also write the frames to JPEG files (legacy frame_paths)
             
         Returns:
-            Dict with frame paths and metadata
+            Dict with in-memory frames, their positions and metadata
         """
         try:
             if not CV2_AVAILABLE:
@@ -213,34 +233,45 @@ class VideoProcessor:
                     'error': 'Unable to open video file'
                 }
             
-            total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-            frame_interval = max(1, total_frames // num_frames)
+            try:
+                total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+                fps = cap.get(cv2.CAP_PROP_FPS) or 0
+                if scene_detection:
+                    selected, frames_read = self._select_scene_frames(cap, total_frames, fps, num_frames)
+                else:
+                    selected, frames_read = self._select_uniform_frames(cap, total_frames, num_frames)
+            finally:
+                cap.release()
             
-            frames = []
-            frame_paths = []
+            if not selected:
+                return {
+                    'success': False,
+                    'error': 'No frames could be decoded'
+                }
             
-            for i in range(num_frames):
-                frame_number = min(i * frame_interval, total_frames - 1)
-                cap.set(cv2.CAP_PROP_POS_FRAMES, frame_number)
-                
-                ret, frame = cap.read()
-                if ret:
-                    # Save frame to temp file
+            frames = [frame for _, _, frame in selected]
+            frame_indices = [index for index, _, _ in selected]
+            
+            frame_paths = []
+            if save_frames:
+                for i, frame in enumerate(frames):
                     frame_path = os.path.join(
                         self.temp_dir,
                         f"{Path(video_path).stem}_frame_{i}.jpg"
                     )
                     cv2.imwrite(frame_path, frame)
-                    
-                    frames.append(frame)
                     frame_paths.append(frame_path)
             
-            cap.release()
-            
             return {
                 'success': True,
+                'frames': frames,
+                'frame_indices': frame_indices,
+                'timestamps': [round(index / fps, 3) if fps > 0 else None for index in frame_indices],
+                'scene_scores': [round(score, 4) for _, score, _ in selected],
                 'frame_paths': frame_paths,
-                'num_frames': len(frame_paths)
+                'num_frames': len(frames),
+                'frames_decoded': frames_read,
+                'method': 'scene_change' if scene_detection else 'uniform'
             }
             
         except Exception as e:
@@ -250,6 +281,76 @@ class VideoProcessor:
                 'error': f'Frame extraction failed: {str(e)}'
             }
     
+    def _select_uniform_frames(self, cap, total_frames: int, num_frames: int):
+        """
+        Evenly spaced frames, each reached with a CAP_PROP_POS_FRAMES seek.
+
+        A seek decodes from the preceding keyframe only, which is far cheaper
+        than a sequential pass: grab() still decodes every frame it steps over.
+        When the frame count is unknown the first frames are read instead.
+        """
+        if total_frames <= 0:
+            selected = []
+            while len(selected) < num_frames:
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                selected.append((len(selected), 0.0, frame))
+            return selected, len(selected)
+        
+        frame_interval = max(1, total_frames // num_frames)
+        targets = sorted({min(i * frame_interval, total_frames - 1) for i in range(num_frames)})
+        
+        selected = []
+        for index in targets:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, index)
+            ret, frame = cap.read()
+            if ret:
+                selected.append((index, 0.0, frame))
+        return selected, len(targets)
+    
+    def _select_scene_frames(self, cap, total_frames: int, fps: float, num_frames: int):
+        """Best scene-change frame per segment (or overall when the frame count is unknown)"""
+        sample_step = max(1, int(round(fps / self.SCENE_SAMPLES_PER_SECOND))) if fps > 0 else 1
+        segment_length = total_frames / num_frames if total_frames > 0 else None
+        
+        best = {}  # segment -> (score, index, frame)
+        previous_hist = None
+        index = 0
+        while cap.grab():
+            if index % sample_step == 0:
+                ret, frame = cap.retrieve()
+                if ret:
+                    hist = self._frame_histogram(frame)
+                    score = 1.0 if previous_hist is None else float(
+                        cv2.compareHist(previous_hist, hist, cv2.HISTCMP_BHATTACHARYYA)
+                    )
+                    previous_hist = hist
+                    
+                    if segment_length:
+                        segment = min(int(index / segment_length), num_frames - 1)
+                    else:
+                        # Unknown length: keep the top-scoring samples overall
+                        segment = index
+                    current = best.get(segment)
+                    if current is None or score > current[0]:
+                        best[segment] = (score, index, frame)
+                    if not segment_length and len(best) > num_frames:
+                        del best[min(best, key=lambda key: best[key][0])]
+            index += 1
+        
+        selected = sorted(((idx, score, frame) for score, idx, frame in best.values()), key=lambda item: item[0])
+        return selected, index
+    
+    @staticmethod
+    def _frame_histogram(frame):
+        """Normalised hue/saturation histogram of a downscaled frame"""
+        small = cv2.resize(frame, (160, 90), interpolation=cv2.INTER_AREA)
+        hsv = cv2.cvtColor(small, cv2.COLOR_BGR2HSV)
+        hist = cv2.calcHist([hsv], [0, 1], None, [16, 16], [0, 180, 0, 256])
+        cv2.normalize(hist, hist)
+        return hist
+    
     def get_video_thumbnail(self, video_path: str, timestamp: float = 1.0) -> Optional[str]:
         """
         Extract a thumbnail from video at specific timestamp.
@@ -4,9 +4,14 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.parsers import MultiPartParser, FormParser
 from django.core.files.uploadedfile import InMemoryUploadedFile
+from django.http import StreamingHttpResponse
 import time
 import io
+import json
 import logging
+import os
+import queue
+import threading
 
 from .models import (
     MLExperiment, ExperimentResult, ModelPerformanceMetric,
@@ -19,6 +24,7 @@ from .serializers import (
     OCRRequestSerializer, OCRResponseSerializer,
     ComplaintImageOCRSerializer, ComplaintImageOCRResponseSerializer
 )
+from .model_registry import get_model_registry
 from .ocr_processor import (
     extract_text_from_image_bytes, 
     get_ocr_processor, 
@@ -510,6 +516,19 @@ class OCRPerformanceStatsView(APIView):
             )
 
 
+class ModelRegistryStatsView(APIView):
+    """
+    Loaded models, their resident memory and load/inference statistics for this process.
+    """
+    permission_classes = [IsAuthenticated]
+    
+    def get(self, request):
+        return Response({
+            'model_registry': get_model_registry().stats(),
+            'timestamp': time.strftime('%Y-%m-%d %H:%M:%S')
+        }, status=status.HTTP_200_OK)
+
+
 class OCRBatchProcessView(APIView):
     """
     Process multiple images in batch for better performance.
@@ -565,7 +584,7 @@ class OCRBatchProcessView(APIView):
             # Process valid images in batch
             valid_images = [img for img in images if img is not None]
             if valid_images:
-                batch_results = ocr_processor.batch_extract_text(valid_images)
+                batch_results = ocr_processor.batch_extract_text(valid_images, batch_size=len(valid_images))
                 
                 # Merge results
                 valid_index = 0
@@ -585,6 +604,7 @@ class OCRBatchProcessView(APIView):
                         })
                         valid_index += 1
             
+            results.sort(key=lambda r: r['image_index'])
             total_time = time.time() - start_time
             
             response_data = {
@@ -607,6 +627,47 @@ class OCRBatchProcessView(APIView):
             )
 
 
+def _stream_video_analysis(analyzer, video_path):
+    """
+    Run the video pipeline in a worker thread and yield one SSE event per
+    finished stage, then the complete result.
+    """
+    events = queue.Queue()
+    
+    def on_stage(name, stage_status, result, seconds):
+        if isinstance(result, dict) and 'frames' in result:
+            # Decoded frames stay in memory; only their metadata is streamed
+            result = {key: value for key, value in result.items() if key != 'frames'}
+        events.put({
+            'type': 'stage',
+            'stage': name,
+            'status': stage_status,
+            'seconds': round(seconds, 3),
+            'result': result
+        })
+    
+    def worker():
+        try:
+            result = analyzer.analyze_video_complaint(video_path, on_stage=on_stage)
+            events.put({'type': 'result', **result})
+        except Exception as e:
+            events.put({'type': 'result', 'success': False, 'error': str(e)})
+        finally:
+            try:
+                os.remove(video_path)
+            except OSError:
+                pass
+            events.put(None)
+    
+    threading.Thread(target=worker, name='video-analysis', daemon=True).start()
+    
+    while True:
+        event = events.get()
+        if event is None:
+            break
+        yield f"data: {json.dumps(event, default=str)}\n\n"
+
+
 class MultimodalVideoAnalysisView(APIView):
     """
     API endpoint for multimodal video complaint analysis.
@@ -622,9 +683,10 @@ class MultimodalVideoAnalysisView(APIView):
         Expected input:
         - video: Video file upload
         - groq_api_key: Optional Groq API key for AI response generation
+        - ?stream=1: Stream per-stage results as Server-Sent Events
         
         Returns:
-        - Complete multimodal analysis with AI-generated response
+        - Complete multimodal analysis with AI-generated response and stage timings
         """
         try:
             # Get video file
@@ -654,6 +716,14 @@ class MultimodalVideoAnalysisView(APIView):
             from .multimodal_analyzer import get_multimodal_analyzer
             
             analyzer = get_multimodal_analyzer(groq_api_key)
+            
+            # Optionally stream stage results as Server-Sent Events
+            if str(request.query_params.get('stream', '')).lower() in ('1', 'true', 'yes'):
+                return StreamingHttpResponse(
+                    _stream_video_analysis(analyzer, temp_video_path),
+                    content_type='text/event-stream'
+                )
+            
             result = analyzer.analyze_video_complaint(temp_video_path)
             
             # Clean up temp file
@@ -678,6 +748,38 @@ class MultimodalVideoAnalysisView(APIView):
             )
 
 
+def _stream_audio_analysis(analyzer, audio_path):
+    """
+    Run the audio analysis in a worker thread and yield one SSE event per
+    transcribed segment, then the complete result.
+    """
+    events = queue.Queue()
+    
+    def on_segment(segment):
+        events.put({'type': 'segment', **segment})
+    
+    def worker():
+        try:
+            result = analyzer.analyze_audio(audio_path, on_segment=on_segment)
+            events.put({'type': 'result', **result})
+        except Exception as e:
+            events.put({'type': 'result', 'success': False, 'error': str(e)})
+        finally:
+            try:
+                os.remove(audio_path)
+            except OSError:
+                pass
+            events.put(None)
+    
+    threading.Thread(target=worker, name='audio-analysis', daemon=True).start()
+    
+    while True:
+        event = events.get()
+        if event is None:
+            break
+        yield f"data: {json.dumps(event, default=str)}\n\n"
+
+
 class AudioTranscriptionView(APIView):
     """
     API endpoint for audio transcription and analysis.
@@ -691,6 +793,8 @@ class AudioTranscriptionView(APIView):
         
         Expected input:
         - audio: Audio file upload
+        - ?stream=1 to receive transcript segments as Server-Sent Events while
+          the rest of the recording is still being transcribed
         
         Returns:
         - Transcription, emotion, and urgency analysis
@@ -719,6 +823,13 @@ class AudioTranscriptionView(APIView):
             from .audio_analyzer import get_audio_analyzer
             
             analyzer = get_audio_analyzer()
+            
+            if str(request.query_params.get('stream', '')).lower() in ('1', 'true', 'yes'):
+                return StreamingHttpResponse(
+                    _stream_audio_analysis(analyzer, temp_audio_path),
+                    content_type='text/event-stream'
+                )
+            
             result = analyzer.analyze_audio(temp_audio_path)
             
             # Clean up temp file
@@ -9,12 +9,15 @@ This module handles visual content analysis including:
 
 import os
 import logging
-from typing import Dict, List, Optional, Any, Tuple
+from typing import Dict, List, Optional, Any, Tuple, Union
 from PIL import Image
 import numpy as np
 
 logger = logging.getLogger(__name__)
 
+# An image path, a decoded BGR frame (as returned by OpenCV) or a PIL image
+ImageSource = Union[str, np.ndarray, Image.Image]
+
 # Try to import required libraries
 try:
     import torch
@@ -72,33 +75,50 @@ class VisualAnalyzer:
         self.fallback_mode = False
         logger.info("VisualAnalyzer initialized")
     
-    def detect_objects(self, image_path: str) -> Dict[str, Any]:
+    @staticmethod
+    def _load_image(image: ImageSource) -> Tuple[np.ndarray, Image.Image]:
+        """
+        Decode an image source once into a BGR array (for OpenCV) and an RGB
+        PIL image (for Torch/OCR). In-memory frames are used as-is.
+        """
+        if isinstance(image, np.ndarray):
+            bgr = image
+            rgb = Image.fromarray(np.ascontiguousarray(image[:, :, ::-1]))
+        else:
+            rgb = image if isinstance(image, Image.Image) else Image.open(image)
+            rgb = rgb.convert('RGB') if rgb.mode != 'RGB' else rgb
+            bgr = np.ascontiguousarray(np.asarray(rgb)[:, :, ::-1])
+        return bgr, rgb
+    
+    @staticmethod
+    def _missing_file(image: ImageSource) -> bool:
+        return isinstance(image, str) and not os.path.exists(image)
+    
+    def detect_objects(self, image: ImageSource) -> Dict[str, Any]:
         """
         Detect objects in image relevant to complaints.
         
         Args:
-            image_path: Path to image file
+            image: Path to image file, BGR frame array or PIL image
             
         Returns:
             Dict with detected objects and their locations
         """
         try:
-            if not os.path.exists(image_path):
+            if self._missing_file(image):
                 return {
                     'success': False,
                     'error': 'Image file not found'
                 }
             
             # Load image
-            image = Image.open(image_path)
+            img_cv, image = self._load_image(image)
             
             # Use rule-based detection with OpenCV if available
             detected_objects = []
             
             if CV2_AVAILABLE:
                 # Simple color-based and edge detection
-                img_cv = cv2.imread(image_path)
-                
                 # Detect dark patches (potential potholes)
                 gray = cv2.cvtColor(img_cv, cv2.COLOR_BGR2GRAY)
                 _, thresh = cv2.threshold(gray, 50, 255, cv2.THRESH_BINARY_INV)
@@ -214,18 +234,18 @@ class VisualAnalyzer:
         
         return {k: list(set(v)) for k, v in categorized.items() if v}
     
-    def classify_scene(self, image_path: str) -> Dict[str, Any]:
+    def classify_scene(self, image: ImageSource) -> Dict[str, Any]:
         """
         Classify the scene context of the image.
         
         Args:
-            image_path: Path to image file
+            image: Path to image file, BGR frame array or PIL image
             
         Returns:
             Dict with scene classification results
         """
         try:
-            if not os.path.exists(image_path):
+            if self._missing_file(image):
                 return {
                     'success': False,
                     'error': 'Image file not found'
@@ -233,7 +253,7 @@ class VisualAnalyzer:
             
             # Rule-based scene classification using color and texture analysis
             if CV2_AVAILABLE:
-                img = cv2.imread(image_path)
+                img, _ = self._load_image(image)
                 
                 # Analyze color distribution
                 hsv = cv2.cvtColor(img, cv2.COLOR_BGR2HSV)
@@ -283,12 +303,12 @@ class VisualAnalyzer:
                 'error': f'Scene classification failed: {str(e)}'
             }
     
-    def extract_text(self, image_path: str) -> Dict[str, Any]:
+    def extract_text(self, image: ImageSource) -> Dict[str, Any]:
         """
         Extract text from image using OCR.
         
         Args:
-            image_path: Path to image file
+            image: Path to image file, BGR frame array or PIL image
             
         Returns:
             Dict with extracted text
@@ -296,8 +316,9 @@ class VisualAnalyzer:
         try:
             if OCR_AVAILABLE:
                 ocr_processor = get_ocr_processor()
+                _, pil_image = self._load_image(image)
                 result = ocr_processor.extract_text_advanced(
-                    Image.open(image_path),
+                    pil_image,
                     preprocess=True
                 )
                 
@@ -322,25 +343,29 @@ class VisualAnalyzer:
                 'error': f'Text extraction failed: {str(e)}'
             }
     
-    def analyze_image(self, image_path: str) -> Dict[str, Any]:
+    def analyze_image(self, image: ImageSource) -> Dict[str, Any]:
         """
         Comprehensive visual analysis of an image.
         
         Args:
-            image_path: Path to image file
+            image: Path to image file, BGR frame array or PIL image
             
         Returns:
             Complete visual analysis results
         """
         try:
+            # Decode files once and share the pixels across the three analyses
+            if isinstance(image, str) and not self._missing_file(image):
+                image, _ = self._load_image(image)
+            
             # Detect objects
-            object_results = self.detect_objects(image_path)
+            object_results = self.detect_objects(image)
             
             # Classify scene
-            scene_results = self.classify_scene(image_path)
+            scene_results = self.classify_scene(image)
             
             # Extract text
-            text_results = self.extract_text(image_path)
+            text_results = self.extract_text(image)
             
             return {
                 'success': True,
@@ -356,12 +381,12 @@ class VisualAnalyzer:
                 'error': f'Image analysis failed: {str(e)}'
             }
     
-    def analyze_frames(self, frame_paths: List[str]) -> Dict[str, Any]:
+    def analyze_frames(self, frames: List[ImageSource]) -> Dict[str, Any]:
         """
         Analyze multiple frames and aggregate results.
         
         Args:
-            frame_paths: List of paths to frame images
+            frames: In-memory BGR frames (from extract_key_frames) or paths to frame images
             
         Returns:
             Aggregated visual analysis results
@@ -371,8 +396,8 @@ class VisualAnalyzer:
             all_scenes = []
             all_texts = []
             
-            for frame_path in frame_paths:
-                result = self.analyze_image(frame_path)
+            for frame in frames:
+                result = self.analyze_image(frame)
                 
                 if result.get('success'):
                     if result['objects'].get('success'):
@@ -396,7 +421,7 @@ class VisualAnalyzer:
                 'aggregated_objects': unique_objects,
                 'dominant_scene': most_common_scene,
                 'combined_text': combined_text,
-                'frames_analyzed': len(frame_paths)
+                'frames_analyzed': len(frames)
             }
             
         except Exception as e:
@@ -0,0 +1,218 @@
+"""
+Two-Tier Caching for SmartGriev
+Bounded in-process LRU in front of the shared Django cache (django-redis)
+"""
+import copy
+import hashlib
+import logging
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Callable, Optional
+
+from django.core.cache import caches
+
+logger = logging.getLogger(__name__)
+
+try:
+    from prometheus_client import Counter, Gauge
+    PROMETHEUS_AVAILABLE = True
+except ImportError:
+    PROMETHEUS_AVAILABLE = False
+
+if PROMETHEUS_AVAILABLE:
+    cache_requests = Counter(
+        'smartgriev_cache_requests_total',
+        'Cache lookups by cache name, tier and result',
+        ['cache', 'tier', 'result']
+    )
+    cache_evictions = Counter(
+        'smartgriev_cache_evictions_total',
+        'Entries evicted from the in-process LRU tier',
+        ['cache']
+    )
+    cache_local_entries = Gauge(
+        'smartgriev_cache_local_entries',
+        'Entries currently held in the in-process LRU tier',
+        ['cache']
+    )
+
+_MISSING = object()
+
+
+def normalize_text(text: str) -> str:
+    """Unicode-normalize, case-fold and collapse whitespace for cache keys"""
+    return ' '.join(unicodedata.normalize('NFKC', text or '').casefold().split())
+
+
+def hash_key(*parts: Any) -> str:
+    """Stable SHA-256 digest of the given key parts"""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(str(part).encode('utf-8'))
+        digest.update(b'\x1f')
+    return digest.hexdigest()
+
+
+class LRUCache:
+    """
+    Thread-safe in-process LRU with a size cap and per-entry TTL.
+
+    Values are deep-copied on read and write so callers can never mutate a
+    cached entry.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: Optional[float] = None,
+                 on_evict: Optional[Callable[[], None]] = None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._on_evict = on_evict
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                return default
+            expires_at, value = entry
+            if expires_at is not None and expires_at < time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+        return copy.deepcopy(value)
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl else None
+        value = copy.deepcopy(value)
+        evicted = 0
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                evicted += 1
+        if evicted and self._on_evict:
+            for _ in range(evicted):
+                self._on_evict()
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+
+
+class TwoTierCache:
+    """
+    In-process LRU backed by a shared Django cache.
+
+    Reads check the local LRU first, then the shared cache (promoting hits
+    into the LRU). Shared-cache errors are logged and treated as misses so a
+    Redis outage degrades to local-only caching instead of failing requests.
+    """
+
+    def __init__(self, name: str, max_entries: int = 1024, ttl: int = 3600,
+                 local_ttl: Optional[int] = None, cache_alias: str = 'default'):
+        self.name = name
+        self.ttl = ttl
+        self.cache_alias = cache_alias
+        self.local = LRUCache(
+            max_entries=max_entries,
+            ttl=local_ttl if local_ttl is not None else ttl,
+            on_evict=self._record_eviction
+        )
+        self.stats = {'local_hits': 0, 'shared_hits': 0, 'misses': 0, 'evictions': 0}
+
+    @property
+    def shared(self):
+        return caches[self.cache_alias]
+
+    def make_key(self, *parts: Any) -> str:
+        return f'{self.name}:{hash_key(*parts)}'
+
+    def get(self, key: str, default: Any = None) -> Any:
+        value = self.local.get(key, _MISSING)
+        if value is not _MISSING:
+            self._record('local', 'hit')
+            return value
+        self._record('local', 'miss')
+
+        try:
+            value = self.shared.get(key, _MISSING)
+        except Exception as e:
+            logger.warning(f"Shared cache read failed for {self.name}: {e}")
+            value = _MISSING
+
+        if value is _MISSING:
+            self._record('shared', 'miss')
+            return default
+
+        self._record('shared', 'hit')
+        self.local.set(key, value)
+        self._update_size()
+        return value
+
+    def set(self, key: str, value: Any, ttl: Optional[int] = None) -> None:
+        ttl = self.ttl if ttl is None else ttl
+        self.local.set(key, value)
+        self._update_size()
+        try:
+            self.shared.set(key, value, ttl)
+        except Exception as e:
+            logger.warning(f"Shared cache write failed for {self.name}: {e}")
+
+    def delete(self, key: str) -> None:
+        self.local.delete(key)
+        try:
+            self.shared.delete(key)
+        except Exception as e:
+            logger.warning(f"Shared cache delete failed for {self.name}: {e}")
+
+    def clear(self) -> None:
+        """Clear the local tier and, when the backend supports it, this cache's shared keys"""
+        self.local.clear()
+        self._update_size()
+        delete_pattern = getattr(self.shared, 'delete_pattern', None)
+        if delete_pattern:
+            try:
+                delete_pattern(f'{self.name}:*')
+            except Exception as e:
+                logger.warning(f"Shared cache clear failed for {self.name}: {e}")
+
+    def get_stats(self) -> dict:
+        stats = dict(self.stats)
+        lookups = stats['local_hits'] + stats['shared_hits'] + stats['misses']
+        stats['local_entries'] = len(self.local)
+        stats['max_local_entries'] = self.local.max_entries
+        stats['hit_rate'] = (
+            (stats['local_hits'] + stats['shared_hits']) / lookups * 100 if lookups else 0
+        )
+        return stats
+
+    def _record(self, tier: str, result: str) -> None:
+        if result == 'hit':
+            self.stats[f'{tier}_hits'] += 1
+        elif tier == 'shared':
+            self.stats['misses'] += 1
+        if PROMETHEUS_AVAILABLE:
+            cache_requests.labels(cache=self.name, tier=tier, result=result).inc()
+
+    def _record_eviction(self) -> None:
+        self.stats['evictions'] += 1
+        if PROMETHEUS_AVAILABLE:
+            cache_evictions.labels(cache=self.name).inc()
+
+    def _update_size(self) -> None:
+        if PROMETHEUS_AVAILABLE:
+            cache_local_entries.labels(cache=self.name).set(len(self.local))
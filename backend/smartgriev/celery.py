@@ -1,6 +1,7 @@
 import os
 import logging
 from celery import Celery
+from celery.signals import worker_process_init
 
 logger = logging.getLogger(__name__)
 
@@ -16,6 +17,21 @@ app.config_from_object('django.conf:settings', namespace='CELERY')
 # Load task modules from all registered Django app configs.
 app.autodiscover_tasks()
 
+
+@worker_process_init.connect
+def warm_models(**kwargs):
+    """Load MODEL_REGISTRY['WARM_MODELS'] in each worker process before it takes tasks"""
+    from django.conf import settings
+
+    if not getattr(settings, 'MODEL_REGISTRY', {}).get('WARM_MODELS'):
+        return
+    try:
+        from machine_learning.model_registry import get_model_registry
+        get_model_registry().warm()
+    except Exception as e:
+        logger.warning(f'Model warm-up failed: {e}')
+
+
 @app.task(bind=True, ignore_result=True)
 def debug_task(self):
     logger.debug(f'Request: {self.request!r}')
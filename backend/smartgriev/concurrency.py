@@ -0,0 +1,54 @@
+"""
+Async Helpers for SmartGriev
+Runs blocking SDK, speech and file calls off the event loop on a bounded pool
+"""
+import asyncio
+import contextvars
+import functools
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_blocking_executor() -> ThreadPoolExecutor:
+    """
+    Process-wide pool for blocking calls awaited from async code.
+
+    Sized by AI_IO_MAX_WORKERS so a burst of slow LLM calls queues here
+    instead of exhausting the default executor shared with Django's
+    sync_to_async.
+    """
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=getattr(settings, 'AI_IO_MAX_WORKERS', 16),
+                    thread_name_prefix='ai-io'
+                )
+    return _executor
+
+
+async def run_blocking(func: Callable, *args, timeout: Optional[float] = None, **kwargs) -> Any:
+    """
+    Await ``func(*args, **kwargs)`` running on the bounded executor.
+
+    Context variables are propagated like asyncio.to_thread. With ``timeout``
+    the awaiting coroutine gives up with asyncio.TimeoutError; the worker
+    thread finishes the call in the background.
+    """
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    call = functools.partial(context.run, func, *args, **kwargs)
+    future = loop.run_in_executor(get_blocking_executor(), call)
+    if timeout:
+        return await asyncio.wait_for(future, timeout)
+    return await future
@@ -0,0 +1,279 @@
+"""
+Compiled Keyword Matching for SmartGriev
+One-pass multi-pattern matcher shared by the rule-based classifiers
+"""
+import re
+import threading
+import unicodedata
+from collections import defaultdict
+from typing import Dict, Iterable, List, Mapping, NamedTuple, Optional, Tuple, Union
+
+try:
+    import ahocorasick
+    AHOCORASICK_AVAILABLE = True
+except ImportError:
+    AHOCORASICK_AVAILABLE = False
+
+# Scripts whose combining marks must not be split by a keyword boundary:
+# combining diacritics, Arabic (Urdu) and Devanagari through Malayalam, which
+# covers all 13 supported Indic languages.
+_MARK_RANGES = ((0x0300, 0x036F), (0x0610, 0x06FF), (0x0900, 0x0D7F))
+
+_JOINERS = '\u200c\u200d'
+
+
+def _build_mark_classes():
+    marks, viramas = [], []
+    for start, end in _MARK_RANGES:
+        for code in range(start, end + 1):
+            char = chr(code)
+            if unicodedata.category(char) in ('Mn', 'Mc', 'Me'):
+                marks.append(char)
+                if 'VIRAMA' in unicodedata.name(char, ''):
+                    viramas.append(char)
+    return frozenset(marks + list(_JOINERS)), frozenset(viramas + list(_JOINERS))
+
+
+_MARKS, _VIRAMAS = _build_mark_classes()
+
+
+def _char_class(chars) -> str:
+    return ''.join(re.escape(char) for char in sorted(chars))
+
+
+def normalize_keyword_text(text: str) -> str:
+    """NFC-normalize and case-fold text so keywords and input compare equal"""
+    if not text:
+        return ''
+    if text.isascii():
+        return text.lower()
+    return unicodedata.normalize('NFC', text).casefold()
+
+
+class KeywordMatch(NamedTuple):
+    label: str
+    keyword: str
+    weight: float
+
+
+KeywordSpec = Union[Iterable[str], Iterable[Tuple[str, float]], Mapping[str, float]]
+
+
+def _trie_pattern(words: Iterable[str]) -> str:
+    """Regex source for a prefix trie of ``words``; prefers the longest match"""
+    trie: dict = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = None
+
+    def build(node):
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        return f'(?:{body})?' if '' in node else body
+
+    return build(trie)
+
+
+class KeywordMatcher:
+    """
+    Multi-pattern keyword matcher compiled once into a single regex.
+
+    ``groups`` maps a label (department, emotion, priority...) to its
+    keywords, given as a list (weight 1 each), a list of (keyword, weight)
+    pairs or a {keyword: weight} mapping. A keyword listed several times for
+    the same label adds up its weights, and the same keyword may belong to
+    several labels.
+
+    Matching keeps the substring semantics of ``keyword in text.lower()``
+    (every keyword present anywhere in the text is reported once) but scans
+    the text a single time. With pyahocorasick installed the keywords are
+    compiled into an Aho-Corasick automaton; otherwise a trie-shaped regex
+    finds the longest keyword starting at each match position and every
+    shorter keyword contained in it comes from a precomputed table. Text and
+    keywords are NFC-normalized and case-folded, and a match never ends
+    before a combining mark or starts after a virama, so a keyword cannot
+    match half of an Indic syllable or conjunct.
+    """
+
+    def __init__(self, groups: Mapping[str, KeywordSpec]):
+        self.labels: Tuple[str, ...] = tuple(groups)
+        self._entries: Dict[str, List[Tuple[str, float]]] = defaultdict(list)
+        self._order: Dict[str, Dict[str, int]] = {}
+        self.backend = 'none'
+
+        for label, spec in groups.items():
+            weights: Dict[str, float] = {}
+            for keyword, weight in self._iter_spec(spec):
+                keyword = normalize_keyword_text(keyword).strip()
+                if keyword:
+                    weights[keyword] = weights.get(keyword, 0) + weight
+            self._order[label] = {keyword: index for index, keyword in enumerate(weights)}
+            for keyword, weight in weights.items():
+                self._entries[keyword].append((label, weight))
+
+        self.keywords = frozenset(self._entries)
+        self._label_rank = {label: index for index, label in enumerate(self.labels)}
+        self._automaton = None
+        self._pattern = None
+        if not self.keywords:
+            return
+
+        if AHOCORASICK_AVAILABLE:
+            self._automaton = ahocorasick.Automaton()
+            for keyword in self.keywords:
+                self._automaton.add_word(keyword, keyword)
+            self._automaton.make_automaton()
+            self.backend = 'aho-corasick'
+        else:
+            self._pattern = re.compile(
+                f'{_trie_pattern(self.keywords)}(?![{_char_class(_MARKS)}])'
+            )
+            self._contained: Dict[str, frozenset] = {}
+            for keyword in sorted(self.keywords, key=len):
+                self._contained[keyword] = self._contained_keywords(keyword)
+            self.backend = 'regex'
+
+    @staticmethod
+    def _iter_spec(spec: KeywordSpec):
+        items = spec.items() if isinstance(spec, Mapping) else spec
+        for item in items:
+            if isinstance(item, str):
+                yield item, 1
+            else:
+                yield item[0], item[1]
+
+    def _contained_keywords(self, keyword: str) -> frozenset:
+        """Shorter keywords occurring inside ``keyword`` (shorter ones must be computed first)"""
+        found = set(self._scan(keyword))
+        found.discard(keyword)
+        # The scan only reports the longest match at offset 0, i.e. the
+        # keyword itself, so add its keyword prefixes explicitly
+        for end in range(1, len(keyword)):
+            prefix = keyword[:end]
+            if prefix in self.keywords and keyword[end] not in _MARKS:
+                found.add(prefix)
+                found.update(self._contained[prefix])
+        return frozenset(found)
+
+    def _scan_automaton(self, text: str) -> frozenset:
+        """Every keyword occurring in already-normalized ``text`` (Aho-Corasick)"""
+        found = set()
+        last = len(text) - 1
+        for end, keyword in self._automaton.iter(text):
+            if keyword in found:
+                continue
+            start = end - len(keyword) + 1
+            if end < last and text[end + 1] in _MARKS:
+                continue
+            if start and text[start - 1] in _VIRAMAS:
+                continue
+            found.add(keyword)
+        return frozenset(found)
+
+    def _scan(self, text: str) -> frozenset:
+        """Every keyword occurring in already-normalized ``text`` (regex)"""
+        found = set()
+        search = self._pattern.search
+        match = search(text)
+        while match:
+            start = match.start()
+            # A keyword starting right after a virama would split a conjunct
+            if not (start and text[start - 1] in _VIRAMAS):
+                keyword = match.group()
+                if keyword not in found:
+                    found.add(keyword)
+                    # Shorter keywords inside this one are known without rescanning
+                    contained = self._contained.get(keyword)
+                    if contained:
+                        found.update(contained)
+            # Resume one character later so overlapping keywords are not skipped
+            match = search(text, start + 1)
+        return frozenset(found)
+
+    def present(self, text: str) -> frozenset:
+        """Normalized keywords that occur in ``text``"""
+        if not self.keywords or not text:
+            return frozenset()
+        text = normalize_keyword_text(text)
+        if self._automaton is not None:
+            return self._scan_automaton(text)
+        return self._scan(text)
+
+    def find(self, text: str) -> List[KeywordMatch]:
+        """All matched (label, keyword, weight) triples, in definition order"""
+        found = self.present(text)
+        matches = [
+            KeywordMatch(label, keyword, weight)
+            for keyword in found
+            for label, weight in self._entries[keyword]
+        ]
+        matches.sort(key=lambda m: (self._label_rank[m.label], self._order[m.label][m.keyword]))
+        return matches
+
+    def matches_by_label(self, text: str) -> Dict[str, List[str]]:
+        """{label: [matched keywords]} for labels with at least one match"""
+        grouped: Dict[str, List[str]] = {}
+        for match in self.find(text):
+            grouped.setdefault(match.label, []).append(match.keyword)
+        return grouped
+
+    def scores(self, text: str, include_zero: bool = False) -> Dict[str, float]:
+        """Summed keyword weights per label, in label definition order"""
+        totals = dict.fromkeys(self.labels, 0) if include_zero else {}
+        for match in self.find(text):
+            totals[match.label] = totals.get(match.label, 0) + match.weight
+        if not include_zero:
+            totals = {label: totals[label] for label in self.labels if label in totals}
+        return totals
+
+    def best(self, text: str) -> Tuple[Optional[str], float]:
+        """Highest-scoring label (first in definition order on ties) and its score"""
+        totals = self.scores(text)
+        if not totals:
+            return None, 0
+        label = max(totals, key=totals.get)
+        return label, totals[label]
+
+    def first_label(self, text: str) -> Optional[str]:
+        """First label in definition order with any matching keyword"""
+        found = self.present(text)
+        if not found:
+            return None
+        labels = {label for keyword in found for label, _ in self._entries[keyword]}
+        return next(label for label in self.labels if label in labels)
+
+
+_matcher_cache: Dict[tuple, KeywordMatcher] = {}
+_matcher_lock = threading.Lock()
+
+
+def _freeze(groups: Mapping[str, KeywordSpec]) -> tuple:
+    frozen = []
+    for label, spec in groups.items():
+        items = spec.items() if isinstance(spec, Mapping) else spec
+        frozen.append((
+            label,
+            tuple(item if isinstance(item, str) else tuple(item) for item in items),
+        ))
+    return tuple(frozen)
+
+
+def get_matcher(groups: Mapping[str, KeywordSpec]) -> KeywordMatcher:
+    """
+    Compiled matcher for ``groups``, built once per process.
+
+    Classifiers that define their keyword tables per instance call this from
+    ``__init__`` so repeated instantiation does not recompile the regex.
+    """
+    key = _freeze(groups)
+    matcher = _matcher_cache.get(key)
+    if matcher is None:
+        with _matcher_lock:
+            matcher = _matcher_cache.get(key)
+            if matcher is None:
+                matcher = _matcher_cache[key] = KeywordMatcher(groups)
+    return matcher
@@ -0,0 +1,330 @@
+"""
+Content-Addressed Media Analysis Cache for SmartGriev
+
+Results of expensive media analyzers (OCR, Gemini vision/audio, DINOv2,
+YOLO, Whisper) are cached under the SHA-256 of the media bytes plus the
+analyzer name, version and call parameters, so a re-uploaded file (forwarded
+WhatsApp images, client retries) is answered without running the model or
+calling the paid API again.
+
+Small results live in the two-tier cache (in-process LRU + Redis); results
+larger than MAX_INLINE_BYTES are pickled to DISK_ROOT instead (under
+PRIVATE_DATA_ROOT by default: loading a pickle runs code, so the directory
+must not be publicly served like MEDIA_ROOT). The nightly
+``cleanup_media_analysis_cache`` beat task deletes expired pickles and trims
+the directory to MAX_DISK_BYTES. Concurrent requests for the same key are
+single-flighted: one thread per process computes while the others wait, and
+across processes a short Redis lock makes the other workers poll for the
+result instead of recomputing.
+"""
+import copy
+import hashlib
+import logging
+import os
+import pickle
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Optional
+
+import numpy as np
+from django.conf import settings
+
+from .caching import PROMETHEUS_AVAILABLE, TwoTierCache, hash_key
+
+logger = logging.getLogger(__name__)
+
+if PROMETHEUS_AVAILABLE:
+    from prometheus_client import Counter
+
+    media_cache_requests = Counter(
+        'smartgriev_media_cache_requests_total',
+        'Media analysis cache lookups by analyzer and outcome',
+        ['analyzer', 'result']
+    )
+
+_MISSING = object()
+_CHUNK_SIZE = 1 << 20
+
+_DEFAULTS = {
+    'ENABLED': True,
+    'TTL': 7 * 86400,
+    'MAX_ENTRIES': 512,
+    'MAX_INLINE_BYTES': 256 * 1024,
+    'DISK_ROOT': os.path.join(settings.PRIVATE_DATA_ROOT, 'analysis_cache'),
+    'MAX_DISK_BYTES': 2 * 1024 ** 3,  # oldest pickles are evicted above this; 0 = no limit
+    'LOCK_TIMEOUT': 300,  # seconds a cross-process compute lock is held at most
+    'WAIT_TIMEOUT': 120,  # seconds to wait for another worker before computing anyway
+}
+
+
+def media_digest(source: Any) -> Optional[str]:
+    """
+    SHA-256 of the media content.
+
+    Accepts a file path, raw bytes, a file-like object (its position is
+    restored), a Django File, a PIL image or a NumPy array. Returns None for
+    anything else, which makes the call uncacheable.
+    """
+    digest = hashlib.sha256()
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        digest.update(source)
+    elif isinstance(source, (str, Path)):
+        with open(source, 'rb') as f:
+            for chunk in iter(lambda: f.read(_CHUNK_SIZE), b''):
+                digest.update(chunk)
+    elif isinstance(source, np.ndarray):
+        digest.update(f'{source.dtype}{source.shape}'.encode())
+        digest.update(np.ascontiguousarray(source).tobytes())
+    elif hasattr(source, 'tobytes') and hasattr(source, 'mode') and hasattr(source, 'size'):
+        # PIL image: hash decoded pixels, so re-encodes of one picture still differ
+        digest.update(f'{source.mode}{source.size}'.encode())
+        digest.update(source.tobytes())
+    elif hasattr(source, 'read'):
+        position = source.tell() if hasattr(source, 'tell') else None
+        if hasattr(source, 'seek'):
+            source.seek(0)
+        for chunk in iter(lambda: source.read(_CHUNK_SIZE), b''):
+            digest.update(chunk)
+        if position is not None:
+            source.seek(position)
+    else:
+        return None
+    return digest.hexdigest()
+
+
+def _default_cacheable(result: Any) -> bool:
+    """Failed analyses are not cached so a retry can succeed"""
+    if isinstance(result, dict):
+        return result.get('success', True) is not False and 'error' not in result
+    return result is not None
+
+
+class MediaAnalysisCache:
+    """Shared cache of analyzer results keyed by media content (see module docstring)"""
+
+    def __init__(self, name: str = 'media_analysis', options: Optional[Dict] = None):
+        self.options = {**_DEFAULTS, **getattr(settings, 'MEDIA_ANALYSIS_CACHE', {}), **(options or {})}
+        self.store = TwoTierCache(name, max_entries=self.options['MAX_ENTRIES'], ttl=self.options['TTL'])
+        self.disk_root = Path(self.options['DISK_ROOT'])
+        if self.disk_root.resolve().is_relative_to(Path(settings.MEDIA_ROOT).resolve()):
+            logger.warning(f"Media analysis cache directory {self.disk_root} is inside MEDIA_ROOT, "
+                           f"which is publicly served; set MEDIA_ANALYSIS_CACHE_DIR to a private path")
+        self._inflight: Dict[str, threading.Event] = {}
+        self._inflight_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.stats: Dict[str, Dict[str, int]] = {}
+
+    def make_key(self, analyzer: str, version: str, digest: str, params: Iterable = ()) -> str:
+        return f'{self.store.name}:{analyzer}:{hash_key(version, digest, *params)}'
+
+    # ----------------------------------------------------------------- storage
+
+    def _disk_path(self, key: str) -> Path:
+        _, analyzer, digest = key.split(':', 2)
+        return self.disk_root / analyzer / digest[:2] / f'{digest}.pkl'
+
+    def get(self, key: str, default: Any = None) -> Any:
+        value = self.store.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+
+        path = self._disk_path(key)
+        try:
+            if time.time() - path.stat().st_mtime > self.options['TTL']:
+                path.unlink(missing_ok=True)
+                return default
+            with open(path, 'rb') as f:
+                return pickle.load(f)
+        except FileNotFoundError:
+            return default
+        except Exception as e:
+            logger.warning(f"Media cache disk read failed for {path}: {e}")
+            return default
+
+    def set(self, key: str, value: Any) -> None:
+        payload = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        if len(payload) <= self.options['MAX_INLINE_BYTES']:
+            self.store.set(key, value)
+            return
+
+        path = self._disk_path(key)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with tempfile.NamedTemporaryFile(dir=path.parent, delete=False) as f:
+                f.write(payload)
+            os.replace(f.name, path)
+        except Exception as e:
+            logger.warning(f"Media cache disk write failed for {path}: {e}")
+
+    def cleanup_disk(self) -> Dict[str, int]:
+        """
+        Delete pickles older than TTL, then the oldest ones until the
+        directory fits in MAX_DISK_BYTES.
+
+        Entries are only reread on a cache hit, so without this an analyzer
+        whose media is never uploaded again leaves its pickles behind forever.
+        Returns the number of files and bytes removed and kept.
+        """
+        expires = time.time() - self.options['TTL']
+        removed, removed_bytes, kept = 0, 0, []
+        for path in self.disk_root.glob('*/*/*.pkl'):
+            try:
+                stat = path.stat()
+                if stat.st_mtime < expires:
+                    path.unlink(missing_ok=True)
+                    removed, removed_bytes = removed + 1, removed_bytes + stat.st_size
+                else:
+                    kept.append((stat.st_mtime, stat.st_size, path))
+            except FileNotFoundError:
+                continue  # Replaced or removed by another worker meanwhile
+
+        kept_bytes = sum(size for _, size, _ in kept)
+        limit = self.options['MAX_DISK_BYTES']
+        if limit:
+            kept.sort(key=lambda entry: entry[0])
+            while kept and kept_bytes > limit:
+                _, size, path = kept.pop(0)
+                path.unlink(missing_ok=True)
+                removed, removed_bytes = removed + 1, removed_bytes + size
+                kept_bytes -= size
+
+        return {'removed': removed, 'removed_bytes': removed_bytes,
+                'kept': len(kept), 'kept_bytes': kept_bytes}
+
+    # ---------------------------------------------------------------- compute
+
+    def get_or_compute(self, analyzer: str, version: str, source: Any, compute: Callable[[], Any],
+                       params: Iterable = (), cacheable: Callable[[Any], bool] = _default_cacheable) -> Any:
+        """
+        Return the cached result for ``source`` or compute, cache and return it.
+
+        Args:
+            analyzer: Analyzer name (part of the key and of the metrics labels)
+            version: Model/analyzer version; bump it to invalidate old results
+            source: Media content (see media_digest)
+            compute: Zero-argument callable producing the result
+            params: Extra call parameters that change the result
+            cacheable: Predicate deciding whether a result may be stored
+
+        Dict results served from the cache carry ``'cache_hit': True``.
+        """
+        if not self.options['ENABLED']:
+            return compute()
+        try:
+            digest = media_digest(source)
+        except Exception as e:
+            logger.warning(f"Could not hash media for {analyzer}: {e}")
+            digest = None
+        if digest is None:
+            return compute()
+
+        key = self.make_key(analyzer, version, digest, params)
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            self._record(analyzer, 'hit')
+            return self._mark_hit(value)
+
+        # Single-flight within this process
+        with self._inflight_lock:
+            event = self._inflight.get(key)
+            leader = event is None
+            if leader:
+                event = self._inflight[key] = threading.Event()
+        if not leader:
+            event.wait(self.options['WAIT_TIMEOUT'])
+            value = self.get(key, _MISSING)
+            if value is not _MISSING:
+                self._record(analyzer, 'wait_hit')
+                return self._mark_hit(value)
+
+        try:
+            return self._compute_across_processes(analyzer, key, compute, cacheable)
+        finally:
+            if leader:
+                with self._inflight_lock:
+                    self._inflight.pop(key, None)
+                event.set()
+
+    def _compute_across_processes(self, analyzer: str, key: str, compute: Callable[[], Any],
+                                  cacheable: Callable[[Any], bool]) -> Any:
+        lock_key = f'{key}:lock'
+        try:
+            locked = self.store.shared.add(lock_key, 1, self.options['LOCK_TIMEOUT'])
+        except Exception as e:
+            logger.warning(f"Media cache lock unavailable: {e}")
+            locked = True  # No shared cache: nothing to coordinate with
+
+        if not locked:
+            # Another worker is computing this media; poll for its result
+            deadline = time.monotonic() + self.options['WAIT_TIMEOUT']
+            while time.monotonic() < deadline:
+                time.sleep(0.1)
+                value = self.get(key, _MISSING)
+                if value is not _MISSING:
+                    self._record(analyzer, 'wait_hit')
+                    return self._mark_hit(value)
+                try:
+                    if self.store.shared.get(lock_key) is None:
+                        break  # The other worker gave up without a cacheable result
+                except Exception:
+                    break
+
+        try:
+            self._record(analyzer, 'miss')
+            value = compute()
+            if cacheable(value):
+                self.set(key, value)
+            return value
+        finally:
+            if locked:
+                try:
+                    self.store.shared.delete(lock_key)
+                except Exception:
+                    pass
+
+    @staticmethod
+    def _mark_hit(value: Any) -> Any:
+        if isinstance(value, dict):
+            value = copy.copy(value)
+            value['cache_hit'] = True
+        return value
+
+    # ---------------------------------------------------------------- metrics
+
+    def _record(self, analyzer: str, result: str) -> None:
+        with self._stats_lock:
+            counters = self.stats.setdefault(analyzer, {'hit': 0, 'wait_hit': 0, 'miss': 0})
+            counters[result] += 1
+        if PROMETHEUS_AVAILABLE:
+            media_cache_requests.labels(analyzer=analyzer, result=result).inc()
+
+    def get_stats(self) -> Dict[str, Dict[str, float]]:
+        """Per-analyzer hits, waits, misses and hit rate (percent) in this process"""
+        with self._stats_lock:
+            stats = {analyzer: dict(counters) for analyzer, counters in self.stats.items()}
+        for counters in stats.values():
+            lookups = counters['hit'] + counters['wait_hit'] + counters['miss']
+            counters['hit_rate'] = (counters['hit'] + counters['wait_hit']) / lookups * 100 if lookups else 0
+        return stats
+
+
+_media_cache: Optional[MediaAnalysisCache] = None
+_media_cache_lock = threading.Lock()
+
+
+def get_media_cache() -> MediaAnalysisCache:
+    """Process-wide media analysis cache"""
+    global _media_cache
+    if _media_cache is None:
+        with _media_cache_lock:
+            if _media_cache is None:
+                _media_cache = MediaAnalysisCache()
+    return _media_cache
+
+
+def cached_analysis(analyzer: str, version: str, source: Any, compute: Callable[[], Any],
+                    params: Iterable = (), **kwargs) -> Any:
+    """Shortcut for get_media_cache().get_or_compute(...)"""
+    return get_media_cache().get_or_compute(analyzer, version, source, compute, params, **kwargs)
@@ -5,6 +5,7 @@ Django settings for smartgriev project.
 from pathlib import Path
 from datetime import timedelta
 import os
+from celery.schedules import crontab
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -116,6 +117,9 @@ if USE_POSTGRES:
             }
         }
     }
+    # Second connection to the same database: complaint numbers are reserved
+    # on it in autocommit mode, outside the transaction that saves the complaint
+    DATABASES['sequences'] = {**DATABASES['default'], 'TEST': {'MIRROR': 'default'}}
 else:
     # SQLite Configuration (Development)
     DATABASES = {
@@ -178,6 +182,9 @@ STATIC_URL = 'static/'
 STATIC_ROOT = BASE_DIR / 'static'
 MEDIA_URL = 'media/'
 MEDIA_ROOT = BASE_DIR / 'media'
+# Private working data (analysis caches, exported models, indexes). Unlike
+# MEDIA_ROOT it is never served; use a volume shared by the workers in production
+PRIVATE_DATA_ROOT = Path(os.getenv('PRIVATE_DATA_ROOT', str(BASE_DIR / 'var')))
 
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
@@ -240,6 +247,18 @@ CELERY_RESULT_BACKEND = f'redis://{REDIS_HOST}:{REDIS_PORT}/0'
 CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
+CELERY_BEAT_SCHEDULE = {
+    # Rebuild drifted analytics rollup days and snapshot SystemMetrics
+    'reconcile-analytics-rollups': {
+        'task': 'reconcile_analytics_rollups',
+        'schedule': crontab(hour=2, minute=30),
+    },
+    # Delete expired media analysis pickles and trim the directory to MAX_DISK_BYTES
+    'cleanup-media-analysis-cache': {
+        'task': 'cleanup_media_analysis_cache',
+        'schedule': crontab(hour=3, minute=15),
+    },
+}
 
 # S3 Settings (if using AWS)
 if os.getenv('USE_S3', 'False') == 'True':
@@ -309,6 +328,9 @@ FIREBASE_CONFIG = {
 # ML Models directory
 MODELS_ROOT = BASE_DIR / 'ml_models'
 
+# Worker threads shared by multimodal analysis pipeline stages
+ML_PIPELINE_MAX_WORKERS = int(os.getenv('ML_PIPELINE_MAX_WORKERS', 4))
+
 # Analytics settings
 ANALYTICS_RETENTION_DAYS = int(os.getenv('ANALYTICS_RETENTION_DAYS', 90))
 ENABLE_REAL_TIME_METRICS = os.getenv('ENABLE_REAL_TIME_METRICS', 'True') == 'True'
@@ -410,7 +432,99 @@ COMPLAINT_CLASSIFICATION = {
     'ENABLED': True,
     'AUTO_CLASSIFY': True,
     'MODEL': 'llama-3.1-8b-instant',  # Updated to latest supported Groq model
-    'CONFIDENCE_THRESHOLD': 0.7
+    'CONFIDENCE_THRESHOLD': 0.7,
+    'CACHE_TTL': int(os.getenv('CLASSIFICATION_CACHE_TTL', 86400)),  # Shared (Redis) tier, seconds
+    'CACHE_MAX_ENTRIES': int(os.getenv('CLASSIFICATION_CACHE_MAX_ENTRIES', 2048)),  # Per-process LRU cap
+    'BATCH_SIZE': int(os.getenv('CLASSIFICATION_BATCH_SIZE', 20)),  # Complaints packed per LLM request
+    'BATCH_CONCURRENCY': int(os.getenv('CLASSIFICATION_BATCH_CONCURRENCY', 4)),  # Concurrent LLM requests
+}
+
+# Chatbot sessions (chatbot.conversation_store)
+CHATBOT_CONVERSATIONS = {
+    'BACKEND': os.getenv('CHATBOT_CONVERSATION_BACKEND', 'redis'),  # 'redis' (shared by workers) or 'memory'
+    'MAX_TURNS': int(os.getenv('CHATBOT_MAX_TURNS', 20)),  # Turns kept per session; older turns are dropped
+    'PROMPT_TURNS': int(os.getenv('CHATBOT_PROMPT_TURNS', 5)),  # Recent turns quoted in each prompt
+    'TTL': int(os.getenv('CHATBOT_CONVERSATION_TTL', 6 * 3600)),  # seconds since the last turn
+    'LOCAL_CACHE_SIZE': int(os.getenv('CHATBOT_LOCAL_CACHE_SIZE', 256)),  # Hot sessions cached per process
+}
+
+# Chatbot prompt assembly (chatbot.prompt_builder)
+CHATBOT_PROMPT = {
+    'TOKEN_BUDGET': int(os.getenv('CHATBOT_PROMPT_TOKEN_BUDGET', 3000)),  # Older turns and examples are dropped above this
+    'PRO_MODEL_TOKENS': int(os.getenv('CHATBOT_PRO_MODEL_TOKENS', 10000)),  # Prompts above this use gemini-1.5-pro
+    'MAX_EXAMPLES': int(os.getenv('CHATBOT_MAX_EXAMPLES', 2)),  # Few-shot examples per prompt, most relevant first
+}
+
+# Chat translation memory (chatbot.translation_memory)
+TRANSLATION_MEMORY = {
+    'TTL': int(os.getenv('TRANSLATION_MEMORY_TTL', 30 * 86400)),  # Shared (Redis) tier, seconds
+    'LOCAL_MAX_ENTRIES': int(os.getenv('TRANSLATION_MEMORY_MAX_ENTRIES', 4096)),  # Per-process LRU cap
+    # Fuzzy matches (same words, different punctuation/order) need this similarity; 0 = exact matches only
+    'FUZZY_THRESHOLD': float(os.getenv('TRANSLATION_MEMORY_FUZZY_THRESHOLD', 0)),
+    'PHRASES_FILE': os.getenv('CHAT_PHRASES_FILE', str(BASE_DIR / 'translations' / 'chat_phrases.json')),
+}
+
+# Blocking AI SDK / speech / file calls awaited from async views run on this bounded pool
+AI_IO_MAX_WORKERS = int(os.getenv('AI_IO_MAX_WORKERS', 16))
+AI_REQUEST_TIMEOUT = float(os.getenv('AI_REQUEST_TIMEOUT', 30))  # seconds per LLM call
+
+# Complaint numbers reserved per worker and prefix at a time (1 = one database increment per complaint)
+COMPLAINT_NUMBER_BLOCK_SIZE = int(os.getenv('COMPLAINT_NUMBER_BLOCK_SIZE', 1))
+# Database alias the counters are incremented on; falls back to 'default' when not configured
+COMPLAINT_NUMBER_DATABASE = os.getenv('COMPLAINT_NUMBER_DATABASE', 'sequences')
+
+# Content-addressed cache of media analyzer results (smartgriev.media_cache)
+MEDIA_ANALYSIS_CACHE = {
+    'ENABLED': os.getenv('MEDIA_ANALYSIS_CACHE_ENABLED', 'True') == 'True',
+    'TTL': int(os.getenv('MEDIA_ANALYSIS_CACHE_TTL', 7 * 86400)),  # seconds
+    'MAX_INLINE_BYTES': int(os.getenv('MEDIA_ANALYSIS_CACHE_MAX_INLINE_BYTES', 256 * 1024)),  # Larger results go to disk
+    'DISK_ROOT': os.getenv('MEDIA_ANALYSIS_CACHE_DIR', str(PRIVATE_DATA_ROOT / 'analysis_cache')),  # Pickles: keep out of MEDIA_ROOT
+    'MAX_DISK_BYTES': int(os.getenv('MEDIA_ANALYSIS_CACHE_MAX_DISK_BYTES', 2 * 1024 ** 3)),  # 0 = no limit
+}
+
+# Lazily loaded ML models (machine_learning.model_registry)
+MODEL_REGISTRY = {
+    'MEMORY_BUDGET_MB': int(os.getenv('MODEL_MEMORY_BUDGET_MB', 0)),  # LRU models are evicted above this; 0 = no limit
+    # Models loaded at worker boot, e.g. "yolov8n,dinov2:facebook/dinov2-base,whisper:base"
+    'WARM_MODELS': [name.strip() for name in os.getenv('MODEL_WARM_MODELS', '').split(',') if name.strip()],
+}
+
+# Inference backend per vision model (machine_learning.onnx_backend):
+# 'eager' (PyTorch), 'onnx' or 'onnx-int8' for dinov2/clip; 'eager' or 'torch-int8' for trocr
+INFERENCE_BACKENDS = {
+    'dinov2': os.getenv('DINOV2_BACKEND', 'eager'),
+    'clip': os.getenv('CLIP_BACKEND', 'eager'),
+    'trocr': os.getenv('TROCR_BACKEND', 'eager'),
+}
+# Zero-shot CLIP scene labels, one per line in this file (default: AdvancedImageProcessor's built-in list)
+CLIP_SCENE_LABELS_FILE = os.getenv('CLIP_SCENE_LABELS_FILE')
+CLIP_SCENE_LABELS = [
+    line.strip()
+    for line in Path(CLIP_SCENE_LABELS_FILE).read_text(encoding='utf-8').splitlines()
+    if line.strip()
+] if CLIP_SCENE_LABELS_FILE else None
+ONNX_INFERENCE = {
+    'MODEL_DIR': os.getenv('ONNX_MODEL_DIR', str(PRIVATE_DATA_ROOT / 'onnx_models')),  # Exported graphs, shared by workers
+    'INTRA_OP_THREADS': int(os.getenv('ONNX_INTRA_OP_THREADS', 0)),  # 0 = onnxruntime default
+}
+
+# Voice complaint transcription (machine_learning.transcription)
+TRANSCRIPTION = {
+    'BACKEND': os.getenv('TRANSCRIPTION_BACKEND', 'whisper'),  # 'whisper' or 'faster-whisper' (CTranslate2 int8)
+    'AUTO_MODEL_SIZE': os.getenv('TRANSCRIPTION_AUTO_MODEL_SIZE', 'True') == 'True',  # Model size from speech duration
+    # Larger model for clips up to 60 s of speech, e.g. 'small' (one more model per worker); default: off
+    'SHORT_CLIP_MODEL': os.getenv('TRANSCRIPTION_SHORT_CLIP_MODEL') or None,
+    'VAD': os.getenv('TRANSCRIPTION_VAD', 'True') == 'True',  # Trim silence before transcribing
+    'CHUNK_SECONDS': int(os.getenv('TRANSCRIPTION_CHUNK_SECONDS', 30)),
+    'MAX_WORKERS': int(os.getenv('TRANSCRIPTION_MAX_WORKERS', 2)),  # Parallel chunks (faster-whisper only)
+}
+
+# Complaint image similarity index (machine_learning.image_index)
+IMAGE_INDEX = {
+    'ENABLED': os.getenv('IMAGE_INDEX_ENABLED', 'True') == 'True',  # Index new complaint images via Celery
+    'ROOT': os.getenv('IMAGE_INDEX_ROOT', str(PRIVATE_DATA_ROOT / 'image_index')),
+    'IVF_MIN_VECTORS': int(os.getenv('IMAGE_INDEX_IVF_MIN_VECTORS', 4096)),  # Smaller shards are scanned exhaustively
+    'NPROBE': int(os.getenv('IMAGE_INDEX_NPROBE', 8)),  # IVF lists scored per query
 }
 
 # ==============================================================================